@@ -8,15 +8,18 @@ import GPUtil
 from fastapi import FastAPI, Request, File, UploadFile, Body, HTTPException, Form, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-import os, json, uuid
+import os, json, uuid, glob
 from datetime import datetime, timedelta
+from typing import Optional
 from pydantic import BaseModel, validator
 from sqlalchemy.orm import Session
 import threading
+import time
 import joblib
 import pandas as pd
 import subprocess
-from fastapi.responses import PlainTextResponse, JSONResponse
+from fastapi.responses import PlainTextResponse, JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 import signal
 from huggingface_hub import snapshot_download
 import requests
@@ -38,6 +41,22 @@ from auth import (
 )
 from database import get_db, init_db, User as DBUser, Project as DBProject, Dataset as DBDataset
 from middleware import SecurityHeadersMiddleware, RateLimitMiddleware, LoggingMiddleware, FileSizeValidationMiddleware
+from utils.run_cache import training_fingerprint, store_run, restore_run
+from utils.worker_pool import TrainingWorkerPool, MAX_JOBS_PER_WORKER, MAX_WORKER_RSS_MB
+from dataset_profiles import ProfileQueue
+from scheduler import TrainingScheduler, RUNNING, PAUSED, CANCELLED, QUEUED
+from utils.process_manager import ProcessManager
+from utils.resources import plan_resources
+from utils.isolation import CoreAllocator, memory_share_mb
+from worker import update_project_status, record_outcome, record_usage, TRAINING_BUDGET_GRACE_SECONDS
+from utils.accounting import ResourceAccountant
+from utils.progress import PROGRESS_FILENAME, read_events
+from utils.uploads import (
+    StreamingUpload, InvalidUpload, UploadTooLarge, OffsetMismatch, UPLOAD_CHUNK_BYTES, SESSION_TTL_SECONDS,
+    create_session, load_session, ChunkWriter, finalize_session, delete_session, collect_abandoned_sessions,
+)
+from utils.blobs import BLOBS_DIR, store_blob, link_owned_blob, collect_blobs
+from utils.tail import stream_run, parse_stream_id, start_file, read_lines, tail_offset, parse_range
 
 # Initialize structured logging
 logger = structlog.get_logger()
@@ -137,6 +156,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    # Log paging headers clients read
+    expose_headers=["X-Next-Offset", "Content-Range"],
 )
 
 # Ensure projects dir exists
@@ -246,6 +267,15 @@ async def verify_project_ownership(project_id: str, current_user: User):
     
     return project_data
 
+def dataset_extension(filename: Optional[str]) -> str:
+    if not filename:
+        raise HTTPException(status_code=400, detail="No filename provided")
+    allowed_extensions = ['.csv', '.json']
+    file_extension = os.path.splitext(filename)[1].lower()
+    if file_extension not in allowed_extensions:
+        raise HTTPException(status_code=400, detail="Only CSV and JSON files are allowed")
+    return file_extension
+
 @app.post("/projects/{project_id}/data")
 async def upload_dataset(
     project_id: str, 
@@ -258,13 +288,7 @@ async def upload_dataset(
         await verify_project_ownership(project_id, current_user)
         
         # Validate file type
-        if not file.filename:
-            raise HTTPException(status_code=400, detail="No filename provided")
-        
-        allowed_extensions = ['.csv', '.json']
-        file_extension = os.path.splitext(file.filename)[1].lower()
-        if file_extension not in allowed_extensions:
-            raise HTTPException(status_code=400, detail="Only CSV and JSON files are allowed")
+        file_extension = dataset_extension(file.filename)
         
         # Validate content type
         allowed_types = ['text/csv', 'application/json', 'text/plain']
@@ -279,25 +303,25 @@ async def upload_dataset(
         safe_filename = f"{int(datetime.now().timestamp())}_{file.filename}"
         file_path = os.path.join(data_dir, safe_filename)
         
-        contents = await file.read()
-        
-        # Validate file content for basic structure
-        try:
-            if file_extension == '.json':
-                json.loads(contents.decode('utf-8'))
-            elif file_extension == '.csv':
-                # Basic CSV validation
-                content_str = contents.decode('utf-8')
-                if not content_str.strip():
-                    raise HTTPException(status_code=400, detail="Empty file")
-        except (json.JSONDecodeError, UnicodeDecodeError) as e:
-            raise HTTPException(status_code=400, detail="Invalid file format")
-        
-        with open(file_path, 'wb') as f:
-            f.write(contents)
-
-        logger.info("Dataset uploaded", username=current_user.username, project_id=project_id, filename=file.filename, size=len(contents))
-        return {"success": True, "filename": file.filename, "size": len(contents)}
+        # Stream to a temporary file, hashing and validating chunk by chunk,
+        # so memory per upload stays constant whatever the file size
+        with StreamingUpload(file_path, file_extension.lstrip('.')) as upload:
+            try:
+                while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                    await run_in_threadpool(upload.write, chunk)
+                sha256 = await run_in_threadpool(upload.commit)
+            except InvalidUpload as e:
+                raise HTTPException(status_code=400, detail=f"Invalid file format: {e}")
+        deduplicated = await run_in_threadpool(store_blob, BLOBS_DIR, file_path, sha256)
+        # Rows, columns and schema are filled in by the background profiler
+        dataset = await run_in_threadpool(dataset_profiles.add, project_id, safe_filename, file.filename,
+                                          upload.size, sha256)
+
+        logger.info("Dataset uploaded", username=current_user.username, project_id=project_id, filename=file.filename,
+                    size=upload.size, sha256=sha256, deduplicated=deduplicated, dataset_id=dataset["id"])
+        return {"success": True, "filename": file.filename, "size": upload.size, "sha256": sha256,
+                "deduplicated": deduplicated, "dataset_id": dataset["id"],
+                "profile_status": dataset["profile_status"]}
         
     except HTTPException:
         raise
@@ -306,6 +330,167 @@ async def upload_dataset(
         raise HTTPException(status_code=500, detail="Upload failed")
 
 
+# Largest file a resumable upload may grow to
+MAX_RESUMABLE_UPLOAD_BYTES = int(os.getenv("MAX_RESUMABLE_UPLOAD_MB", "20480")) * 1024 * 1024
+# How often abandoned upload sessions and unreferenced blobs are looked for
+UPLOAD_GC_INTERVAL_SECONDS = 3600
+
+class UploadSessionRequest(BaseModel):
+    filename: str
+    size: Optional[int] = None  # total bytes, if known; chunks may not go past it
+    sha256: Optional[str] = None  # may also be given when finalizing; a known one skips the transfer
+
+class FinalizeUploadRequest(BaseModel):
+    sha256: Optional[str] = None
+
+def _upload_status(session, offset: int) -> dict:
+    return {"upload_id": session.id, "filename": session.filename, "offset": offset, "size": session.size,
+            "expires_at": datetime.utcfromtimestamp(session.updated_at + SESSION_TTL_SECONDS).isoformat()}
+
+def owned_data_dirs(username: str) -> list:
+    """Data directories of every project the user owns"""
+    dirs = []
+    for path in glob.glob(os.path.join("projects", "*.json")):
+        try:
+            with open(path) as f:
+                owner = json.load(f).get("owner")
+        except (OSError, ValueError):
+            continue
+        if owner == username:
+            dirs.append(os.path.join(os.path.splitext(path)[0], "data"))
+    return dirs
+
+@app.post("/projects/{project_id}/uploads")
+async def create_upload(project_id: str, body: UploadSessionRequest,
+                        current_user: User = Depends(get_current_active_user)):
+    """Start a resumable upload; send chunks with PUT, then finalize.
+
+    If ``sha256`` names content already in the caller's own projects, the
+    file is added to the project right away and no session is created.
+    Content only other users hold must be uploaded; it is still stored
+    once, deduplicated after finalize has verified the checksum.
+    """
+    await verify_project_ownership(project_id, current_user)
+    file_extension = dataset_extension(body.filename)
+    filename = os.path.basename(body.filename)
+    if body.size is not None and not 0 < body.size <= MAX_RESUMABLE_UPLOAD_BYTES:
+        raise HTTPException(413 if body.size > 0 else 400,
+                            f"size must be between 1 and {MAX_RESUMABLE_UPLOAD_BYTES} bytes")
+    project_dir = os.path.join("projects", project_id)
+    if body.sha256:
+        data_dir = os.path.join(project_dir, 'data')
+        os.makedirs(data_dir, exist_ok=True)
+        safe_filename = f"{int(datetime.now().timestamp())}_{filename}"
+        owned = await run_in_threadpool(owned_data_dirs, current_user.username)
+        try:
+            size = await run_in_threadpool(link_owned_blob, BLOBS_DIR, body.sha256,
+                                           os.path.join(data_dir, safe_filename), owned)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+        if size is not None:
+            sha256 = body.sha256.lower()
+            dataset = await run_in_threadpool(dataset_profiles.add, project_id, safe_filename, filename, size, sha256)
+            logger.info("Dataset uploaded", username=current_user.username, project_id=project_id, filename=filename,
+                        size=size, sha256=sha256, deduplicated=True, dataset_id=dataset["id"])
+            return {"success": True, "complete": True, "filename": filename, "size": size, "sha256": sha256,
+                    "deduplicated": True, "dataset_id": dataset["id"], "profile_status": dataset["profile_status"]}
+    session = await run_in_threadpool(create_session, project_dir, filename, file_extension.lstrip('.'),
+                                      body.size, body.sha256)
+    logger.info("Upload session created", username=current_user.username, project_id=project_id,
+                upload_id=session.id, size=body.size)
+    return {**_upload_status(session, 0), "complete": False}
+
+@app.get("/projects/{project_id}/uploads/{upload_id}")
+async def get_upload(project_id: str, upload_id: str, current_user: User = Depends(get_current_active_user)):
+    """How many bytes of a resumable upload have arrived; resume from ``offset``"""
+    await verify_project_ownership(project_id, current_user)
+    try:
+        session, offset = await run_in_threadpool(load_session, os.path.join("projects", project_id), upload_id)
+    except FileNotFoundError:
+        raise HTTPException(404, "Upload session not found")
+    return _upload_status(session, offset)
+
+@app.put("/projects/{project_id}/uploads/{upload_id}")
+async def put_upload_chunk(project_id: str, upload_id: str, offset: int, request: Request,
+                           current_user: User = Depends(get_current_active_user)):
+    """Append the request body at ``offset``, which must be where the upload stands"""
+    await verify_project_ownership(project_id, current_user)
+    try:
+        writer = await run_in_threadpool(ChunkWriter, os.path.join("projects", project_id), upload_id, offset,
+                                         MAX_RESUMABLE_UPLOAD_BYTES)
+        try:
+            # Written as it arrives, in pieces of up to UPLOAD_CHUNK_BYTES;
+            # a broken connection keeps what got through
+            pending = bytearray()
+            async for chunk in request.stream():
+                pending += chunk
+                if len(pending) >= UPLOAD_CHUNK_BYTES:
+                    await run_in_threadpool(writer.write, bytes(pending))
+                    pending.clear()
+            if pending:
+                await run_in_threadpool(writer.write, bytes(pending))
+        finally:
+            await run_in_threadpool(writer.close)
+    except FileNotFoundError:
+        raise HTTPException(404, "Upload session not found")
+    except OffsetMismatch as e:
+        return JSONResponse(status_code=409, content={"detail": "Offset mismatch, resume from offset",
+                                                      "offset": e.offset})
+    except UploadTooLarge as e:
+        raise HTTPException(413, str(e))
+    return {"upload_id": upload_id, "offset": writer.offset}
+
+@app.post("/projects/{project_id}/uploads/{upload_id}/finalize")
+async def finalize_upload(project_id: str, upload_id: str, body: FinalizeUploadRequest = Body(default=None),
+                          current_user: User = Depends(get_current_active_user)):
+    """Verify the checksum and format of a complete upload and add it to the project's data"""
+    await verify_project_ownership(project_id, current_user)
+    project_dir = os.path.join("projects", project_id)
+    try:
+        session, _ = await run_in_threadpool(load_session, project_dir, upload_id)
+        data_dir = os.path.join(project_dir, 'data')
+        os.makedirs(data_dir, exist_ok=True)
+        safe_filename = f"{int(datetime.now().timestamp())}_{session.filename}"
+        file_path = os.path.join(data_dir, safe_filename)
+        sha256, size = await run_in_threadpool(finalize_session, project_dir, upload_id, file_path,
+                                               body.sha256 if body else None)
+    except FileNotFoundError:
+        raise HTTPException(404, "Upload session not found")
+    except OffsetMismatch as e:
+        return JSONResponse(status_code=409, content={"detail": "Upload incomplete", "offset": e.offset})
+    except InvalidUpload as e:
+        raise HTTPException(400, f"Invalid upload: {e}")
+    deduplicated = await run_in_threadpool(store_blob, BLOBS_DIR, file_path, sha256)
+    dataset = await run_in_threadpool(dataset_profiles.add, project_id, safe_filename, session.filename, size, sha256)
+    logger.info("Dataset uploaded", username=current_user.username, project_id=project_id, filename=session.filename,
+                size=size, sha256=sha256, upload_id=upload_id, deduplicated=deduplicated, dataset_id=dataset["id"])
+    return {"success": True, "filename": session.filename, "size": size, "sha256": sha256,
+            "deduplicated": deduplicated, "dataset_id": dataset["id"], "profile_status": dataset["profile_status"]}
+
+@app.delete("/projects/{project_id}/uploads/{upload_id}")
+async def cancel_upload(project_id: str, upload_id: str, current_user: User = Depends(get_current_active_user)):
+    await verify_project_ownership(project_id, current_user)
+    try:
+        await run_in_threadpool(delete_session, os.path.join("projects", project_id), upload_id)
+    except FileNotFoundError:
+        raise HTTPException(404, "Upload session not found")
+    return {"success": True}
+
+@app.get("/projects/{project_id}/datasets")
+async def list_datasets(project_id: str, current_user: User = Depends(get_current_active_user)):
+    """Uploaded data files of a project with their profiling status"""
+    await verify_project_ownership(project_id, current_user)
+    return {"project_id": project_id, "datasets": await run_in_threadpool(dataset_profiles.for_project, project_id)}
+
+@app.get("/projects/{project_id}/datasets/{dataset_id}")
+async def get_dataset_profile(project_id: str, dataset_id: int, current_user: User = Depends(get_current_active_user)):
+    """Profile of an uploaded data file: rows, columns and per-column schema once ``profile_status`` is completed"""
+    await verify_project_ownership(project_id, current_user)
+    dataset = await run_in_threadpool(dataset_profiles.get, project_id, dataset_id)
+    if dataset is None:
+        raise HTTPException(404, "Dataset not found")
+    return dataset
+
 @app.post("/projects/{project_id}/schema")
 async def save_schema(
     project_id: str, 
@@ -350,6 +535,13 @@ async def save_schema(
 # Update TrainRequest model with validation
 class TrainRequest(BaseModel):
     cpu_percent: int = 100
+    max_duration: int = 3600  # wall-clock budget in seconds
+    incremental: bool = False  # grow the previous model on newly uploaded data
+    resume: bool = False  # skip stages an interrupted run already finished
+    force: bool = False  # retrain even if an identical run is cached
+    priority: int = 0  # higher starts first when the queue runs by priority
+    ensemble: bool = False  # stack the best candidates when that scores higher (slower predictions)
+    screen: bool = False  # drop constant, duplicate and uninformative features before evaluating candidates
     
     @validator('cpu_percent')
     def validate_cpu(cls, v):
@@ -357,13 +549,211 @@ class TrainRequest(BaseModel):
             raise ValueError('CPU limit must be between 10-100%')
         return v
 
+    @validator('max_duration')
+    def validate_max_duration(cls, v):
+        if v < 60:
+            raise ValueError('Training budget must be at least 60 seconds')
+        return v
+
+# TrainRequest fields that change the trained model, and so the run fingerprint
+RESULT_OPTIONS = ("incremental", "max_duration", "cpu_percent", "ensemble", "screen")
+
+def training_process_alive(pid_path: str) -> bool:
+    """Whether the pid recorded in ``pid_path`` is still a running process."""
+    try:
+        with open(pid_path) as f:
+            pid = int(f.read().strip())
+    except (OSError, ValueError):
+        return False
+    try:
+        return psutil.Process(pid).status() != psutil.STATUS_ZOMBIE
+    except psutil.Error:
+        return False
+
+# Warm training workers with the ML stack preloaded; 0 starts a fresh
+# train_model.py subprocess for every run instead.
+TRAINING_WORKERS = int(os.getenv("TRAINING_WORKERS", "0"))
+training_pool = TrainingWorkerPool(
+    size=TRAINING_WORKERS,
+    max_jobs=int(os.getenv("TRAINING_WORKER_MAX_JOBS", str(MAX_JOBS_PER_WORKER))),
+    max_rss_mb=float(os.getenv("TRAINING_WORKER_MAX_RSS_MB", str(MAX_WORKER_RSS_MB))),
+) if TRAINING_WORKERS > 0 else None
+
+process_manager = ProcessManager()
+
+core_allocator = CoreAllocator()
+# Per-job memory cap; 0 gives each job the share of host memory that
+# matches its share of the cores
+TRAINING_MEMORY_MB = int(os.getenv("TRAINING_MEMORY_MB", "0"))
+
+# How often a thread waiting on a training job checks for pause, cancel
+# and budget overrun
+TRAINING_WAIT_POLL_SECONDS = 5
+
+def wait_for_training(project_id: str, pid: int, max_duration: int, wait, kill):
+    """Block until training job ``pid`` ends; ``wait(timeout)`` is True once it has.
+
+    The job enforces its own budget; this is only a backstop that calls
+    ``kill()`` if it outlives budget plus grace (paused time excluded), or
+    ignores a cancel for longer than the cancel grace period. Returns the
+    resources the job's process tree used.
+    """
+    accountant = ResourceAccountant(pid).start()
+    deadline = time.monotonic() + max_duration + TRAINING_BUDGET_GRACE_SECONDS
+    while not wait(TRAINING_WAIT_POLL_SECONDS):
+        if process_manager.is_paused(project_id):
+            deadline += TRAINING_WAIT_POLL_SECONDS
+        elif time.monotonic() > deadline or process_manager.cancel_overdue(project_id):
+            logger.warning("Training did not stop in time, killing", project_id=project_id)
+            kill()
+            wait(None)
+            break
+    return accountant.stop()
+
+def run_in_subprocess(project_id: str, options: dict):
+    project_dir = os.path.join("projects", project_id)
+    cpu_limit, max_duration = options["cpu_percent"], options["max_duration"]
+    log_path = os.path.join(project_dir, "train.log")
+    start_file(log_path)  # streams following the previous run notice the new one
+    with open(log_path, "a") as log_file:
+        train_cmd = ["python", "train_model.py", project_id, "--max-duration", str(max_duration),
+                     "--cpu-percent", str(cpu_limit)]
+        if options.get("incremental"):
+            train_cmd.append("--incremental")
+        if options.get("resume"):
+            train_cmd.append("--resume")
+        if options.get("ensemble"):
+            train_cmd.append("--ensemble")
+        if options.get("screen"):
+            train_cmd.append("--screen-features")
+        # The script pins itself to its cores and caps its memory
+        train_cmd += ["--cores", ",".join(map(str, options["cores"])), "--memory-mb", str(options["memory_mb"])]
+
+        proc = subprocess.Popen(
+            train_cmd,
+            cwd=os.path.dirname(__file__),
+            stdout=log_file, stderr=log_file,
+            # Own process group, so pause/cancel signals reach every process it starts
+            start_new_session=True,
+        )
+        with open(os.path.join(project_dir, "train.pid"), "w") as f:
+            f.write(str(proc.pid))
+        process_manager.register(project_id, proc.pid)
+
+        def wait(timeout):
+            try:
+                proc.wait(timeout=timeout)
+                return True
+            except subprocess.TimeoutExpired:
+                return False
+
+        usage = wait_for_training(project_id, proc.pid, max_duration, wait,
+                                  lambda: os.killpg(proc.pid, signal.SIGKILL))
+        return proc.returncode, usage
+
+def run_in_worker_pool(project_id: str, options: dict):
+    project_dir = os.path.join("projects", project_id)
+    max_duration = options["max_duration"]
+    job = training_pool.submit(project_id, os.path.join(project_dir, "train.log"),
+                               max_duration=max_duration, cpu_percent=options["cpu_percent"],
+                               cores=options["cores"], memory_mb=options["memory_mb"],
+                               incremental=options.get("incremental", False), resume=options.get("resume", False),
+                               ensemble=options.get("ensemble", False), screen=options.get("screen", False))
+    pid = job.wait_started()
+    if pid is None:
+        return job.returncode, None  # failed before it started
+    with open(os.path.join(project_dir, "train.pid"), "w") as f:
+        f.write(str(pid))
+    process_manager.register(project_id, pid)
+    # The pool replaces a killed worker
+    usage = wait_for_training(project_id, pid, max_duration, lambda timeout: job.wait(timeout) is not None,
+                              lambda: training_pool.kill(job))
+    return job.returncode, usage
+
+def run_training(run_id: int, project_id: str, options: dict):
+    """Run one scheduled training run to completion and record its outcome."""
+    project_dir = os.path.join("projects", project_id)
+    pid_path = os.path.join(project_dir, 'train.pid')
+    status, error, usage, log = 'failed', None, None, None
+    # Concurrent runs get disjoint cores; the scheduler only admits what fits
+    cores = core_allocator.acquire(run_id, plan_resources(options["cpu_percent"]).cores)
+    options = dict(options, cores=cores, memory_mb=TRAINING_MEMORY_MB or memory_share_mb(len(cores)))
+    try:
+        update_project_status(project_id, status='training', training_started_at=datetime.utcnow().isoformat())
+        returncode, usage = run_in_worker_pool(project_id, options) if training_pool is not None else run_in_subprocess(project_id, options)
+        cancelled = process_manager.was_cancelled(project_id)
+        status, log = record_outcome(project_id, returncode, options["fingerprint"], cancelled)
+    except Exception as e:
+        logger.error("Training thread failed", project_id=project_id, error=str(e))
+        status, error = 'failed', str(e)
+        # Update project status to failed
+        try:
+            update_project_status(project_id, status='failed', error=str(e))
+        except:
+            pass
+    finally:
+        # Cleanup PID file
+        if os.path.exists(pid_path):
+            os.remove(pid_path)
+        # Finish the run first: a cancel that loses the race then fails
+        # instead of leaving a pending cancel for the project's next run
+        training_scheduler.finished(run_id, status, error)
+        process_manager.unregister(project_id)
+        core_allocator.release(run_id)
+        try:
+            record_usage(training_scheduler.session_factory, run_id, project_id, usage, log)
+        except Exception as e:
+            logger.error("Failed to record training usage", project_id=project_id, run_id=run_id, error=str(e))
+
+def launch_training(run_id: int, project_id: str, options: dict):
+    threading.Thread(target=run_training, args=(run_id, project_id, options), daemon=True).start()
+
+# "local" trains inside the API process; "workers" only queues runs for
+# standalone workers (worker.py) to claim.
+TRAINING_EXECUTOR = os.getenv("TRAINING_EXECUTOR", "local")
+
+training_scheduler = TrainingScheduler(
+    launch=launch_training if TRAINING_EXECUTOR == "local" else None,
+    max_concurrent=int(os.getenv("TRAINING_MAX_CONCURRENT", "2")),
+    max_per_user=int(os.getenv("TRAINING_MAX_PER_USER", "1")),
+    policy=os.getenv("TRAINING_QUEUE_POLICY", "fifo"),
+)
+
+dataset_profiles = ProfileQueue()
+
+upload_gc_stopped = threading.Event()
+
+def collect_upload_storage():
+    while not upload_gc_stopped.wait(UPLOAD_GC_INTERVAL_SECONDS):
+        try:
+            collect_abandoned_sessions("projects")
+            collect_blobs(BLOBS_DIR)
+        except Exception as e:
+            logger.error("Upload storage cleanup failed", error=str(e))
+
+@app.on_event("startup")
+def start_training_services():
+    if training_pool is not None:
+        training_pool.start()
+    training_scheduler.start()
+    threading.Thread(target=collect_upload_storage, daemon=True).start()
+    dataset_profiles.start()
+
+@app.on_event("shutdown")
+def stop_training_services():
+    training_scheduler.stop()
+    upload_gc_stopped.set()
+    dataset_profiles.stop()
+    if training_pool is not None:
+        training_pool.shutdown()
+
 @app.post("/projects/{project_id}/train")
 async def train_project(
     project_id: str, 
     body: TrainRequest, 
     current_user: User = Depends(get_current_active_user)
 ):
-    """Start training for a project"""
+    """Queue training for a project"""
     try:
         # Verify project ownership
         await verify_project_ownership(project_id, current_user)
@@ -379,85 +769,52 @@ async def train_project(
         if not os.path.exists(data_dir) or not os.listdir(data_dir):
             raise HTTPException(400, "No dataset found. Please upload a dataset first.")
             
-        # Check for existing training process
+        # Check for existing training process; a pid file left behind by a
+        # crashed run must not block the next attempt
         pid_path = os.path.join(project_dir, 'train.pid')
         if os.path.exists(pid_path):
-            raise HTTPException(409, "Training already in progress")
+            if training_process_alive(pid_path):
+                raise HTTPException(409, "Training already in progress")
+            logger.warning("Removing stale training pid file", project_id=project_id)
+            os.remove(pid_path)
+        if training_scheduler.active_run(project_id) is not None:
+            raise HTTPException(409, "Training already queued or in progress")
 
         # Validate CPU percentage
         if body.cpu_percent < 10 or body.cpu_percent > 100:
             raise HTTPException(400, "CPU percentage must be between 10 and 100")
 
-        log_path = os.path.join(project_dir, "train.log")
         os.makedirs(project_dir, exist_ok=True)
+
+        # Same data, schema, pipeline code, library versions and options as a
+        # previous successful run: hand back its model instead of training again.
+        # The options cover every request field that changes the model: the
+        # budget and CPU share decide which candidates finish, and an
+        # incremental run grows the previous model instead of starting over.
+        options = {name: getattr(body, name) for name in RESULT_OPTIONS}
+        digests = await run_in_threadpool(dataset_profiles.digests, project_id)
+        fingerprint = await run_in_threadpool(training_fingerprint, project_dir, options, digests)
+        if not body.force:
+            cached_log = await run_in_threadpool(restore_run, project_dir, fingerprint)
+            if cached_log is not None:
+                update_project_status(project_id, status=cached_log.get('status', 'completed'), cached_run=fingerprint)
+                logger.info("Training served from cache", username=current_user.username,
+                            project_id=project_id, fingerprint=fingerprint)
+                return {"success": True, "cached": True, "message": "Identical training run found, reusing its model",
+                        "training_log": cached_log}
         
         # Update project status
-        project_file = os.path.join('projects', f"{project_id}.json")
-        with open(project_file) as f:
-            project_data = json.load(f)
-        project_data['status'] = 'training'
-        project_data['training_started_at'] = datetime.utcnow().isoformat()
-        with open(project_file, 'w') as f:
-            json.dump(project_data, f, indent=2)
-    
-        cpu_limit = body.cpu_percent
-    
-        def run_training():
-            try:
-                with open(log_path, "w") as log_file:
-                    cmd = []
-                    # Check if cpulimit utility is available
-                    cpulimit_path = shutil.which("cpulimit")
-                    if 0 < cpu_limit < 100 and cpulimit_path is not None:
-                        cmd = [
-                            cpulimit_path, "-l", str(cpu_limit),
-                            "--", "python", "train_model.py", project_id
-                        ]
-                    else:
-                        cmd = ["python", "train_model.py", project_id]
-        
-                    proc = subprocess.Popen(
-                        cmd,
-                        cwd=os.path.dirname(__file__),
-                        stdout=log_file, stderr=log_file
-                    )
-                    with open(pid_path, "w") as f:
-                        f.write(str(proc.pid))
-                    
-                    # Wait for training to complete
-                    proc.wait()
-                    
-                    # Update project status
-                    with open(project_file) as f:
-                        project_data = json.load(f)
-                    project_data['status'] = 'completed' if proc.returncode == 0 else 'failed'
-                    project_data['training_completed_at'] = datetime.utcnow().isoformat()
-                    with open(project_file, 'w') as f:
-                        json.dump(project_data, f, indent=2)
-                    
-                    # Cleanup PID file
-                    if os.path.exists(pid_path):
-                        os.remove(pid_path)
-                        
-            except Exception as e:
-                logger.error("Training thread failed", project_id=project_id, error=str(e))
-                # Update project status to failed
-                try:
-                    with open(project_file) as f:
-                        project_data = json.load(f)
-                    project_data['status'] = 'failed'
-                    project_data['error'] = str(e)
-                    with open(project_file, 'w') as f:
-                        json.dump(project_data, f, indent=2)
-                except:
-                    pass
-                finally:
-                    if os.path.exists(pid_path):
-                        os.remove(pid_path)
-    
-        threading.Thread(target=run_training, daemon=True).start()
-        logger.info("Training started", username=current_user.username, project_id=project_id, cpu_percent=cpu_limit)
-        return {"success": True, "message": "Training started successfully"}
+        update_project_status(project_id, status='queued', cached_run=None, queued_at=datetime.utcnow().isoformat())
+        run_id = training_scheduler.enqueue(
+            project_id, current_user.username,
+            cpu_percent=body.cpu_percent, max_duration=body.max_duration, priority=body.priority,
+            options={"incremental": body.incremental, "resume": body.resume, "ensemble": body.ensemble,
+                     "screen": body.screen, "fingerprint": fingerprint},
+        )
+        queue_info = training_scheduler.queue_position(run_id)
+        logger.info("Training queued", username=current_user.username, project_id=project_id, run_id=run_id,
+                    cpu_percent=body.cpu_percent, max_duration=body.max_duration, status=queue_info["status"])
+        return {"success": True, "cached": False, "message": "Training queued successfully", **queue_info}
         
     except HTTPException:
         raise
@@ -466,22 +823,202 @@ async def train_project(
         raise HTTPException(500, "Training initialization failed")
 
 
+@app.get("/projects/{project_id}/queue")
+async def get_training_queue_position(project_id: str, current_user: User = Depends(get_current_active_user)):
+    """Queue position and estimated start time of the project's pending training run"""
+    try:
+        await verify_project_ownership(project_id, current_user)
+        run_id = training_scheduler.active_run(project_id)
+        if run_id is None:
+            return JSONResponse(status_code=404, content={"error": "No queued or running training"})
+        return training_scheduler.queue_position(run_id)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to get queue position", username=current_user.username, project_id=project_id, error=str(e))
+        raise HTTPException(status_code=500, detail="Failed to retrieve queue position")
+
+
+@app.get("/projects/{project_id}/runs")
+async def get_training_history(project_id: str, limit: int = 20,
+                               current_user: User = Depends(get_current_active_user)):
+    """Recent training runs of a project with their wall time, CPU time, peak memory and stage durations"""
+    try:
+        await verify_project_ownership(project_id, current_user)
+        if not 1 <= limit <= 200:
+            raise HTTPException(400, "limit must be between 1 and 200")
+        return {"project_id": project_id, "runs": training_scheduler.history(project_id, limit)}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to get training history", username=current_user.username, project_id=project_id, error=str(e))
+        raise HTTPException(status_code=500, detail="Failed to retrieve training history")
+
+
+def _control_local_training(action, project_id: str):
+    """Signal a job running in this API process; remote workers pick the change up from the database."""
+    if TRAINING_EXECUTOR != "local":
+        return
+    try:
+        action(project_id)
+    except (KeyError, ValueError, ProcessLookupError) as e:
+        raise HTTPException(409, f"Training process not controllable: {e}")
+
+@app.post("/projects/{project_id}/pause")
+async def pause_training(project_id: str, current_user: User = Depends(get_current_active_user)):
+    """Pause a running training job; it keeps its memory but gives up its CPU"""
+    try:
+        await verify_project_ownership(project_id, current_user)
+        run_id = training_scheduler.active_run(project_id)
+        if run_id is None or not training_scheduler.set_status(run_id, PAUSED, expected=[RUNNING]):
+            raise HTTPException(409, "No running training to pause")
+        try:
+            _control_local_training(process_manager.pause_training, project_id)
+        except HTTPException:
+            training_scheduler.set_status(run_id, RUNNING, expected=[PAUSED])
+            raise
+        update_project_status(project_id, status='paused', paused_at=datetime.utcnow().isoformat())
+        logger.info("Training paused", username=current_user.username, project_id=project_id, run_id=run_id)
+        return {"success": True, "run_id": run_id, "status": PAUSED}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to pause training", username=current_user.username, project_id=project_id, error=str(e))
+        raise HTTPException(status_code=500, detail="Failed to pause training")
+
+@app.post("/projects/{project_id}/resume")
+async def resume_training(project_id: str, current_user: User = Depends(get_current_active_user)):
+    """Resume a paused training job"""
+    try:
+        await verify_project_ownership(project_id, current_user)
+        run_id = training_scheduler.active_run(project_id)
+        try:
+            if run_id is None:
+                raise KeyError(project_id)
+            resumed = training_scheduler.resume(run_id)
+        except KeyError:
+            raise HTTPException(409, "No paused training to resume")
+        if not resumed:
+            # Other runs took the slot and cores it gave up while paused
+            raise HTTPException(409, "Not enough capacity to resume now; try again when a run finishes")
+        try:
+            _control_local_training(process_manager.resume_training, project_id)
+        except HTTPException:
+            training_scheduler.set_status(run_id, PAUSED, expected=[RUNNING])
+            raise
+        update_project_status(project_id, status='training', paused_at=None)
+        logger.info("Training resumed", username=current_user.username, project_id=project_id, run_id=run_id)
+        return {"success": True, "run_id": run_id, "status": RUNNING}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to resume training", username=current_user.username, project_id=project_id, error=str(e))
+        raise HTTPException(status_code=500, detail="Failed to resume training")
+
+@app.post("/projects/{project_id}/cancel")
+async def cancel_training(project_id: str, current_user: User = Depends(get_current_active_user)):
+    """Cancel a queued, running or paused training job"""
+    try:
+        await verify_project_ownership(project_id, current_user)
+        run_id = training_scheduler.active_run(project_id)
+        if run_id is None:
+            raise HTTPException(409, "No training to cancel")
+        if training_scheduler.set_status(run_id, CANCELLED, expected=[QUEUED]):
+            # Never started, nothing to stop
+            update_project_status(project_id, status=CANCELLED)
+        elif training_scheduler.set_status(run_id, CANCELLED, expected=[RUNNING, PAUSED]):
+            # The job gets SIGTERM to unwind; the training thread (or worker)
+            # kills it after the grace period and records the final status
+            if TRAINING_EXECUTOR == "local":
+                process_manager.cancel_training(project_id)
+            update_project_status(project_id, status='cancelling')
+        else:
+            raise HTTPException(409, "Training already finished")
+        logger.info("Training cancelled", username=current_user.username, project_id=project_id, run_id=run_id)
+        return {"success": True, "run_id": run_id, "status": CANCELLED}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to cancel training", username=current_user.username, project_id=project_id, error=str(e))
+        raise HTTPException(status_code=500, detail="Failed to cancel training")
+
+
+# Project statuses while a training run may still write output
+ACTIVE_TRAINING_STATUSES = ("queued", "training", "paused", "cancelling")
+
+def training_active(project_id: str) -> bool:
+    try:
+        with open(os.path.join("projects", f"{project_id}.json")) as f:
+            return json.load(f).get("status") in ACTIVE_TRAINING_STATUSES
+    except FileNotFoundError:
+        return False
+    except ValueError:
+        return True  # being rewritten; looked at again on the next poll
+
+# Most lines ?tail= returns
+LOG_TAIL_MAX_LINES = 10_000
+
+def _log_response(content: bytes, next_offset: int, status_code: int = 200, **headers) -> PlainTextResponse:
+    # Raw bytes, so offsets and Content-Range match the body even mid-character
+    return PlainTextResponse(content, status_code=status_code,
+                             headers={"X-Next-Offset": str(next_offset), "Accept-Ranges": "bytes", **headers})
+
+def read_log(log_path: str, offset: Optional[int], tail: Optional[int], range_header: Optional[str],
+             active: bool) -> PlainTextResponse:
+    size = os.path.getsize(log_path)
+    if range_header is not None:
+        byte_range = parse_range(range_header, size)
+        if byte_range is not None:
+            first, last = byte_range
+            if first >= size or first > last:
+                return PlainTextResponse("", status_code=416, headers={"Content-Range": f"bytes */{size}"})
+            with open(log_path, "rb") as f:
+                f.seek(first)
+                content = f.read(last - first + 1)
+            return _log_response(content, first + len(content), 206,
+                                 **{"Content-Range": f"bytes {first}-{first + len(content) - 1}/{size}"})
+    if tail is not None:
+        offset = tail_offset(log_path, tail)
+    if offset is not None:
+        # While the run writes, a partial last line is left for the next poll
+        content, next_offset = read_lines(log_path, offset, partial=not active)
+        return _log_response(content, next_offset)
+    with open(log_path, "rb") as f:
+        content = f.read()
+    return _log_response(content, len(content))
+
 @app.get("/projects/{project_id}/logs", response_class=PlainTextResponse)
-async def get_logs(project_id: str, current_user: User = Depends(get_current_active_user)):
-    """Get training logs for a project"""
+async def get_logs(project_id: str, request: Request, offset: Optional[int] = None, tail: Optional[int] = None,
+                   current_user: User = Depends(get_current_active_user)):
+    """Get training logs for a project.
+
+    ``?offset=`` returns what was written from that byte on, ``?tail=`` the
+    last lines, and a ``Range`` header the requested bytes. The
+    ``X-Next-Offset`` header says where to continue reading.
+    """
     try:
         # Verify project ownership
         await verify_project_ownership(project_id, current_user)
-        
+        if offset is not None and tail is not None:
+            raise HTTPException(400, "Use either offset or tail, not both")
+        if offset is not None and offset < 0:
+            raise HTTPException(400, "offset must not be negative")
+        if tail is not None and not 1 <= tail <= LOG_TAIL_MAX_LINES:
+            raise HTTPException(400, f"tail must be between 1 and {LOG_TAIL_MAX_LINES}")
+
         log_path = os.path.join("projects", project_id, "train.log")
         if not os.path.isfile(log_path):
             return PlainTextResponse("No training logs available yet.", status_code=200)
-        
-        with open(log_path, "r") as f:
-            content = f.read()
-        
+
+        response = await run_in_threadpool(read_log, log_path, offset, tail, request.headers.get("range"),
+                                           training_active(project_id))
         logger.info("Logs accessed", username=current_user.username, project_id=project_id)
-        return content
+        return response
         
     except HTTPException:
         raise
@@ -489,6 +1026,53 @@ async def get_logs(project_id: str, current_user: User = Depends(get_current_act
         logger.error("Failed to get logs", username=current_user.username, project_id=project_id, error=str(e))
         raise HTTPException(status_code=500, detail="Failed to retrieve logs")
 
+@app.get("/projects/{project_id}/progress")
+async def get_training_progress(project_id: str, offset: int = 0,
+                                current_user: User = Depends(get_current_active_user)):
+    """Progress events of the latest training run from byte ``offset``; poll again with the returned offset"""
+    try:
+        await verify_project_ownership(project_id, current_user)
+        if offset < 0:
+            raise HTTPException(400, "offset must not be negative")
+        events, next_offset = await run_in_threadpool(
+            read_events, os.path.join("projects", project_id, PROGRESS_FILENAME), offset)
+        return {"project_id": project_id, "events": events, "offset": next_offset}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to get training progress", username=current_user.username, project_id=project_id, error=str(e))
+        raise HTTPException(status_code=500, detail="Failed to retrieve training progress")
+
+@app.get("/projects/{project_id}/stream")
+async def stream_training(project_id: str, request: Request, log_offset: int = 0, progress_offset: int = 0,
+                          current_user: User = Depends(get_current_active_user)):
+    """Server-Sent Events with new train.log text and progress events until the run ends.
+
+    A reconnecting client sends ``Last-Event-ID`` (or the offsets from the
+    last event it got) and continues from there.
+    """
+    await verify_project_ownership(project_id, current_user)
+    last_event_id = request.headers.get("last-event-id")
+    try:
+        if last_event_id:
+            log_offset, progress_offset = parse_stream_id(last_event_id)
+        elif log_offset < 0 or progress_offset < 0:
+            raise ValueError("offsets must not be negative")
+    except ValueError as e:
+        raise HTTPException(400, f"Invalid stream position: {e}")
+
+    project_dir = os.path.join("projects", project_id)
+    logger.info("Training stream opened", username=current_user.username, project_id=project_id,
+                log_offset=log_offset, progress_offset=progress_offset)
+    return StreamingResponse(
+        stream_run(os.path.join(project_dir, "train.log"), os.path.join(project_dir, PROGRESS_FILENAME),
+                   log_offset, progress_offset, lambda: training_active(project_id)),
+        media_type="text/event-stream",
+        # Proxies must pass events through as they come
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 class PredictRequest(BaseModel):
     inputs: dict  # e.g. {"col1": 5, "col2": 3}
     
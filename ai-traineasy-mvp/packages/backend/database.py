@@ -1,7 +1,7 @@
 """
 Database models and configuration for AI TrainEasy MVP
 """
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy.sql import func
@@ -50,9 +50,12 @@ class Project(Base):
     
     # Relationships
     owner = relationship("User", back_populates="projects")
-    datasets = relationship("Dataset", back_populates="project")
-    models = relationship("Model", back_populates="project")
-    training_runs = relationship("TrainingRun", back_populates="project")
+    datasets = relationship("Dataset", back_populates="project",
+                          primaryjoin="Project.id == foreign(Dataset.project_id)")
+    models = relationship("Model", back_populates="project",
+                          primaryjoin="Project.id == foreign(Model.project_id)")
+    training_runs = relationship("TrainingRun", back_populates="project",
+                          primaryjoin="Project.id == foreign(TrainingRun.project_id)")
 
 class Dataset(Base):
     __tablename__ = "datasets"
@@ -65,13 +68,20 @@ class Dataset(Base):
     rows_count = Column(Integer, nullable=True)
     columns_count = Column(Integer, nullable=True)
     schema_json = Column(Text, nullable=True)  # JSON string of schema
+    sha256 = Column(String, nullable=True, index=True)  # content hash, shared by deduplicated uploads
+    profile_status = Column(String, default="pending")  # pending, running, completed, failed
+    profile_error = Column(Text, nullable=True)
+    profiled_at = Column(DateTime, nullable=True)
     uploaded_at = Column(DateTime, default=func.now())
     
-    # Foreign Keys
-    project_id = Column(String, ForeignKey("projects.id"))
+    # Projects live in projects/<id>.json, not the projects table, so this
+    # and the project_id of Model and TrainingRun are plain columns rather
+    # than foreign keys
+    project_id = Column(String, index=True)
     
     # Relationships
-    project = relationship("Project", back_populates="datasets")
+    project = relationship("Project", back_populates="datasets",
+                           primaryjoin="foreign(Dataset.project_id) == Project.id")
 
 class Model(Base):
     __tablename__ = "models"
@@ -85,29 +95,43 @@ class Model(Base):
     training_time = Column(Float, nullable=True)  # in seconds
     created_at = Column(DateTime, default=func.now())
     
-    # Foreign Keys
-    project_id = Column(String, ForeignKey("projects.id"))
+    project_id = Column(String, index=True)
     
     # Relationships
-    project = relationship("Project", back_populates="models")
+    project = relationship("Project", back_populates="models",
+                           primaryjoin="foreign(Model.project_id) == Project.id")
 
 class TrainingRun(Base):
     __tablename__ = "training_runs"
     
     id = Column(Integer, primary_key=True, index=True)
-    status = Column(String, default="started")  # started, running, completed, failed, paused
+    status = Column(String, default="queued", index=True)  # queued, running, completed, failed, paused
+    owner = Column(String, nullable=True, index=True)  # username that requested the run
+    priority = Column(Integer, default=0)  # higher runs first under the priority policy
     cpu_percent = Column(Integer, default=100)
+    max_duration = Column(Integer, nullable=True)  # wall-clock budget in seconds
+    options_json = Column(Text, nullable=True)  # JSON string of the remaining training options
     use_gpu = Column(Boolean, default=False)
-    start_time = Column(DateTime, default=func.now())
+    queued_at = Column(DateTime, default=func.now())
+    start_time = Column(DateTime, nullable=True)
     end_time = Column(DateTime, nullable=True)
     error_message = Column(Text, nullable=True)
     log_file_path = Column(String, nullable=True)
+    worker_id = Column(String, nullable=True)  # standalone worker holding the lease
+    heartbeat_at = Column(DateTime, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)  # another worker may reclaim the run after this
+    progress = Column(Text, nullable=True)  # latest training log line
+    result_json = Column(Text, nullable=True)  # JSON string of the training log summary
+    wall_seconds = Column(Float, nullable=True)  # measured from the job's start to its exit
+    cpu_seconds = Column(Float, nullable=True)  # summed over the job's process tree
+    peak_rss_mb = Column(Float, nullable=True)
+    stage_seconds_json = Column(Text, nullable=True)  # JSON string of seconds per training stage
     
-    # Foreign Keys
-    project_id = Column(String, ForeignKey("projects.id"))
+    project_id = Column(String, index=True)
     
     # Relationships
-    project = relationship("Project", back_populates="training_runs")
+    project = relationship("Project", back_populates="training_runs",
+                           primaryjoin="foreign(TrainingRun.project_id) == Project.id")
 
 # Database Dependency
 def get_db():
@@ -120,6 +144,36 @@ def get_db():
 # Create tables
 def create_tables():
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+
+def add_missing_columns():
+    """Bring tables created by an older version up to the current models.
+
+    ``create_all`` never alters existing tables; new columns are all nullable
+    or defaulted, so adding them in place keeps older databases usable. Their
+    indexes are created too, and foreign keys the models no longer declare
+    are dropped where the database enforces them (SQLite does not by default,
+    and cannot drop constraints).
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+            if engine.dialect.name == "sqlite":
+                continue
+            declared = {tuple(fk.parent.name for fk in constraint.elements)
+                        for constraint in table.foreign_key_constraints}
+            for fk in inspector.get_foreign_keys(table.name):
+                if fk.get("name") and tuple(fk["constrained_columns"]) not in declared:
+                    conn.execute(text(f'ALTER TABLE {table.name} DROP CONSTRAINT {fk["name"]}'))
 
 # Initialize database
 def init_db():
@@ -0,0 +1,166 @@
+"""
+Background profiling of uploaded datasets for AI TrainEasy MVP
+
+An upload is accepted as soon as its bytes are on disk. It is recorded as
+a ``datasets`` row with ``profile_status`` pending, and a worker thread
+fills in the row and column counts and the per-column schema, reading the
+file in chunks so large uploads never hold a request open.
+"""
+import os
+import json
+import queue
+import logging
+import threading
+from datetime import datetime
+from typing import Optional
+
+from database import SessionLocal, Dataset
+from utils.profiler import profile_file
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+# Dataset fields returned with a profile
+PROFILE_FIELDS = ("id", "filename", "original_filename", "file_size", "file_type", "sha256",
+                  "profile_status", "profile_error", "rows_count", "columns_count", "uploaded_at", "profiled_at")
+
+
+class ProfileQueue:
+    """Profile uploaded datasets one at a time on a background thread.
+
+    Profiling is not urgent and competes with training for CPU, so a single
+    thread works through the queue. A file with the same content as one
+    already profiled (a deduplicated upload) reuses that profile at once.
+    """
+
+    def __init__(self, session_factory=SessionLocal, projects_dir: str = "projects"):
+        self.session_factory = session_factory
+        self.projects_dir = projects_dir
+        self._queue: "queue.Queue[Optional[int]]" = queue.Queue()
+
+    def add(self, project_id: str, filename: str, original_filename: str, file_size: int,
+            sha256: Optional[str] = None) -> dict:
+        """Record an uploaded data file and queue it for profiling; returns its status."""
+        db = self.session_factory()
+        try:
+            dataset = Dataset(project_id=project_id, filename=filename, original_filename=original_filename,
+                              file_size=file_size, file_type=os.path.splitext(filename)[1].lstrip(".").lower(),
+                              sha256=sha256, profile_status=PENDING)
+            known = sha256 and (db.query(Dataset)
+                                .filter(Dataset.sha256 == sha256, Dataset.profile_status == COMPLETED)
+                                .first())
+            if known:
+                dataset.rows_count, dataset.columns_count = known.rows_count, known.columns_count
+                dataset.schema_json, dataset.profiled_at = known.schema_json, datetime.utcnow()
+                dataset.profile_status = COMPLETED
+            db.add(dataset)
+            db.commit()
+            if not known:
+                self._queue.put(dataset.id)
+            return self._describe(dataset)
+        finally:
+            db.close()
+
+    def get(self, project_id: str, dataset_id: int) -> Optional[dict]:
+        """The dataset's profile status, with its schema once profiling completed."""
+        db = self.session_factory()
+        try:
+            dataset = db.get(Dataset, dataset_id)
+            if dataset is None or dataset.project_id != project_id:
+                return None
+            entry = self._describe(dataset)
+            entry["schema"] = json.loads(dataset.schema_json) if dataset.schema_json else None
+            return entry
+        finally:
+            db.close()
+
+    def for_project(self, project_id: str) -> list:
+        db = self.session_factory()
+        try:
+            datasets = db.query(Dataset).filter(Dataset.project_id == project_id).order_by(Dataset.id).all()
+            return [self._describe(dataset) for dataset in datasets]
+        finally:
+            db.close()
+
+    def digests(self, project_id: str) -> dict:
+        """``{filename: sha256}`` recorded at upload for the project's data files.
+
+        A file whose size no longer matches its upload is left out, so
+        its content gets hashed afresh.
+        """
+        db = self.session_factory()
+        try:
+            datasets = (db.query(Dataset)
+                        .filter(Dataset.project_id == project_id, Dataset.sha256.isnot(None)).all())
+        finally:
+            db.close()
+        data_dir = os.path.join(self.projects_dir, project_id, "data")
+        digests = {}
+        for dataset in datasets:
+            try:
+                if os.path.getsize(os.path.join(data_dir, dataset.filename)) == dataset.file_size:
+                    digests[dataset.filename] = dataset.sha256
+            except FileNotFoundError:
+                continue
+        return digests
+
+    @staticmethod
+    def _describe(dataset: Dataset) -> dict:
+        entry = {field: getattr(dataset, field) for field in PROFILE_FIELDS}
+        entry.update({k: v.isoformat() for k, v in entry.items() if isinstance(v, datetime)})
+        return entry
+
+    def profile(self, dataset_id: int) -> None:
+        db = self.session_factory()
+        try:
+            dataset = db.get(Dataset, dataset_id)
+            if dataset is None:
+                return
+            dataset.profile_status = RUNNING
+            db.commit()
+            path = os.path.join(self.projects_dir, dataset.project_id, "data", dataset.filename)
+            try:
+                profile = profile_file(path)
+            except Exception as e:
+                logger.warning("Profiling dataset %s failed: %s", dataset_id, e)
+                dataset.profile_status, dataset.profile_error = FAILED, str(e)
+            else:
+                dataset.rows_count = profile["rows"]
+                dataset.columns_count = len(profile["columns"])
+                dataset.schema_json = json.dumps(profile["columns"], default=str)
+                dataset.profile_status, dataset.profile_error = COMPLETED, None
+            dataset.profiled_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+    def recover(self) -> None:
+        """Queue again the datasets a previous API process had not finished profiling."""
+        db = self.session_factory()
+        try:
+            unfinished = (db.query(Dataset)
+                          .filter(Dataset.profile_status.in_((PENDING, RUNNING)))
+                          .order_by(Dataset.id).all())
+            for dataset in unfinished:
+                dataset.profile_status = PENDING
+                self._queue.put(dataset.id)
+            db.commit()
+        finally:
+            db.close()
+
+    def _work(self) -> None:
+        while (dataset_id := self._queue.get()) is not None:
+            try:
+                self.profile(dataset_id)
+            except Exception as e:
+                logger.error("Profiling dataset %s failed: %s", dataset_id, e)
+
+    def start(self) -> None:
+        self.recover()
+        threading.Thread(target=self._work, daemon=True).start()
+
+    def stop(self) -> None:
+        self._queue.put(None)
@@ -15,11 +15,12 @@ from typing import Optional, List, Dict, Any
 try:
     import pandas as pd
     import joblib
-    from fastapi import FastAPI, Request, File, UploadFile, HTTPException, Form
+    from fastapi import FastAPI, Request, File, UploadFile, HTTPException, Form, BackgroundTasks
     from fastapi.middleware.cors import CORSMiddleware
     from fastapi.responses import JSONResponse, FileResponse
     from pydantic import BaseModel
     import uvicorn
+    from utils.profiler import profile_file
 except ImportError as e:
     print(f"Missing required package: {e}")
     print("Installing basic requirements...")
@@ -212,9 +213,33 @@ async def create_project(request: Request, project_data: ProjectCreate):
         logger.error(f"Project creation failed: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to create project: {str(e)}")
 
+def write_file_info(data_dir: Path, filename: str, file_info: dict):
+    """Save a file's info atomically, so a reader never sees it half written"""
+    info_path = data_dir / f"{filename}.info.json"
+    tmp_path = data_dir / f"{filename}.info.json.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(file_info, f, indent=2)
+    os.replace(tmp_path, info_path)
+
+def profile_upload(data_dir: Path, filename: str, file_info: dict):
+    """Background job: add rows, columns and dtypes to an uploaded file's info"""
+    try:
+        profile = profile_file(str(data_dir / filename))
+        file_info.update({
+            "rows": profile["rows"],
+            "columns": list(profile["columns"]),
+            "data_types": {name: column["dtype"] for name, column in profile["columns"].items()},
+            "profile_status": "completed"
+        })
+    except Exception as e:
+        logger.warning(f"Could not profile {filename}: {e}")
+        file_info.update({"profile_status": "failed", "profile_error": str(e)})
+    write_file_info(data_dir, filename, file_info)
+
 # File handling endpoints - FIXED
 @app.post("/projects/{project_id}/upload")
-async def upload_file(project_id: str, request: Request, file: UploadFile = File(...)):
+async def upload_file(project_id: str, request: Request, background_tasks: BackgroundTasks,
+                      file: UploadFile = File(...)):
     """Upload file to project - FIXED to actually save files"""
     try:
         project_dir = Path("projects") / project_id
@@ -231,7 +256,6 @@ async def upload_file(project_id: str, request: Request, file: UploadFile = File
             content = await file.read()
             buffer.write(content)
         
-        # If it's a CSV, try to analyze it
         file_info = {
             "filename": file.filename,
             "size": len(content),
@@ -239,20 +263,14 @@ async def upload_file(project_id: str, request: Request, file: UploadFile = File
             "path": str(file_path)
         }
         
-        if file.filename.endswith('.csv'):
-            try:
-                df = pd.read_csv(file_path)
-                file_info.update({
-                    "rows": len(df),
-                    "columns": list(df.columns.tolist()),
-                    "data_types": df.dtypes.astype(str).to_dict()
-                })
-            except Exception as e:
-                logger.warning(f"Could not analyze CSV: {e}")
+        # Datasets are profiled after the response is sent, in chunks,
+        # so large uploads do not time out
+        if file.filename.endswith(('.csv', '.json')):
+            file_info["profile_status"] = "pending"
+            background_tasks.add_task(profile_upload, data_dir, file.filename, dict(file_info))
         
         # Save file info
-        with open(data_dir / f"{file.filename}.info.json", 'w') as f:
-            json.dump(file_info, f, indent=2)
+        write_file_info(data_dir, file.filename, file_info)
         
         logger.info(f"File uploaded: {project_id}/{file.filename}")
         return {
@@ -279,7 +297,7 @@ async def list_project_files(project_id: str, request: Request):
         
         if data_dir.exists():
             for file_path in data_dir.iterdir():
-                if file_path.is_file() and not file_path.name.endswith('.info.json'):
+                if file_path.is_file() and not file_path.name.endswith(('.info.json', '.info.json.tmp')):
                     file_info = {
                         "filename": file_path.name,
                         "size": file_path.stat().st_size,
@@ -307,6 +325,16 @@ async def list_project_files(project_id: str, request: Request):
         logger.error(f"Failed to list files: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/projects/{project_id}/files/{filename}/profile")
+async def get_file_profile(project_id: str, filename: str, request: Request):
+    """Profiling status of an uploaded file, with rows, columns and dtypes once completed"""
+    info_file = Path("projects") / project_id / "data" / f"{Path(filename).name}.info.json"
+    if not info_file.exists():
+        raise HTTPException(status_code=404, detail="File not found")
+    with open(info_file, 'r') as f:
+        file_info = json.load(f)
+    return {"success": True, "profile_status": file_info.get("profile_status"), "file_info": file_info}
+
 # Model management endpoints - FIXED
 @app.get("/projects/{project_id}/models")
 async def list_project_models(project_id: str, request: Request):
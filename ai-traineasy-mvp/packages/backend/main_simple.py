@@ -15,6 +15,7 @@ import joblib
 import pandas as pd
 import subprocess
 from fastapi.responses import PlainTextResponse, JSONResponse
+from fastapi.concurrency import run_in_threadpool
 import signal
 from huggingface_hub import snapshot_download
 import requests
@@ -24,6 +25,9 @@ from typing import Optional
 
 # Import invitation system
 from invitation_system import invitation_manager
+from utils.uploads import StreamingUpload, InvalidUpload, UPLOAD_CHUNK_BYTES
+from utils.resources import plan_resources
+from utils.isolation import CoreAllocator, memory_share_mb
 
 # Authentication middleware
 def require_valid_session(request: Request):
@@ -464,33 +468,24 @@ async def upload_dataset(project_id: str, file: UploadFile = File(...)):
         safe_filename = f"{timestamp}_{file.filename}"
         file_path = os.path.join(data_dir, safe_filename)
         
-        contents = await file.read()
-        
-        # Basic content validation
-        if len(contents) == 0:
-            raise HTTPException(status_code=400, detail="Empty file")
-        
-        # File size limit (100MB)
-        if len(contents) > 100 * 1024 * 1024:
-            raise HTTPException(status_code=413, detail="File too large (max 100MB)")
-        
-        # Validate file format
-        try:
-            file_extension = os.path.splitext(file.filename)[1].lower()
-            if file_extension == '.json':
-                json.loads(contents.decode('utf-8'))
-            elif file_extension == '.csv':
-                content_str = contents.decode('utf-8')
-                if not content_str.strip():
+        # Stream to a temporary file, validating chunk by chunk, so memory
+        # per upload stays constant whatever the file size
+        file_extension = os.path.splitext(file.filename)[1].lower()
+        with StreamingUpload(file_path, file_extension.lstrip('.')) as upload:
+            try:
+                while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                    # File size limit (100MB)
+                    if upload.size + len(chunk) > 100 * 1024 * 1024:
+                        raise HTTPException(status_code=413, detail="File too large (max 100MB)")
+                    await run_in_threadpool(upload.write, chunk)
+                if upload.size == 0:
                     raise HTTPException(status_code=400, detail="Empty file")
-        except (json.JSONDecodeError, UnicodeDecodeError) as e:
-            raise HTTPException(status_code=400, detail="Invalid file format")
-        
-        with open(file_path, 'wb') as f:
-            f.write(contents)
+                sha256 = await run_in_threadpool(upload.commit)
+            except InvalidUpload as e:
+                raise HTTPException(status_code=400, detail=f"Invalid file format: {e}")
 
-        logger.info(f"Dataset uploaded: {project_id} - {file.filename} ({len(contents)} bytes)")
-        return {"success": True, "filename": file.filename, "size": len(contents)}
+        logger.info(f"Dataset uploaded: {project_id} - {file.filename} ({upload.size} bytes, sha256 {sha256})")
+        return {"success": True, "filename": file.filename, "size": upload.size, "sha256": sha256}
         
     except HTTPException:
         raise
@@ -534,6 +529,9 @@ async def save_schema(project_id: str, request: Request):
         logger.error(f"Schema save failed: {project_id} - {e}")
         raise HTTPException(status_code=500, detail="Failed to save schema")
 
+# Hands each training job its own cores
+core_allocator = CoreAllocator()
+
 @app.post("/projects/{project_id}/train")
 async def train_project(project_id: str, body: TrainRequest):
     """Start training for a project"""
@@ -575,18 +573,12 @@ async def train_project(project_id: str, body: TrainRequest):
         cpu_limit = body.cpu_percent
     
         def run_training():
+            # Concurrent jobs get disjoint cores and the matching share of memory
+            cores = core_allocator.acquire(project_id, plan_resources(cpu_limit).cores)
             try:
                 with open(log_path, "w") as log_file:
-                    cmd = []
-                    # Check if cpulimit utility is available
-                    cpulimit_path = shutil.which("cpulimit")
-                    if 0 < cpu_limit < 100 and cpulimit_path is not None:
-                        cmd = [
-                            cpulimit_path, "-l", str(cpu_limit),
-                            "--", "python", "train_model.py", project_id
-                        ]
-                    else:
-                        cmd = ["python", "train_model.py", project_id]
+                    cmd = ["python", "train_model.py", project_id, "--cpu-percent", str(cpu_limit),
+                           "--cores", ",".join(map(str, cores)), "--memory-mb", str(memory_share_mb(len(cores)))]
         
                     proc = subprocess.Popen(
                         cmd,
@@ -630,6 +622,8 @@ async def train_project(project_id: str, body: TrainRequest):
                 finally:
                     if os.path.exists(pid_path):
                         os.remove(pid_path)
+            finally:
+                core_allocator.release(project_id)
     
         threading.Thread(target=run_training, daemon=True).start()
         logger.info(f"Training started: {project_id} (CPU: {cpu_limit}%)")
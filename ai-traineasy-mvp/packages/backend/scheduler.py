@@ -0,0 +1,411 @@
+"""
+Persistent training queue for AI TrainEasy MVP
+
+Runs are rows in the ``training_runs`` table. Queued runs are started in
+FIFO or priority order while global and per-user concurrency caps, free
+cores and free memory allow.
+"""
+import os
+import json
+import socket
+import uuid
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+import psutil
+from sqlalchemy import and_, func, or_, select, text
+from sqlalchemy.orm import aliased
+
+from database import SessionLocal, TrainingRun
+from utils.resources import plan_resources, available_cores
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+PAUSED = "paused"
+CANCELLED = "cancelled"
+POLICIES = ("fifo", "priority")
+
+# A run whose API process stops renewing its lease for this long (the
+# process died) is requeued by another, or by the restarted process
+LEASE_SECONDS = 60
+
+# Memory a training process needs regardless of its data
+BASE_MEMORY_MB = 512
+# Peak training memory relative to the size of the data files on disk
+# (parsed frame, encoded matrix and per-fold copies)
+MEMORY_PER_DATA_BYTE = 10
+# Assumed run length until finished runs give something better
+DEFAULT_RUN_SECONDS = 600
+# Finished runs averaged for the start-time estimate
+DURATION_HISTORY = 20
+# Run fields returned by the history
+HISTORY_FIELDS = ("id", "status", "owner", "priority", "cpu_percent", "max_duration", "worker_id",
+                  "queued_at", "start_time", "end_time", "error_message",
+                  "wall_seconds", "cpu_seconds", "peak_rss_mb")
+
+
+class TrainingScheduler:
+    """Start queued training runs as capacity frees up.
+
+    ``launch(run_id, project_id, options)`` must start the run without
+    blocking and eventually call :meth:`finished`; without it the scheduler
+    only queues and standalone workers (``worker.py``) claim the runs.
+
+    A run only starts when fewer than ``max_concurrent`` runs (and fewer
+    than ``max_per_user`` of its owner's) are running, and the cores its
+    ``cpu_percent`` plans for plus the memory its data needs are free.
+    Paused runs are stopped and hold no CPU, so they do not count. The head
+    of the queue is never overtaken for lack of resources, so large runs
+    cannot starve; a run is always admitted when nothing else is running.
+
+    Several API processes may share the queue. Each run is claimed with a
+    conditional ``UPDATE``, so only one process starts it, and holds a lease
+    that process renews while polling; only runs whose lease expired are
+    taken back from a process.
+    """
+
+    def __init__(self, launch: Optional[Callable[[int, str, dict], None]], session_factory=SessionLocal,
+                 max_concurrent: int = 2, max_per_user: int = 1, policy: str = "fifo",
+                 poll_seconds: float = 5, projects_dir: str = "projects", lease_seconds: float = LEASE_SECONDS,
+                 scheduler_id: Optional[str] = None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy {policy!r}; expected one of {POLICIES}")
+        self.launch = launch
+        self.session_factory = session_factory
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.policy = policy
+        self.poll_seconds = poll_seconds
+        self.projects_dir = projects_dir
+        self.lease_seconds = lease_seconds
+        # Unique per process: a restarted container often gets the same host name and pid
+        self.scheduler_id = scheduler_id or f"api:{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def _queued(self, db):
+        query = db.query(TrainingRun).filter(TrainingRun.status == QUEUED)
+        if self.policy == "priority":
+            query = query.order_by(TrainingRun.priority.desc())
+        return query.order_by(TrainingRun.queued_at, TrainingRun.id).all()
+
+    def enqueue(self, project_id: str, owner: str, cpu_percent: int, max_duration: int,
+                options: dict, priority: int = 0) -> int:
+        """Add a run to the queue and start it right away if there is room."""
+        db = self.session_factory()
+        try:
+            run = TrainingRun(
+                project_id=project_id, owner=owner, status=QUEUED, priority=priority,
+                cpu_percent=cpu_percent, max_duration=max_duration,
+                options_json=json.dumps(options), queued_at=datetime.utcnow(),
+                log_file_path=os.path.join(self.projects_dir, project_id, "train.log"),
+            )
+            db.add(run)
+            db.commit()
+            run_id = run.id
+        finally:
+            db.close()
+        self.dispatch()
+        return run_id
+
+    def active_run(self, project_id: str) -> Optional[int]:
+        """Id of the project's queued, running or paused run, if any."""
+        db = self.session_factory()
+        try:
+            run = (db.query(TrainingRun)
+                   .filter(TrainingRun.project_id == project_id,
+                           TrainingRun.status.in_([QUEUED, RUNNING, PAUSED]))
+                   .first())
+            return run.id if run else None
+        finally:
+            db.close()
+
+    def set_status(self, run_id: int, status: str, expected) -> bool:
+        """Move a run to ``status`` if it is currently in one of ``expected``."""
+        db = self.session_factory()
+        try:
+            values = {"status": status}
+            if status == CANCELLED:
+                values["end_time"] = datetime.utcnow()
+            updated = (db.query(TrainingRun)
+                       .filter(TrainingRun.id == run_id, TrainingRun.status.in_(expected))
+                       .update(values, synchronize_session=False))
+            db.commit()
+        finally:
+            db.close()
+        if updated:
+            self.dispatch()
+        return bool(updated)
+
+    def finished(self, run_id: int, status: str, error: Optional[str] = None) -> None:
+        db = self.session_factory()
+        try:
+            run = db.get(TrainingRun, run_id)
+            if run is not None:
+                if run.status == CANCELLED:
+                    status = CANCELLED  # the job's exit code only reflects how it was stopped
+                run.status = status
+                run.end_time = datetime.utcnow()
+                run.error_message = error
+                db.commit()
+        finally:
+            db.close()
+        self.dispatch()
+
+    def _data_bytes(self, project_id: str) -> int:
+        data_dir = os.path.join(self.projects_dir, project_id, "data")
+        if not os.path.isdir(data_dir):
+            return 0
+        return sum(entry.stat().st_size for entry in os.scandir(data_dir) if entry.is_file())
+
+    def _admit(self, run: TrainingRun, running, check_memory: bool = True) -> bool:
+        if not running:
+            return True
+        host_cores = available_cores()
+        reserved = sum(plan_resources(r.cpu_percent, host_cores=host_cores).cores for r in running)
+        needed = plan_resources(run.cpu_percent, host_cores=host_cores).cores
+        if reserved + needed > host_cores:
+            return False
+        if not check_memory:
+            return True
+        needed_mb = BASE_MEMORY_MB + self._data_bytes(run.project_id) * MEMORY_PER_DATA_BYTE / (1024 * 1024)
+        return psutil.virtual_memory().available / (1024 * 1024) >= needed_mb
+
+    def _within_caps(self, run: TrainingRun, running) -> bool:
+        return (len(running) < self.max_concurrent
+                and sum(r.owner == run.owner for r in running) < self.max_per_user)
+
+    def resume(self, run_id: int) -> bool:
+        """Move a paused run back to running if the caps and free cores allow it now.
+
+        Pausing gave up the run's slot, and other runs may have been started
+        in it since. The stopped process kept its memory, so only the caps
+        and cores are checked. Returns False when there is no room; raises
+        ``KeyError`` if the run is not paused.
+        """
+        with self._lock:
+            db = self.session_factory()
+            try:
+                run = db.get(TrainingRun, run_id)
+                if run is None or run.status != PAUSED:
+                    raise KeyError(run_id)
+                running = db.query(TrainingRun).filter(TrainingRun.status == RUNNING).all()
+                if not (self._within_caps(run, running) and self._admit(run, running, check_memory=False)):
+                    return False
+                updated = (db.query(TrainingRun)
+                           .filter(TrainingRun.id == run_id, TrainingRun.status == PAUSED)
+                           .update({"status": RUNNING}, synchronize_session=False))
+                db.commit()
+                if not updated:
+                    raise KeyError(run_id)
+                return True
+            finally:
+                db.close()
+
+    def runnable(self, db):
+        """Queued runs the concurrency caps allow to start, in queue order.
+
+        Yields ``(run, running)``; callers that start a run append it to
+        ``running`` so the caps account for it.
+        """
+        running = db.query(TrainingRun).filter(TrainingRun.status == RUNNING).all()
+        for run in self._queued(db):
+            if len(running) >= self.max_concurrent:
+                return
+            if sum(r.owner == run.owner for r in running) >= self.max_per_user:
+                continue
+            yield run, running
+
+    def has_capacity(self, owner: Optional[str]):
+        """Condition that the concurrency caps still allow another run of ``owner``.
+
+        Evaluated inside the claiming UPDATE, so two claimers that both saw a
+        free slot cannot both take it.
+        """
+        other = aliased(TrainingRun)
+        running = select(func.count()).select_from(other).where(other.status == RUNNING).scalar_subquery()
+        owned = (select(func.count()).select_from(other)
+                 .where(other.status == RUNNING, other.owner == owner).scalar_subquery())
+        return and_(running < self.max_concurrent, owned < self.max_per_user)
+
+    def claim(self, db, run: TrainingRun, **values) -> bool:
+        """Move queued ``run`` to running with ``values``; ``False`` if another claimer won it.
+
+        A conditional ``UPDATE ... WHERE status = 'queued'`` that also counts
+        the running runs again, so exactly one claimer wins on any database.
+        """
+        if db.bind.dialect.name == "postgresql":
+            # Statements see only committed rows; serialize claimers so
+            # the capacity condition counts each other's claims
+            db.execute(text("LOCK TABLE training_runs IN SHARE ROW EXCLUSIVE MODE"))
+        claimed = (db.query(TrainingRun)
+                   .filter(TrainingRun.id == run.id, TrainingRun.status == QUEUED, self.has_capacity(run.owner))
+                   .update(dict(values, status=RUNNING, start_time=datetime.utcnow()), synchronize_session=False))
+        db.commit()
+        if claimed:
+            db.refresh(run)
+        return bool(claimed)
+
+    def _lease(self) -> dict:
+        now = datetime.utcnow()
+        return {"worker_id": self.scheduler_id, "heartbeat_at": now,
+                "lease_expires_at": now + timedelta(seconds=self.lease_seconds)}
+
+    def renew_leases(self) -> None:
+        """Extend the lease on every run this process is training."""
+        db = self.session_factory()
+        try:
+            (db.query(TrainingRun)
+             .filter(TrainingRun.worker_id == self.scheduler_id, TrainingRun.status.in_([RUNNING, PAUSED]))
+             .update(self._lease(), synchronize_session=False))
+            db.commit()
+        finally:
+            db.close()
+
+    def dispatch(self) -> None:
+        """Start as many queued runs as the caps and free resources allow."""
+        if self.launch is None:
+            return  # runs are claimed by standalone workers (worker.py)
+        with self._lock:
+            db = self.session_factory()
+            try:
+                for run, running in self.runnable(db):
+                    if not self._admit(run, running):
+                        break
+                    if not self.claim(db, run, **self._lease()):
+                        continue  # started by another API process, or it took the last slot
+                    running.append(run)
+                    logger.info("Starting training run %d for project %s", run.id, run.project_id)
+                    try:
+                        self.launch(run.id, run.project_id, self.options(run))
+                    except Exception as e:
+                        logger.error("Failed to launch training run %d: %s", run.id, e)
+                        run.status, run.error_message, run.end_time = "failed", str(e), datetime.utcnow()
+                        db.commit()
+                        running.remove(run)
+            finally:
+                db.close()
+
+    @staticmethod
+    def options(run: TrainingRun) -> dict:
+        """Keyword arguments for training: stored options plus CPU share and budget."""
+        options = json.loads(run.options_json or "{}")
+        options.update(cpu_percent=run.cpu_percent, max_duration=run.max_duration)
+        return options
+
+    def _typical_seconds(self, db) -> float:
+        runs = (db.query(TrainingRun)
+                .filter(TrainingRun.start_time.isnot(None), TrainingRun.end_time.isnot(None))
+                .order_by(TrainingRun.end_time.desc())
+                .limit(DURATION_HISTORY).all())
+        if not runs:
+            return DEFAULT_RUN_SECONDS
+        # Measured wall time where the run was accounted, timestamps otherwise
+        return sum(r.wall_seconds or (r.end_time - r.start_time).total_seconds() for r in runs) / len(runs)
+
+    def queue_position(self, run_id: int) -> Optional[dict]:
+        """Status of a run and, while it is queued, its place and estimated start time.
+
+        The estimate plays the queue forward over ``max_concurrent`` slots,
+        giving every run the recent average duration (capped at its budget).
+        """
+        db = self.session_factory()
+        try:
+            run = db.get(TrainingRun, run_id)
+            if run is None:
+                return None
+            info = {"run_id": run.id, "status": run.status, "queue_position": None,
+                    "estimated_start": run.start_time.isoformat() if run.start_time else None}
+            if run.status != QUEUED:
+                return info
+
+            now = datetime.utcnow()
+            typical = self._typical_seconds(db)
+
+            def duration(r):
+                return timedelta(seconds=min(typical, r.max_duration or typical))
+
+            running = db.query(TrainingRun).filter(TrainingRun.status == RUNNING).all()
+            slots = [max(now, r.start_time + duration(r)) for r in running if r.start_time]
+            slots += [now] * max(0, self.max_concurrent - len(slots))
+            for position, queued in enumerate(self._queued(db), start=1):
+                slots.sort()
+                if queued.id == run.id:
+                    info.update(queue_position=position, estimated_start=slots[0].isoformat())
+                    break
+                slots[0] += duration(queued)
+            return info
+        finally:
+            db.close()
+
+    def history(self, project_id: str, limit: int = 20) -> list:
+        """The project's most recent runs with the resources each used."""
+        db = self.session_factory()
+        try:
+            runs = (db.query(TrainingRun)
+                    .filter(TrainingRun.project_id == project_id)
+                    .order_by(TrainingRun.id.desc())
+                    .limit(limit).all())
+            history = []
+            for run in runs:
+                entry = {field: getattr(run, field) for field in HISTORY_FIELDS}
+                entry.update({k: v.isoformat() for k, v in entry.items() if isinstance(v, datetime)})
+                entry["stage_seconds"] = json.loads(run.stage_seconds_json) if run.stage_seconds_json else None
+                history.append(entry)
+            return history
+        finally:
+            db.close()
+
+    def recover(self) -> int:
+        """Requeue runs left running or paused by an API process that died.
+
+        A run is only taken back once its lease expired (or if it has none,
+        being started before leases were recorded), so runs of API processes
+        that are still alive are left alone. Their training died with that
+        process; they resume from whatever stage checkpoint it left behind.
+        """
+        db = self.session_factory()
+        try:
+            lease = TrainingRun.lease_expires_at
+            interrupted = (db.query(TrainingRun)
+                           .filter(TrainingRun.status.in_([RUNNING, PAUSED]),
+                                   or_(lease.is_(None), lease < datetime.utcnow()))
+                           .all())
+            requeued = 0
+            for run in interrupted:
+                options = json.loads(run.options_json or "{}")
+                options["resume"] = True
+                held = lease.is_(None) if run.lease_expires_at is None else lease == run.lease_expires_at
+                requeued += (db.query(TrainingRun)
+                             .filter(TrainingRun.id == run.id, TrainingRun.status.in_([RUNNING, PAUSED]), held)
+                             .update({"status": QUEUED, "worker_id": None, "lease_expires_at": None,
+                                      "start_time": None, "options_json": json.dumps(options)},
+                                     synchronize_session=False))
+                logger.warning("Requeued interrupted training run %d held by %s", run.id, run.worker_id)
+            db.commit()
+            return requeued
+        finally:
+            db.close()
+
+    def start(self) -> None:
+        if self.launch is None:
+            return  # workers reclaim runs whose lease expired
+        self.recover()
+        threading.Thread(target=self._poll, daemon=True).start()
+
+    def _poll(self) -> None:
+        # Freed memory or cores do not trigger a dispatch by themselves
+        while not self._stopped.wait(self.poll_seconds):
+            try:
+                self.renew_leases()
+                self.recover()
+                self.dispatch()
+            except Exception as e:
+                logger.error("Training dispatch failed: %s", e)
+
+    def stop(self) -> None:
+        self._stopped.set()
@@ -3,4 +3,32 @@ from pathlib import Path
 
 # Add project root to Python path
 root_dir = Path(__file__).parent.parent
-sys.path.append(str(root_dir))
\ No newline at end of file
+sys.path.append(str(root_dir))
+
+import json
+import pytest
+
+
+@pytest.fixture
+def training_project(tmp_path, monkeypatch):
+    """A small classification project laid out the way train_model.py expects."""
+    import numpy as np
+    import pandas as pd
+
+    monkeypatch.chdir(tmp_path)
+    project_id = "test-project"
+    data_dir = tmp_path / "projects" / project_id / "data"
+    data_dir.mkdir(parents=True)
+
+    rng = np.random.default_rng(0)
+    n = 600
+    df = pd.DataFrame({
+        "a": rng.normal(size=n),
+        "b": rng.normal(size=n),
+        "c": rng.choice(["x", "y", "z"], n),
+    })
+    df["target"] = np.where(df.a * df.b + (df.c == "x") > 0.5, "yes", "no")
+    df.to_csv(data_dir / "1_data.csv", index=False)
+    with open(tmp_path / "projects" / project_id / "schema.json", "w") as f:
+        json.dump({"inputs": ["a", "b", "c"], "output": "target"}, f)
+    return project_id
@@ -0,0 +1,39 @@
+import subprocess
+import sys
+
+from utils.accounting import ResourceAccountant, StageTimer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_stage_timer_accumulates_per_stage():
+    clock = FakeClock()
+    stages = StageTimer(clock=clock)
+    stages.start("load")
+    clock.now = 2
+    stages.start("cv")
+    clock.now = 5
+    stages.start("load")
+    clock.now = 6
+    stages.stop()
+    stages.stop()
+    assert stages.seconds == {"load": 3, "cv": 3}
+
+
+def test_accountant_counts_cpu_of_the_whole_tree():
+    # The parent idles while a child burns CPU, like a job and its fold workers
+    burn = "import time\nend = time.process_time() + 1.5\nwhile time.process_time() < end: pass"
+    proc = subprocess.Popen([sys.executable, "-c",
+                             f"import subprocess, sys; subprocess.run([sys.executable, '-c', {burn!r}])"])
+    accountant = ResourceAccountant(proc.pid, interval=0.1).start()
+    proc.wait()
+    usage = accountant.stop()
+    assert usage.cpu_seconds >= 1.0
+    assert usage.peak_rss_mb > 0
+    assert usage.samples > 5
@@ -0,0 +1,50 @@
+import hashlib
+import os
+
+import pytest
+
+from utils.blobs import blob_path, refcount, link_owned_blob, store_blob, collect_blobs
+
+
+def _write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_identical_uploads_share_one_blob(tmp_path):
+    root = str(tmp_path / "blobs")
+    data = b"a,b\n1,2\n"
+    sha256 = hashlib.sha256(data).hexdigest()
+    first = _write(tmp_path / "p1" / "data" / "1_d.csv", data)
+    second = _write(tmp_path / "p2" / "data" / "2_d.csv", data)
+
+    assert store_blob(root, first, sha256) is False
+    assert store_blob(root, second, sha256) is True
+    assert os.stat(first).st_ino == os.stat(second).st_ino == os.stat(blob_path(root, sha256)).st_ino
+    assert refcount(root, sha256) == 2
+
+    third = str(tmp_path / "p3" / "3_d.csv")
+    os.makedirs(os.path.dirname(third))
+    # Only someone whose data already holds the content may link to it by digest
+    assert link_owned_blob(root, sha256, third, [str(tmp_path / "p3"), str(tmp_path / "p9")]) is None
+    assert not os.path.exists(third)
+    assert link_owned_blob(root, sha256, third, [str(tmp_path / "p2" / "data")]) == len(data)
+    assert open(third, "rb").read() == data
+    assert link_owned_blob(root, "0" * 64, third + ".x", [str(tmp_path / "p2" / "data")]) is None
+    with pytest.raises(ValueError):
+        blob_path(root, "../../etc/passwd")
+
+
+def test_unreferenced_blobs_are_collected(tmp_path):
+    root = str(tmp_path / "blobs")
+    kept, dropped = b"kept\n", b"dropped\n"
+    path = _write(tmp_path / "p1" / "kept.csv", kept)
+    store_blob(root, path, hashlib.sha256(kept).hexdigest())
+    gone = _write(tmp_path / "p2" / "gone.csv", dropped)
+    store_blob(root, gone, hashlib.sha256(dropped).hexdigest())
+    os.unlink(gone)
+
+    assert collect_blobs(root) == (1, len(dropped))
+    assert refcount(root, hashlib.sha256(kept).hexdigest()) == 1
+    assert not os.path.exists(blob_path(root, hashlib.sha256(dropped).hexdigest()))
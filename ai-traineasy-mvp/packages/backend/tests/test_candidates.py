@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from utils.candidates import compute_meta_features, select_candidates
+from utils.profiler import profile_dataframe
+
+
+def meta(rows, encoded_width=10, class_balance=0.5):
+    return {"rows": rows, "columns": 5, "encoded_width": encoded_width,
+            "numeric_sparsity": 0.0, "max_cardinality": 3, "class_balance": class_balance}
+
+
+def test_small_data_only_gets_linear_baseline():
+    candidates, skipped = select_candidates(meta(200), is_classification=True)
+    assert list(candidates) == ["Linear"]
+    assert skipped["RandomForest"] == "only 200 rows"
+
+
+def test_wide_data_only_gets_linear_baseline():
+    candidates, skipped = select_candidates(meta(2_000, encoded_width=5_000), is_classification=False)
+    assert list(candidates) == ["Linear"]
+    assert "encoded columns" in skipped["LightGBM"]
+
+
+def test_large_data_prefers_boosters_over_forests():
+    candidates, skipped = select_candidates(meta(1_000_000), is_classification=True)
+    assert list(candidates) == ["Linear", "HistGradientBoosting", "LightGBM"]
+    assert set(skipped) == {"ExtraTrees", "RandomForest"}
+
+
+def test_imbalanced_classes_use_balanced_weights():
+    candidates, _ = select_candidates(meta(5_000, class_balance=0.01), is_classification=True)
+    assert candidates["Linear"].class_weight == "balanced"
+    assert candidates["LightGBM"].estimator.class_weight == "balanced"
+    assert candidates["RandomForest"].class_weight == "balanced"
+
+
+def test_compute_meta_features():
+    df = pd.DataFrame({"a": [0.0, 1.0, 0.0, np.nan], "c": ["x", "y", "x", "z"], "t": [0, 0, 0, 1]})
+    features = compute_meta_features(profile_dataframe(df), ["a"], ["c"], "t", is_classification=True)
+    assert features["rows"] == 4
+    assert features["encoded_width"] == 4
+    assert features["numeric_sparsity"] == 0.75
+    assert features["class_balance"] == round(1 / 3, 4)
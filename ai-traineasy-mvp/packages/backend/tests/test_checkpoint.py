@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+from utils.checkpoint import TrainingCheckpoint
+
+
+def test_checkpoint_only_reused_for_matching_inputs(tmp_path):
+    checkpoint = TrainingCheckpoint(str(tmp_path), key={"data": {"a.csv": [1, 2]}})
+    checkpoint.record_candidate("full", "LightGBM", {"score": 0.9})
+
+    resumed = TrainingCheckpoint(str(tmp_path), key={"data": {"a.csv": [1, 2]}}, resume=True)
+    assert resumed.resumed
+    assert resumed.candidate_result("full", "LightGBM") == {"score": 0.9}
+
+    changed = TrainingCheckpoint(str(tmp_path), key={"data": {"a.csv": [3, 4]}}, resume=True)
+    assert not changed.resumed
+    assert changed.candidate_result("full", "LightGBM") is None
+
+
+def test_resume_skips_finished_candidates(training_project, monkeypatch):
+    import train_model
+
+    real_cross_validate = train_model.cross_validate_folds
+    calls = []
+
+    def crash_on_forest(pipe, *args, **kwargs):
+        calls.append(type(pipe.named_steps["model"]).__name__)
+        if "RandomForest" in calls[-1]:
+            raise MemoryError("simulated OOM")
+        return real_cross_validate(pipe, *args, **kwargs)
+
+    monkeypatch.setattr(train_model, "cross_validate_folds", crash_on_forest)
+    with pytest.raises(MemoryError):
+        train_model.train(training_project)
+    assert os.path.exists(os.path.join("projects", training_project, "checkpoint", "state.json"))
+
+    def count_calls(pipe, *args, **kwargs):
+        calls.append(type(pipe.named_steps["model"]).__name__)
+        return real_cross_validate(pipe, *args, **kwargs)
+
+    calls.clear()
+    monkeypatch.setattr(train_model, "cross_validate_folds", count_calls)
+    log = train_model.train(training_project, resume=True)
+
+    assert calls == ["RandomForestClassifier"]
+    assert log["resumed"] is True
+    assert set(log["scores"]) == {"Linear", "LightGBM", "ExtraTrees", "RandomForest"}
+    assert not os.path.exists(os.path.join("projects", training_project, "checkpoint"))
+
+
+def test_resume_with_ensemble_ignores_checkpoint_without_folds(training_project, monkeypatch):
+    import train_model
+
+    real_cross_validate = train_model.cross_validate_folds
+
+    def crash_on_forest(pipe, *args, **kwargs):
+        if "RandomForest" in type(pipe.named_steps["model"]).__name__:
+            raise MemoryError("simulated OOM")
+        return real_cross_validate(pipe, *args, **kwargs)
+
+    monkeypatch.setattr(train_model, "cross_validate_folds", crash_on_forest)
+    with pytest.raises(MemoryError):
+        train_model.train(training_project)
+
+    monkeypatch.setattr(train_model, "cross_validate_folds", real_cross_validate)
+    log = train_model.train(training_project, resume=True, ensemble=True)
+
+    assert log["resumed"] is False
+    assert log["ensemble"] is not None
+
+
+def test_resumed_candidates_keep_their_folds_for_the_ensemble(training_project, monkeypatch):
+    import train_model
+
+    real_build_ensemble = train_model.build_ensemble
+
+    def crash(*args, **kwargs):
+        raise MemoryError("simulated OOM")
+
+    monkeypatch.setattr(train_model, "build_ensemble", crash)
+    with pytest.raises(MemoryError):
+        train_model.train(training_project, ensemble=True)
+
+    real_cross_validate = train_model.cross_validate_folds
+    calls = []
+
+    def count_calls(pipe, *args, **kwargs):
+        calls.append(type(pipe.named_steps["model"]).__name__)
+        return real_cross_validate(pipe, *args, **kwargs)
+
+    monkeypatch.setattr(train_model, "build_ensemble", real_build_ensemble)
+    monkeypatch.setattr(train_model, "cross_validate_folds", count_calls)
+    log = train_model.train(training_project, ensemble=True, resume=True)
+
+    assert log["resumed"] is True and calls == []
+    assert log["ensemble"] is not None and len(log["ensemble"]["members"]) >= 2
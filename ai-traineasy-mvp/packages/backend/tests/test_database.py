@@ -0,0 +1,30 @@
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+import database
+from database import Base, TrainingRun, Dataset
+
+
+def test_runs_need_no_project_row_when_foreign_keys_are_enforced(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fk.db'}")
+    event.listen(engine, "connect", lambda conn, _: conn.execute("PRAGMA foreign_keys=ON"))
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(TrainingRun(project_id="only-on-disk", owner="u"))
+    db.add(Dataset(project_id="only-on-disk", filename="1_d.csv", original_filename="d.csv",
+                   file_size=1, file_type="csv"))
+    db.commit()
+    db.close()
+
+
+def test_older_tables_get_new_columns_and_their_indexes(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE training_runs (id INTEGER PRIMARY KEY, status VARCHAR)"))
+    monkeypatch.setattr(database, "engine", engine)
+    database.create_tables()
+
+    inspector = inspect(engine)
+    assert "project_id" in {c["name"] for c in inspector.get_columns("training_runs")}
+    indexed = {tuple(index["column_names"]) for index in inspector.get_indexes("training_runs")}
+    assert {("project_id",), ("owner",), ("status",)} <= indexed
@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from dataset_profiles import ProfileQueue, PENDING, COMPLETED, FAILED
+
+
+@pytest.fixture
+def profiles(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'datasets.db'}")
+    Base.metadata.create_all(bind=engine)
+    (tmp_path / "projects" / "p1" / "data").mkdir(parents=True)
+    return ProfileQueue(session_factory=sessionmaker(bind=engine), projects_dir=str(tmp_path / "projects"))
+
+
+def test_upload_is_profiled_in_the_background(profiles, tmp_path, monkeypatch):
+    monkeypatch.setattr("utils.profiler.PROFILE_CHUNK_ROWS", 7)
+    data_dir = tmp_path / "projects" / "p1" / "data"
+    (data_dir / "1_d.csv").write_text("a,b\n" + "".join(f"{i},{'xy'[i % 2]}\n" for i in range(20)))
+    (data_dir / "2_bad.json").write_text("not json")
+
+    dataset = profiles.add("p1", "1_d.csv", "d.csv", 100, sha256="ab" * 32)
+    bad = profiles.add("p1", "2_bad.json", "bad.json", 8)
+    assert dataset["profile_status"] == PENDING
+    profiles.stop()
+    profiles._work()  # what the background thread runs, up to the stop marker
+
+    result = profiles.get("p1", dataset["id"])
+    assert result["profile_status"] == COMPLETED
+    assert (result["rows_count"], result["columns_count"]) == (20, 2)
+    assert result["schema"]["a"]["max"] == 19.0
+    assert profiles.get("p1", bad["id"])["profile_status"] == FAILED
+    assert profiles.get("p2", dataset["id"]) is None
+
+    # The same content uploaded again reuses the profile without waiting
+    again = profiles.add("p1", "3_d.csv", "d.csv", 100, sha256="ab" * 32)
+    assert again["profile_status"] == COMPLETED and again["rows_count"] == 20
+    assert [d["id"] for d in profiles.for_project("p1")] == [dataset["id"], bad["id"], again["id"]]
+
+
+def test_unfinished_profiles_are_recovered(profiles):
+    first = ProfileQueue(session_factory=profiles.session_factory, projects_dir=profiles.projects_dir)
+    dataset = first.add("p1", "missing.csv", "missing.csv", 1)
+    # A new API process picks it up again
+    profiles.recover()
+    profiles.stop()
+    profiles._work()
+    assert profiles.get("p1", dataset["id"])["profile_status"] == FAILED
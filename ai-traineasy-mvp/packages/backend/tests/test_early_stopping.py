@@ -0,0 +1,40 @@
+import numpy as np
+from lightgbm import LGBMClassifier, LGBMRegressor
+from sklearn.base import is_classifier, is_regressor
+from sklearn.model_selection import cross_validate
+
+from utils.early_stopping import (
+    EarlyStoppingLGBMClassifier, EarlyStoppingLGBMRegressor, select_n_estimators
+)
+
+
+def make_data(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 4))
+    return X, X[:, 0] + 0.5 * X[:, 1] + rng.normal(scale=0.1, size=n)
+
+
+def test_stops_before_round_cap():
+    X, y = make_data()
+    model = EarlyStoppingLGBMRegressor(LGBMRegressor(verbose=-1), patience=10, max_rounds=5000)
+    model.fit(X, y)
+    assert is_regressor(model)
+    assert 0 < model.best_iteration_ < 5000
+
+
+def test_fixed_round_count_skips_search():
+    X, y = make_data()
+    model = EarlyStoppingLGBMClassifier(LGBMClassifier(verbose=-1), n_estimators=7)
+    model.fit(X, y > 0)
+    assert model.best_iteration_ == 7
+    assert model.estimator_.booster_.num_trees() == 7
+    assert list(model.classes_) == [False, True]
+
+
+def test_cv_folds_feed_final_round_count():
+    X, y = make_data()
+    model = EarlyStoppingLGBMClassifier(LGBMClassifier(verbose=-1), patience=10)
+    assert is_classifier(model)
+    cv = cross_validate(model, X, y > 0, cv=3, return_estimator=True)
+    picks = sorted(m.best_iteration_ for m in cv["estimator"])
+    assert select_n_estimators(cv["estimator"]) == picks[1]
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+
+from utils.encoding import FrequencyEncoder, categorical_transformers, encoding_summary, split_by_cardinality
+from utils.profiler import profile_dataframe
+
+
+def _frame(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "id": [f"user{i}" for i in range(n)],
+        "color": rng.choice(["red", "green", "blue"], n),
+        "a": rng.normal(size=n),
+    })
+    df.loc[:2, "color"] = "rare"  # 3 rows, below the grouping threshold
+    return df, (df.a > 0).astype(int).to_numpy()
+
+
+def _preprocessor(df, cat_cols):
+    return ColumnTransformer([
+        ("num", "passthrough", ["a"]),
+        *categorical_transformers(profile_dataframe(df), cat_cols, SimpleImputer(strategy="most_frequent"), True),
+    ])
+
+
+def test_id_like_columns_do_not_blow_up_the_width():
+    df, y = _frame()
+    assert split_by_cardinality(profile_dataframe(df), ["id", "color"]) == (["color"], ["id"])
+    summary = encoding_summary(_preprocessor(df, ["id", "color"]), df, y)
+    # a, red/green/blue plus one infrequent column, id's target and frequency columns
+    assert summary["width"] == 1 + 4 + 2
+    assert summary["memory_mb"] < 1
+
+
+def test_low_cardinality_one_hot_stays_sparse():
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({f"c{i}": rng.choice([f"v{j}" for j in range(25)], 2000) for i in range(4)})
+    df["a"] = rng.normal(size=2000)
+    summary = encoding_summary(_preprocessor(df, [f"c{i}" for i in range(4)]), df, rng.integers(0, 2, 2000))
+    assert summary["sparse"] and summary["width"] == 1 + 4 * 25
+    assert summary["density"] < 0.1
+
+
+def test_summary_is_measured_on_a_sample_and_scaled():
+    df, y = _frame(n=8000)
+    full = encoding_summary(_preprocessor(df, ["id", "color"]), df, y, is_classification=True)
+    sampled = encoding_summary(_preprocessor(df, ["id", "color"]), df, y, is_classification=True, sample_rows=2000)
+    assert sampled["width"] == full["width"]
+    assert abs(sampled["memory_mb"] - full["memory_mb"]) <= 0.1 * full["memory_mb"] + 0.01
+
+
+def test_frequency_encoder_maps_unseen_to_zero():
+    encoder = FrequencyEncoder().fit(pd.DataFrame({"c": ["a", "a", "b", "c"]}))
+    out = encoder.transform(pd.DataFrame({"c": ["a", "b", "z"]}))
+    np.testing.assert_allclose(out[:, 0], [0.5, 0.25, 0.0])
@@ -0,0 +1,75 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from joblib import load
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import cross_validate
+from sklearn.tree import DecisionTreeClassifier
+
+import train_model
+from utils.ensemble import out_of_fold, build_ensemble, StackedEnsemble
+
+
+class _ColumnModel(DecisionTreeClassifier):
+    """A shallow tree restricted to one column."""
+
+    def __init__(self, column="a", max_depth=2):
+        super().__init__(max_depth=max_depth)
+        self.column = column
+
+    def fit(self, X, y):
+        return super().fit(X[[self.column]], y)
+
+    def predict_proba(self, X):
+        return super().predict_proba(X[[self.column]])
+
+    def predict(self, X):
+        return super().predict(X[[self.column]])
+
+
+def _cv_result(model, X, y):
+    cv = cross_validate(model, X, y, cv=3, return_estimator=True, return_indices=True)
+    return {"score": cv["test_score"].mean(), "fold_estimators": cv["estimator"],
+            "oof": out_of_fold(cv["estimator"], cv["indices"]["test"], X)}
+
+
+def test_out_of_fold_predictions_come_from_the_held_out_fold():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({"a": rng.normal(size=300), "b": rng.normal(size=300)})
+    y = (X.a + X.b > 0).astype(int).to_numpy()
+    cv = cross_validate(LogisticRegression(), X, y, cv=3, return_estimator=True, return_indices=True)
+    oof = out_of_fold(cv["estimator"], cv["indices"]["test"], X)
+    assert oof.shape == (300, 2)
+    for estimator, idx in zip(cv["estimator"], cv["indices"]["test"]):
+        np.testing.assert_allclose(oof[idx], estimator.predict_proba(X.iloc[idx]))
+
+
+def test_ensemble_beats_members_that_see_different_signals():
+    rng = np.random.default_rng(1)
+    X = pd.DataFrame({"a": rng.normal(size=900), "b": rng.normal(size=900)})
+    y = ((X.a > 0) & (X.b > 0)).astype(int).to_numpy()
+    # Each member only sees one of the two columns it needs
+    results = {name: _cv_result(_ColumnModel(col), X, y) for name, col in (("on_a", "a"), ("on_b", "b"))}
+    best = max(results, key=lambda n: results[n]["score"])
+
+    ensemble, summary = build_ensemble(results, X, y, is_classification=True, best_name=best)
+    assert summary["selected"] and isinstance(ensemble, StackedEnsemble)
+    assert summary["cv_score"] > summary["best_single"]["cv_score"]
+    assert summary["latency_ms"]["ensemble"] > 0 and summary["latency_ms"]["extra"] is not None
+    assert (ensemble.predict(X) == y).mean() > 0.9
+
+
+def test_training_serves_the_ensemble_as_one_model(training_project):
+    log = train_model.train(training_project, ensemble=True)
+    summary = log["ensemble"]
+    assert len(summary["members"]) >= 2 and "ensemble" in log["stage_seconds"]
+    model = load(os.path.join("projects", training_project, "model.pkl"))
+    assert isinstance(model, StackedEnsemble) == summary["selected"]
+    assert log["selected_model"] == ("StackedEnsemble" if summary["selected"] else summary["best_single"]["model"])
+    X = pd.read_csv(os.path.join("projects", training_project, "data", "1_data.csv"))[["a", "b", "c"]]
+    assert len(model.predict(X.iloc[:5])) == 5
+    with open(os.path.join("projects", training_project, "training_log.json")) as f:
+        assert json.load(f)["ensemble"]["latency_ms"] == summary["latency_ms"]
+
@@ -0,0 +1,63 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LogisticRegression
+
+from utils.incremental import new_data_files, supports_continuation, continue_training
+
+
+def append_data(project_id, name, shift=0.0, n=200, seed=1):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "a": rng.normal(loc=shift, size=n),
+        "b": rng.normal(size=n),
+        "c": rng.choice(["x", "y", "z"], n),
+    })
+    df["target"] = np.where(df.a * df.b + (df.c == "x") > 0.5, "yes", "no")
+    df.to_csv(os.path.join("projects", project_id, "data", name), index=False)
+
+
+def test_new_data_files():
+    assert new_data_files(["1.csv"], ["1.csv", "2.csv"]) == ["2.csv"]
+    assert new_data_files(["1.csv"], ["1.csv"]) == []
+    assert new_data_files(["1.csv", "2.csv"], ["2.csv"]) is None
+
+
+def test_forest_adds_trees_with_warm_start():
+    rng = np.random.default_rng(0)
+    X, y = rng.normal(size=(200, 3)), rng.normal(size=200)
+    model = RandomForestRegressor(n_estimators=20).fit(X, y)
+    assert supports_continuation(model)
+    added = continue_training(model, X[:50], y[:50], growth=0.25)
+    assert added == 10
+    assert len(model.estimators_) == 30
+    assert not supports_continuation(LogisticRegression())
+
+
+def test_incremental_retrain_continues_previous_model(training_project):
+    import train_model
+
+    train_model.train(training_project)
+    append_data(training_project, "2_more.csv")
+    log = train_model.train(training_project, incremental=True)
+
+    assert log["training_path"] == "incremental"
+    assert log["incremental"]["added_files"] == ["2_more.csv"]
+    assert log["data_files"] == {"1_data.csv": 600, "2_more.csv": 200}
+    with open(os.path.join("projects", training_project, "training_log.json")) as f:
+        assert json.load(f)["training_path"] == "incremental"
+
+
+def test_incremental_retrain_falls_back_on_drift(training_project):
+    import train_model
+
+    train_model.train(training_project)
+    append_data(training_project, "2_drifted.csv", shift=5.0)
+    log = train_model.train(training_project, incremental=True)
+
+    assert log["training_path"] == "full"
+    assert "numeric drift in 'a'" in log["fallback_reason"]
+    assert log["data_files"] == {"1_data.csv": 600, "2_drifted.csv": 200}
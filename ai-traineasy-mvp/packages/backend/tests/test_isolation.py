@@ -0,0 +1,45 @@
+import os
+import resource
+
+import pytest
+
+from utils import isolation
+from utils.isolation import CoreAllocator, isolate
+
+
+def test_allocator_hands_out_disjoint_cores_then_shares_least_used():
+    allocator = CoreAllocator(cores=[0, 1, 2, 3])
+    assert allocator.acquire("a", 2) == [0, 1]
+    assert allocator.acquire("b", 1) == [2]
+    assert allocator.acquire("c", 2) == [0, 3]  # only core 3 is free
+    allocator.release("a")
+    assert allocator.acquire("d", 8) == [0, 1, 2, 3]
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_setaffinity"), reason="needs sched_setaffinity")
+def test_isolate_pins_and_limits_then_restores(monkeypatch, tmp_path):
+    # Not a cgroup filesystem: falls back to affinity and rlimits
+    monkeypatch.setattr(isolation, "CGROUP_PARENT", str(tmp_path / "cg"))
+    before_affinity = os.sched_getaffinity(0)
+    before_limit = resource.getrlimit(resource.RLIMIT_DATA)
+    core = min(before_affinity)
+
+    with isolate([core], memory_mb=64 * 1024) as applied:
+        assert applied.cgroup is None and applied.rlimit
+        assert os.sched_getaffinity(0) == {core}
+        assert resource.getrlimit(resource.RLIMIT_DATA)[0] <= 64 * 1024 ** 3
+
+    assert os.sched_getaffinity(0) == before_affinity
+    assert resource.getrlimit(resource.RLIMIT_DATA) == before_limit
+
+
+def test_train_without_cores_is_not_pinned(training_project, monkeypatch):
+    import train_model
+
+    def pinned(*args, **kwargs):
+        raise AssertionError("pinned to cores nobody allocated")
+
+    monkeypatch.setattr(train_model, "isolate", pinned)
+    log = train_model.train(training_project, cpu_percent=50)
+    assert log["isolation"] is None
+    assert log["resources"]["cores"] == train_model.plan_resources(50).cores
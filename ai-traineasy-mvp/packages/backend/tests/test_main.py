@@ -1,169 +1,208 @@
-# ok, so fix them 
+import os
+import json
+
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import Mock, patch, mock_open
+from types import SimpleNamespace
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.backend import main
 from backend.backend.main import app, ProcessManager
+from auth import get_current_active_user, User
+from database import Base
+from dataset_profiles import ProfileQueue
+from scheduler import TrainingScheduler
+
+
+@pytest.fixture
+def launched(tmp_path, monkeypatch):
+    """Runs the API starts, recorded instead of trained; projects and the queue live under tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("scheduler.available_cores", lambda: 8)
+    engine = create_engine(f"sqlite:///{tmp_path / 'queue.db'}")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    launched = []
+    monkeypatch.setattr(main, "training_scheduler", TrainingScheduler(
+        lambda run_id, project_id, options: launched.append((run_id, project_id, options)),
+        session_factory=session_factory))
+    monkeypatch.setattr(main, "dataset_profiles", ProfileQueue(session_factory=session_factory))
+    return launched
+
 
 @pytest.fixture
-def client():
-    return TestClient(app)
-
-@pytest.fixture(autouse=True)
-def mock_dependencies():
-    with patch('subprocess.Popen') as mock_popen, \
-         patch('GPUtil.getGPUs') as mock_gpus, \
-         patch('psutil.cpu_percent'), \
-         patch('psutil.virtual_memory') as mock_mem, \
-         patch('os.path.exists') as mock_exists, \
-         patch('os.listdir') as mock_listdir, \
-         patch('os.makedirs') as mock_makedirs, \
-         patch('builtins.open', mock_open(read_data='{"mock": "data"}')):
-        
-        mock_popen.return_value = Mock(pid=1234)
-        mock_gpus.return_value = [Mock(id=0, name='Test GPU')]
-        mock_mem.return_value = Mock(total=8589934592, percent=30)
-        mock_exists.side_effect = lambda path: 'schema.json' in path
-        mock_listdir.return_value = ['test-project.json']
-        mock_makedirs.return_value = None
-        yield
+def client(launched):
+    app.dependency_overrides[get_current_active_user] = lambda: User(username="alice", disabled=False)
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def make_project(tmp_path, project_id="test-project", owner="alice", schema=True, data=True):
+    project_dir = tmp_path / "projects" / project_id
+    (project_dir / "data").mkdir(parents=True)
+    with open(tmp_path / "projects" / f"{project_id}.json", "w") as f:
+        json.dump({"id": project_id, "owner": owner, "status": "initialized"}, f)
+    if schema:
+        (project_dir / "schema.json").write_text(json.dumps({"inputs": ["a"], "output": "b"}))
+    if data:
+        (project_dir / "data" / "1_data.csv").write_text("a,b\n1,2\n")
+    return project_id
+
+
+def start_run(client, project_id="test-project"):
+    response = client.post(f"/projects/{project_id}/train", json={})
+    assert response.status_code == 200
+    return response.json()["run_id"]
+
 
 @pytest.mark.parametrize('gpu_count,expected', [(1, True), (0, False)])
-def test_system_info(gpu_count, expected, client, mock_dependencies):
-    mock_dependencies['mock_gpus'].return_value = [Mock()]*gpu_count
-    response = client.get("/system-info")
+def test_system_info(gpu_count, expected, client):
+    gpu = SimpleNamespace(id=0, name='Test GPU', driver='550', memoryTotal=8192, memoryUsed=0, memoryFree=8192,
+                          load=0.0, temperature=40, uuid='GPU-0')
+    with patch('GPUtil.getGPUs', return_value=[gpu] * gpu_count):
+        response = client.get("/system-info")
     assert response.status_code == 200
     assert response.json()['gpu_available'] == expected
-    assert isinstance(response.json()['cpu_usage'], float)
-    assert isinstance(response.json()['memory_usage'], float)
-
-
-def test_gpu_required_validation(client, mock_dependencies):
-    # Test config requiring GPU when none available
-    mock_dependencies['mock_gpus'].return_value = []
-    response = client.post("/train/start", json={
-        "config": {
-            "gpu_required": True,
-            "epochs": 10
-        }
-    })
-    assert response.status_code == 422
-    assert "GPU required but not available" in response.json()['detail']
-
-    # Test invalid GPU index
-    mock_dependencies['mock_gpus'].return_value = [Mock(id=0)]
-    response = client.post("/train/start", json={
-        "config": {
-            "gpu_id": 1,
-            "epochs": 10
-        }
-    })
-    assert response.status_code == 422
-    assert "Invalid GPU index" in response.json()['detail']
+    assert response.json()['gpu_count'] == gpu_count
+    assert isinstance(response.json()['cpu_percent'], float)
+    assert isinstance(response.json()['ram_percent'], float)
 
-@patch.object(ProcessManager, 'start_training')
-def test_start_training(mock_start, client):
-    mock_start.return_value = 'test-project'
-    response = client.post("/train/start", json={"config": {}})
-    assert response.status_code == 200
-    assert response.json()['project_id'] == 'test-project'
 
 @patch.object(ProcessManager, 'pause_training')
-def test_pause_training(mock_pause, client):
-    response = client.post("/train/test-project", json={"action": "pause"})
+def test_pause_training(mock_pause, client, tmp_path):
+    run_id = start_run(client, make_project(tmp_path))
+    response = client.post("/projects/test-project/pause")
     assert response.status_code == 200
+    assert response.json() == {"success": True, "run_id": run_id, "status": "paused"}
     mock_pause.assert_called_with('test-project')
 
+
 @patch.object(ProcessManager, 'resume_training')
-def test_resume_training(mock_resume, client):
-    response = client.put("/train/test-project", json={"action": "resume"})
+@patch.object(ProcessManager, 'pause_training')
+def test_resume_training(mock_pause, mock_resume, client, tmp_path):
+    run_id = start_run(client, make_project(tmp_path))
+    client.post("/projects/test-project/pause")
+    response = client.post("/projects/test-project/resume")
     assert response.status_code == 200
+    assert response.json() == {"success": True, "run_id": run_id, "status": "running"}
     mock_resume.assert_called_with('test-project')
 
 
-def test_resume_non_paused_process(client):
-    response = client.post("/train/non-existent-project/resume")
+def test_resume_non_paused_process(client, tmp_path):
+    response = client.post("/projects/non-existent-project/resume")
     assert response.status_code == 404
     assert 'not found' in response.json()['detail']
 
-    # Test resume on running (non-paused) project
-    response = client.post("/train/test-project/resume")
+    # Resume on a running (non-paused) run
+    start_run(client, make_project(tmp_path))
+    response = client.post("/projects/test-project/resume")
     assert response.status_code == 409
-    assert 'not paused' in response.json()['detail']
+    assert 'No paused training' in response.json()['detail']
 
 
-def test_invalid_state_transitions(client):
-    # Test pause on non-existent project
-    response = client.post("/train/missing-project", json={"action": "pause"})
+def test_invalid_state_transitions(client, tmp_path):
+    # Pause on a missing project
+    response = client.post("/projects/missing-project/pause")
     assert response.status_code == 404
 
-    # Test invalid action type
-    response = client.post("/train/test-project", json={"action": "invalid"})
-    assert response.status_code == 422
+    # Pause with nothing running
+    make_project(tmp_path)
+    response = client.post("/projects/test-project/pause")
+    assert response.status_code == 409
 
-    # Test duplicate resume request
-    with patch.object(ProcessManager, 'resume_training', side_effect=ConflictError('Already running')):
-        response = client.put("/train/test-project", json={"action": "resume"})
-        assert response.status_code == 409
+    # Cancel twice
+    start_run(client)
+    with patch.object(ProcessManager, 'cancel_training') as mock_cancel:
+        assert client.post("/projects/test-project/cancel").status_code == 200
+        mock_cancel.assert_called_with('test-project')
+    response = client.post("/projects/test-project/cancel")
+    assert response.status_code == 409
 
-    # Test invalid HTTP method
-    response = client.get("/train/test-project")
+    # Invalid HTTP method
+    response = client.get("/projects/test-project/pause")
     assert response.status_code == 405
 
-@patch.object(ProcessManager, 'start_training', side_effect=RuntimeError('Concurrent training forbidden'))
-def test_concurrent_training_sessions(mock_start, client):
-    response = client.post("/train/start", json={"config": {}})
-    assert response.status_code == 200
-    
-    # Second attempt should conflict
-    response = client.post("/train/start", json={"config": {}})
-    assert response.status_code == 409
-    assert 'already running' in response.json()['detail']
 
-def test_invalid_cpu_limit(client):
-    response = client.post("/train/start", json={"config": {"cpu_percent": 150}})
-    assert response.status_code == 422
-    detail = response.json()['detail'][0]
-    assert detail['loc'] == ['body', 'config', 'cpu_percent']
-    assert 'less than or equal to 100' in detail['msg']
-
-@patch('os.path.exists')
-def test_duplicate_training_process(mock_exists, client):
-    mock_exists.return_value = True
-    response = client.post("/train/start", json={"config": {"cpu_percent": 50}})
+@patch.object(ProcessManager, 'pause_training', side_effect=ProcessLookupError('No such process'))
+def test_training_conflict_error(mock_pause, client, tmp_path):
+    run_id = start_run(client, make_project(tmp_path))
+    response = client.post("/projects/test-project/pause")
     assert response.status_code == 409
-    assert 'already exists' in response.json()['detail']
+    assert 'not controllable' in response.json()['detail']
+    # The run is left running, as the process was
+    assert main.training_scheduler.queue_position(run_id)["status"] == "running"
 
-@patch.object(ProcessManager, 'start_training', side_effect=ValueError('Conflict'))
-def test_training_conflict_error(mock_start, client):
-    response = client.post("/train/start", json={"config": {}})
-    assert response.status_code == 409
-    assert 'Conflict' in response.json()['detail']
 
-@patch('os.listdir')
-def test_missing_project(mock_listdir, client):
-    mock_listdir.return_value = []
-    # Test all state change endpoints
-    response = client.post("/train/missing-project", json={"action": "pause"})
-    assert response.status_code == 404
-    response = client.put("/train/missing-project", json={"action": "resume"})
-    assert response.status_code == 404
-    
-    # Test various endpoints with invalid project
-    response = client.get("/train/missing-project/logs")
-    assert response.status_code == 404
-    
-    response = client.post("/train/missing-project/pause")
-    assert response.status_code == 404
-    
-    response = client.put("/train/missing-project", json={"action": "resume"})
+def test_other_users_project(client, tmp_path):
+    make_project(tmp_path, owner="mallory")
+    for action in ("pause", "resume", "cancel"):
+        response = client.post(f"/projects/test-project/{action}")
+        assert response.status_code == 403
+
+
+def test_missing_project(client):
+    for action in ("pause", "resume", "cancel"):
+        response = client.post(f"/projects/missing-project/{action}")
+        assert response.status_code == 404
+    response = client.get("/projects/missing-project/logs")
     assert response.status_code == 404
-    
-    assert 'does not exist' in response.text.lower()
+    assert 'not found' in response.text.lower()
+
+
+def test_start_training(client, launched, tmp_path):
+    make_project(tmp_path)
+    response = client.post("/projects/test-project/train", json={"cpu_percent": 50, "ensemble": True})
+    assert response.status_code == 200
+    assert response.json()['status'] == 'running'
+    [(run_id, project_id, options)] = launched
+    assert (run_id, project_id) == (response.json()['run_id'], 'test-project')
+    assert options['cpu_percent'] == 50 and options['ensemble'] is True
+
 
+def test_concurrent_training_sessions(client, launched, tmp_path):
+    start_run(client, make_project(tmp_path))
+    response = client.post("/projects/test-project/train", json={})
+    assert response.status_code == 409
+    assert 'already queued' in response.json()['detail']
 
-@patch.object(ProcessManager, 'validate_config')
-def test_training_config_validation(mock_validate, client):
-    mock_validate.return_value = True
-    response = client.post("/train/start", json={"config": {"epochs": 10}})
+    # A second project of the same user waits on the per-user cap
+    make_project(tmp_path, "other-project")
+    response = client.post("/projects/other-project/train", json={})
     assert response.status_code == 200
-    assert mock_validate.called
\ No newline at end of file
+    assert response.json()['status'] == 'queued'
+    assert response.json()['queue_position'] == 1
+    assert len(launched) == 1
+
+
+@pytest.mark.parametrize('body,field', [({"cpu_percent": 150}, 'cpu_percent'), ({"max_duration": 10}, 'max_duration')])
+def test_invalid_training_options(body, field, client, tmp_path):
+    make_project(tmp_path)
+    response = client.post("/projects/test-project/train", json=body)
+    assert response.status_code == 422
+    assert response.json()['detail'][0]['loc'] == ['body', field]
+
+
+def test_duplicate_training_process(client, launched, tmp_path):
+    pid_path = tmp_path / "projects" / make_project(tmp_path) / "train.pid"
+    pid_path.write_text(str(os.getpid()))
+    response = client.post("/projects/test-project/train", json={})
+    assert response.status_code == 409
+    assert 'already in progress' in response.json()['detail']
+
+    # A pid file left behind by a crashed run does not block training
+    pid_path.write_text("999999999")
+    start_run(client)
+    assert not pid_path.exists()
+    assert len(launched) == 1
+
+
+@pytest.mark.parametrize('schema,data,message', [(False, True, 'Missing required schema'),
+                                                 (True, False, 'No dataset found')])
+def test_training_config_validation(schema, data, message, client, launched, tmp_path):
+    make_project(tmp_path, schema=schema, data=data)
+    response = client.post("/projects/test-project/train", json={})
+    assert response.status_code == 400
+    assert message in response.json()['detail']
+    assert launched == []
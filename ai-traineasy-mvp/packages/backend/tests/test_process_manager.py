@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+import time
+
+import psutil
+
+from utils.process_manager import ProcessManager
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# A training job in miniature: job control around work that has a child
+# process, standing in for joblib workers that must stop with the job
+JOB = """
+import subprocess, time
+from utils.budget import TrainingBudget
+from utils.process_manager import job_control
+subprocess.Popen(["sleep", "60"])
+with job_control(TrainingBudget(None)):
+    while True:
+        time.sleep(0.1)
+"""
+
+
+def _wait_for_status(pid, statuses, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if psutil.Process(pid).status() in statuses:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_pause_resume_and_cancel_signal_the_process_group():
+    proc = subprocess.Popen([sys.executable, "-c", JOB], cwd=BACKEND_DIR, start_new_session=True)
+    manager = ProcessManager()
+    try:
+        time.sleep(1)
+        child = psutil.Process(proc.pid).children()[0]
+        manager.register("pm-test", proc.pid)
+
+        manager.pause_training("pm-test")
+        assert manager.is_paused("pm-test")
+        assert _wait_for_status(proc.pid, {psutil.STATUS_STOPPED})
+        assert _wait_for_status(child.pid, {psutil.STATUS_STOPPED})
+
+        manager.resume_training("pm-test")
+        assert not manager.is_paused("pm-test")
+        assert _wait_for_status(child.pid, {psutil.STATUS_SLEEPING, psutil.STATUS_RUNNING})
+
+        manager.cancel_training("pm-test")
+        assert manager.was_cancelled("pm-test")
+        assert proc.wait(5) != 0  # TrainingCancelled raised in the job
+        child.kill()
+        assert not manager.cancel_overdue("pm-test")
+    finally:
+        manager.unregister("pm-test")
+        proc.kill()
+
+
+def test_cancel_before_register_applies_on_register():
+    proc = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"], start_new_session=True)
+    manager = ProcessManager()
+    try:
+        manager.cancel_training("pm-early")
+        assert manager.was_cancelled("pm-early")
+        manager.register("pm-early", proc.pid)
+        assert proc.wait(5) != 0
+    finally:
+        manager.unregister("pm-early")
+        proc.kill()
+    assert not manager.was_cancelled("pm-early")
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from utils import profiler
+from utils.profiler import DatasetProfiler, profile_dataframe, load_cached_profile, save_profile
+
+
+def test_profile_columns():
+    df = pd.DataFrame({
+        "num": [1.0, 0.0, np.nan, 5.0],
+        "cat": ["a", "b", "a", None],
+        "flag": [True, False, True, True],
+        "when": pd.to_datetime(["2024-01-01"] * 4),
+    })
+    profile = profile_dataframe(df)
+    cols = profile["columns"]
+    assert profile["rows"] == 4
+    assert cols["num"] == {"dtype": "float64", "kind": "numeric", "nulls": 1, "cardinality": 3,
+                           "min": 0.0, "max": 5.0, "zeros": 1, "mean": 2.0,
+                           "value_counts": {"1.0": 1, "0.0": 1, "5.0": 1}}
+    assert cols["cat"]["kind"] == "categorical"
+    assert cols["cat"]["value_counts"] == {"a": 2, "b": 1}
+    assert cols["flag"]["kind"] == "categorical"
+    assert cols["when"]["kind"] == "other"
+
+
+def test_chunked_profile_matches_single_pass(monkeypatch):
+    monkeypatch.setattr(profiler, "VALUE_COUNTS_MAX", 5)
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"x": rng.integers(0, 20, 100), "c": rng.choice(list("abc"), 100)})
+    chunked = DatasetProfiler()
+    for start in range(0, 100, 30):
+        chunked.update(df.iloc[start:start + 30])
+    whole = profile_dataframe(df)
+    assert chunked.result() == whole
+    assert "value_counts" not in whole["columns"]["x"]
+    assert whole["columns"]["x"]["cardinality"] == df["x"].nunique()
+
+
+def test_cached_profile_is_tied_to_fingerprint(tmp_path):
+    save_profile(str(tmp_path), {"a.csv": [10, 1]}, {"rows": 1, "columns": {}})
+    assert load_cached_profile(str(tmp_path), {"a.csv": [10, 1]}) == {"rows": 1, "columns": {}}
+    assert load_cached_profile(str(tmp_path), {"a.csv": [11, 2]}) is None
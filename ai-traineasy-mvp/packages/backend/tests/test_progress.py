@@ -0,0 +1,48 @@
+import json
+import os
+
+from utils.progress import ProgressReporter, read_events, PROGRESS_FILENAME
+
+import train_model
+
+
+def test_eta_follows_the_rate_of_finished_units(tmp_path):
+    now = [0.0]
+    progress = ProgressReporter(str(tmp_path), clock=lambda: now[0])
+    progress.start_stage("full_cv")
+    progress.expect(6)
+    now[0] = 10.0
+    progress.unit_done("LightGBM", 0)
+    now[0] = 20.0
+    progress.unit_done("LightGBM", 1)
+    events, _ = read_events(progress.path)
+    assert [e["event"] for e in events] == ["stage", "fold", "fold"]
+    assert events[-1]["eta"] == 40.0 and events[-1]["elapsed"] == 20.0
+    progress.skip(3)  # one candidate resumed from a checkpoint
+    assert progress.eta == 10.0
+
+
+def test_reads_only_complete_lines_from_an_offset(tmp_path):
+    path = tmp_path / PROGRESS_FILENAME
+    path.write_text(json.dumps({"event": "stage"}) + "\n" + '{"event": "fo')
+    events, offset = read_events(str(path))
+    assert events == [{"event": "stage"}]
+    with open(path, "a") as f:
+        f.write('ld"}\n')
+    events, offset = read_events(str(path), offset)
+    assert events == [{"event": "fold"}] and offset == path.stat().st_size
+    # A new run replaced the file: start over
+    path.write_text(json.dumps({"event": "stage"}) + "\n")
+    assert read_events(str(path), offset)[0] == [{"event": "stage"}]
+
+
+def test_training_reports_every_fold(training_project):
+    log = train_model.train(training_project)
+    events, _ = read_events(os.path.join("projects", training_project, PROGRESS_FILENAME))
+    stages = [e["stage"] for e in events if e["event"] == "stage"]
+    assert stages[0] == "load" and "full_cv" in stages
+    for name in log["scores"]:
+        folds = [e for e in events if e["event"] == "fold" and e["candidate"] == name and e["stage"] == "full_cv"]
+        assert sorted(e["fold"] for e in folds) == list(range(train_model.N_FOLDS))
+    assert events[-1]["event"] == "finished" and events[-1]["selected_model"] == log["selected_model"]
+    assert all(e["elapsed"] >= 0 for e in events)
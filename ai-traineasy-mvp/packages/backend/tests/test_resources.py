@@ -0,0 +1,31 @@
+import pytest
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.ensemble import RandomForestClassifier
+from lightgbm import LGBMClassifier
+
+from utils.early_stopping import EarlyStoppingLGBMClassifier
+from utils.resources import plan_resources, apply_thread_limit
+
+
+@pytest.mark.parametrize('host_cores,cpu_percent,expected', [
+    (16, 100, (16, 3, 5)),
+    (16, 25, (4, 3, 1)),
+    (8, 10, (1, 1, 1)),
+    (2, 100, (2, 2, 1)),
+])
+def test_plan_never_oversubscribes(host_cores, cpu_percent, expected):
+    plan = plan_resources(cpu_percent, n_folds=3, host_cores=host_cores)
+    assert (plan.cores, plan.cv_jobs, plan.model_threads) == expected
+    assert plan.cv_jobs * plan.model_threads <= plan.cores
+    assert plan.blas_threads == plan.model_threads
+
+
+def test_apply_thread_limit_reaches_nested_estimators():
+    lgbm = EarlyStoppingLGBMClassifier(LGBMClassifier())
+    apply_thread_limit(lgbm, 2)
+    assert lgbm.estimator.n_jobs == 2
+
+    pipe = Pipeline([("pre", StandardScaler()), ("model", RandomForestClassifier())])
+    apply_thread_limit(pipe, 3)
+    assert pipe.named_steps["model"].n_jobs == 3
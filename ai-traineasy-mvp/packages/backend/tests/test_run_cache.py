@@ -0,0 +1,71 @@
+import os
+import json
+
+from utils import run_cache
+from utils.run_cache import training_fingerprint, store_run, restore_run
+
+
+def _finish_run(project_dir, model_bytes, score):
+    # Training replaces artifacts atomically rather than rewriting them
+    model_path = os.path.join(project_dir, "model.pkl")
+    with open(f"{model_path}.tmp", "wb") as f:
+        f.write(model_bytes)
+    os.replace(f"{model_path}.tmp", model_path)
+    with open(os.path.join(project_dir, "training_log.json"), "w") as f:
+        json.dump({"status": "completed", "cv_score": score}, f)
+
+
+def test_fingerprint_tracks_data_and_schema_content(training_project):
+    project_dir = os.path.join("projects", training_project)
+    first = training_fingerprint(project_dir)
+    assert training_fingerprint(project_dir) == first
+
+    data_path = os.path.join(project_dir, "data", "1_data.csv")
+    with open(data_path, "a") as f:
+        f.write("1.0,2.0,x,yes\n")
+    assert training_fingerprint(project_dir) != first
+
+    second = training_fingerprint(project_dir)
+    with open(os.path.join(project_dir, "schema.json"), "w") as f:
+        json.dump({"inputs": ["a", "b"], "output": "target"}, f)
+    assert training_fingerprint(project_dir) not in (first, second)
+
+
+def test_fingerprint_reuses_upload_digests_and_tracks_options(training_project, monkeypatch):
+    project_dir = os.path.join("projects", training_project)
+    full = training_fingerprint(project_dir, {"incremental": False, "max_duration": 600})
+    assert training_fingerprint(project_dir, {"incremental": True, "max_duration": 600}) != full
+    assert training_fingerprint(project_dir, {"incremental": False, "max_duration": 900}) != full
+
+    digest = run_cache.file_sha256(os.path.join(project_dir, "data", "1_data.csv"))
+    hashed = []
+    monkeypatch.setattr(run_cache, "file_sha256", lambda path: hashed.append(path) or "x")
+    training_fingerprint(project_dir, digests={"1_data.csv": digest})
+    assert not any(path.endswith("1_data.csv") for path in hashed)
+
+
+
+def test_fingerprint_covers_every_module_training_imports():
+    sources = run_cache.fingerprint_sources()
+    assert "train_model.py" in sources
+    for module in ("profiler", "incremental", "resources", "candidates", "encoding"):
+        assert os.path.join("utils", f"{module}.py") in sources
+    # Modules training never imports do not invalidate the cache
+    assert os.path.join("utils", "uploads.py") not in sources
+
+
+def test_restore_brings_back_an_earlier_run(training_project):
+    project_dir = os.path.join("projects", training_project)
+    assert restore_run(project_dir, "unknown") is None
+
+    _finish_run(project_dir, b"model-a", 0.8)
+    store_run(project_dir, "fp-a")
+    _finish_run(project_dir, b"model-b", 0.9)
+    store_run(project_dir, "fp-b")
+
+    log = restore_run(project_dir, "fp-a")
+    assert log["cv_score"] == 0.8 and log["fingerprint"] == "fp-a"
+    with open(os.path.join(project_dir, "model.pkl"), "rb") as f:
+        assert f.read() == b"model-a"
+    with open(os.path.join(project_dir, "training_log.json")) as f:
+        assert json.load(f)["fingerprint"] == "fp-a"
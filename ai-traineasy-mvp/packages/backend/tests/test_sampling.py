@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from utils.sampling import selection_sample
+
+
+def test_small_data_is_returned_unchanged():
+    X = pd.DataFrame({"a": range(10)})
+    y = np.arange(10)
+    X_s, y_s = selection_sample(X, y, 100, stratify=False)
+    assert X_s is X and y_s is y
+
+
+def test_stratified_sample_keeps_class_balance():
+    y = np.array([0] * 900 + [1] * 100)
+    X = pd.DataFrame({"a": range(1000)})
+    X_s, y_s = selection_sample(X, y, 200, stratify=True)
+    assert len(X_s) == 200
+    assert (y_s == 1).sum() == 20
+
+
+def test_unstratifiable_target_falls_back_to_uniform():
+    y = np.array([0] * 99 + [1])
+    X = pd.DataFrame({"a": range(100)})
+    X_s, y_s = selection_sample(X, y, 50, stratify=True)
+    assert len(X_s) == 50
+
+
+def test_train_ranks_on_sample_then_runs_full_cv(training_project):
+    import train_model
+
+    log = train_model.train(training_project, selection_rows=200, top_k=1)
+    selection = log["selection"]
+    assert selection["sample_rows"] == 200
+    assert selection["total_rows"] == 600
+    assert set(selection["sample_scores"]) == {"Linear", "LightGBM", "ExtraTrees", "RandomForest"}
+    assert list(log["scores"]) == selection["full_ranking"]
+    assert len(log["scores"]) == 1
+    assert selection["ranking_agreed"] is True
@@ -0,0 +1,179 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, TrainingRun
+from scheduler import TrainingScheduler
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    monkeypatch.setattr("scheduler.available_cores", lambda: 8)
+    engine = create_engine(f"sqlite:///{tmp_path / 'queue.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def make_scheduler(session_factory, launched, **kwargs):
+    return TrainingScheduler(lambda run_id, project_id, options: launched.append((run_id, project_id, options)),
+                             session_factory=session_factory, **kwargs)
+
+
+def enqueue(scheduler, project_id, owner, priority=0):
+    return scheduler.enqueue(project_id, owner, cpu_percent=10, max_duration=600,
+                             options={"resume": False}, priority=priority)
+
+
+def test_caps_hold_runs_until_capacity_frees(session_factory):
+    launched = []
+    scheduler = make_scheduler(session_factory, launched, max_concurrent=2, max_per_user=1)
+    a = enqueue(scheduler, "p1", "alice")
+    a2 = enqueue(scheduler, "p2", "alice")
+    b = enqueue(scheduler, "p3", "bob")
+    c = enqueue(scheduler, "p4", "carol")
+
+    # alice's second run waits on the per-user cap; bob overtakes it
+    assert [run_id for run_id, _, _ in launched] == [a, b]
+    assert launched[0][2] == {"resume": False, "cpu_percent": 10, "max_duration": 600}
+    assert scheduler.queue_position(a2)["queue_position"] == 1
+    assert scheduler.queue_position(c)["queue_position"] == 2
+
+    scheduler.finished(a, "completed")
+    assert [run_id for run_id, _, _ in launched] == [a, b, a2]
+    assert scheduler.queue_position(a)["status"] == "completed"
+    assert scheduler.active_run("p1") is None
+    assert scheduler.active_run("p4") == c
+
+
+def test_priority_policy_orders_queue(session_factory):
+    launched = []
+    scheduler = make_scheduler(session_factory, launched, max_concurrent=1, max_per_user=5, policy="priority")
+    first = enqueue(scheduler, "p1", "alice")
+    low = enqueue(scheduler, "p2", "bob")
+    high = enqueue(scheduler, "p3", "carol", priority=10)
+    assert scheduler.queue_position(high)["queue_position"] == 1
+    assert scheduler.queue_position(low)["queue_position"] == 2
+
+    scheduler.finished(first, "completed")
+    assert launched[-1][0] == high
+
+
+def test_runs_wait_for_free_cores(session_factory, monkeypatch):
+    monkeypatch.setattr("scheduler.available_cores", lambda: 2)
+    launched = []
+    scheduler = make_scheduler(session_factory, launched, max_concurrent=3, max_per_user=5)
+    first = scheduler.enqueue("p1", "alice", cpu_percent=100, max_duration=600, options={})
+    waiting = scheduler.enqueue("p2", "bob", cpu_percent=50, max_duration=600, options={})
+    assert [run_id for run_id, _, _ in launched] == [first]
+
+    scheduler.finished(first, "failed", error="boom")
+    assert [run_id for run_id, _, _ in launched] == [first, waiting]
+
+
+def test_estimated_start_follows_recent_durations(session_factory):
+    db = session_factory()
+    now = datetime.utcnow()
+    db.add(TrainingRun(project_id="old", status="completed", start_time=now - timedelta(seconds=300),
+                       end_time=now - timedelta(seconds=200)))
+    db.commit()
+    db.close()
+
+    launched = []
+    scheduler = make_scheduler(session_factory, launched, max_concurrent=1, max_per_user=5)
+    enqueue(scheduler, "p1", "alice")
+    second = enqueue(scheduler, "p2", "bob")
+    third = enqueue(scheduler, "p3", "carol")
+
+    start_second = datetime.fromisoformat(scheduler.queue_position(second)["estimated_start"])
+    start_third = datetime.fromisoformat(scheduler.queue_position(third)["estimated_start"])
+    assert start_third - start_second == timedelta(seconds=100)
+
+
+def test_recover_requeues_interrupted_runs_with_resume(session_factory):
+    launched = []
+    scheduler = make_scheduler(session_factory, launched, max_concurrent=1)
+    run_id = enqueue(scheduler, "p1", "alice")
+
+    restarted = make_scheduler(session_factory, launched, max_concurrent=1, scheduler_id="api:2")
+    # The lease of the process training it is still live
+    assert restarted.recover() == 0
+    db = session_factory()
+    run = db.get(TrainingRun, run_id)
+    assert run.status == "running" and run.worker_id == scheduler.scheduler_id
+    run.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+
+    assert restarted.recover() == 1
+    db.expire_all()
+    run = db.get(TrainingRun, run_id)
+    assert run.status == "queued" and json.loads(run.options_json)["resume"] is True
+    db.close()
+
+    restarted.dispatch()
+    assert launched[-1][0] == run_id and launched[-1][2]["resume"] is True
+
+
+def test_history_reports_usage_and_informs_estimates(session_factory):
+    launched = []
+    scheduler = make_scheduler(session_factory, launched, max_concurrent=1, max_per_user=5)
+    done = enqueue(scheduler, "p1", "alice")
+    scheduler.finished(done, "completed")
+    db = session_factory()
+    run = db.get(TrainingRun, done)
+    run.wall_seconds, run.cpu_seconds, run.peak_rss_mb = 120.0, 90.5, 812.0
+    run.stage_seconds_json = json.dumps({"load": 2.0, "full_cv": 110.0})
+    db.commit()
+    db.close()
+
+    running = enqueue(scheduler, "p1", "alice")
+    history = scheduler.history("p1")
+    assert [entry["id"] for entry in history] == [running, done]
+    assert history[1]["cpu_seconds"] == 90.5 and history[1]["stage_seconds"]["full_cv"] == 110.0
+    assert history[0]["status"] == "running" and history[0]["wall_seconds"] is None
+
+    # The measured wall time is the typical duration for the next estimate
+    waiting = enqueue(scheduler, "p2", "bob")
+    start = datetime.fromisoformat(scheduler.queue_position(waiting)["estimated_start"])
+    assert timedelta(seconds=100) < start - datetime.utcnow() <= timedelta(seconds=120)
+
+
+def test_resume_waits_for_the_slot_a_paused_run_gave_up(session_factory):
+    launched = []
+    scheduler = make_scheduler(session_factory, launched, max_concurrent=1, max_per_user=1)
+    a = enqueue(scheduler, "p1", "alice")
+    assert scheduler.set_status(a, "paused", expected=["running"])
+    b = enqueue(scheduler, "p2", "bob")
+    assert [run_id for run_id, _, _ in launched] == [a, b]
+
+    assert scheduler.resume(a) is False
+    scheduler.finished(b, "completed")
+    assert scheduler.resume(a) is True
+    with pytest.raises(KeyError):
+        scheduler.resume(a)
+
+
+def test_only_one_api_process_starts_a_run(session_factory, monkeypatch):
+    first_launched, second_launched = [], []
+    first = make_scheduler(session_factory, first_launched, max_concurrent=1, scheduler_id="api:1")
+    second = make_scheduler(session_factory, second_launched, max_concurrent=1, scheduler_id="api:2")
+    db = session_factory()
+    run_id = enqueue(first, "p1", "alice")
+    # The second process read the queue before the first started the run
+    stale = [(db.get(TrainingRun, run_id), [])]
+    monkeypatch.setattr(second, "runnable", lambda _db: iter(stale))
+    second.dispatch()
+    assert [r for r, _, _ in first_launched] == [run_id] and second_launched == []
+    db.close()
+
+    # Leases are renewed only for the runs a process holds
+    second.renew_leases()
+    db = session_factory()
+    before = db.get(TrainingRun, run_id).lease_expires_at
+    db.close()
+    first.renew_leases()
+    db = session_factory()
+    assert db.get(TrainingRun, run_id).lease_expires_at > before
+    db.close()
@@ -0,0 +1,61 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from joblib import load
+
+import train_model
+from utils.screening import screen_features
+
+
+def _wide_frame(n=3000, noise=40, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({f"noise{i}": rng.normal(size=n) for i in range(noise)})
+    df["a"], df["b"] = rng.normal(size=n), rng.normal(size=n)
+    df["a_scaled"] = df.a * 3 + 1
+    df["flat"] = 7.0
+    df["c"] = rng.choice(["x", "y", "z"], n)
+    df["c_renamed"] = df.c.map({"x": "p", "y": "q", "z": "r"})
+    y = ((df.a + df.b + (df.c == "x")) > 0.5).astype(int).to_numpy()
+    return df, y
+
+
+def test_filters_and_importances_drop_what_cannot_help():
+    df, y = _wide_frame()
+    num_cols = [c for c in df if c not in ("c", "c_renamed")]
+    kept_num, kept_cat, report = screen_features(df, y, num_cols, ["c", "c_renamed"], is_classification=True)
+    assert kept_num == ["a", "b"] and kept_cat == ["c"]
+    assert report["dropped"]["flat"] == "constant"
+    assert report["dropped"]["a_scaled"] == "duplicate of a"
+    assert report["dropped"]["c_renamed"] == "duplicate of c"
+    assert report["dropped"]["noise0"] == "uninformative"
+    assert report["retained"] == 3 and report["fit_speedup"] > 1
+    assert report["holdout_score"]["retained"] >= report["holdout_score"]["all"] - 0.01
+
+
+def test_nothing_is_dropped_when_every_feature_matters():
+    df, y = _wide_frame(noise=0)
+    kept_num, kept_cat, report = screen_features(df, y, ["a", "b"], ["c"], is_classification=True)
+    assert (kept_num, kept_cat) == (["a", "b"], ["c"])
+    assert report["dropped"] == {} and "fit_speedup" not in report
+
+
+def test_training_evaluates_only_retained_features(training_project):
+    project_dir = os.path.join("projects", training_project)
+    data_path = os.path.join(project_dir, "data", "1_data.csv")
+    df = pd.read_csv(data_path)
+    df["flat"] = 1.0
+    df["a_copy"] = df.a
+    df.to_csv(data_path, index=False)
+    with open(os.path.join(project_dir, "schema.json"), "w") as f:
+        json.dump({"inputs": ["a", "b", "c", "flat", "a_copy"], "output": "target"}, f)
+
+    log = train_model.train(training_project, screen=True)
+    assert log["status"] == "completed"
+    assert {"flat", "a_copy"} <= set(log["screening"]["dropped"])
+    assert log["num_features"] + log["cat_features"] == log["screening"]["retained"]
+    assert "screening" in log["stage_seconds"]
+    # The served model still takes every schema input
+    model = load(os.path.join(project_dir, "model.pkl"))
+    assert len(model.predict(df[log["features"]].iloc[:5])) == 5
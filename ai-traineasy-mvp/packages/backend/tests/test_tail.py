@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+from utils.tail import read_lines, stream_run, parse_stream_id, tail_offset, parse_range
+
+
+def _messages(stream):
+    async def collect():
+        return [m async for m in stream]
+    return [m for m in asyncio.run(collect()) if not m.startswith(":")]
+
+
+def _parse(message):
+    fields = dict(line.split(": ", 1) for line in message.strip().splitlines())
+    return fields["event"], fields.get("id"), json.loads(fields["data"])
+
+
+def test_partial_lines_wait_until_the_writer_is_done(tmp_path):
+    path = tmp_path / "train.log"
+    path.write_bytes("epoch 1\nepoch 2 – half".encode())
+    assert read_lines(str(path)) == (b"epoch 1\n", 8)
+    assert read_lines(str(path), 8, partial=True)[0] == "epoch 2 – half".encode()
+    assert read_lines(str(path), 10_000) == (b"epoch 1\n", 8)  # replaced by a new run
+
+
+def test_stream_follows_a_run_and_resumes_from_an_event_id(tmp_path):
+    log, progress = tmp_path / "train.log", tmp_path / "progress.ndjson"
+    log.write_text("loading\n")
+    progress.write_text(json.dumps({"event": "stage", "stage": "load"}) + "\n")
+    polls = iter([True, False])
+
+    def active():
+        active_now = next(polls, None)
+        if active_now is False:
+            # Written between the last poll and the end of the run
+            with open(log, "a") as f:
+                f.write("done")
+            with open(progress, "a") as f:
+                f.write(json.dumps({"event": "finished"}) + "\n")
+        return bool(active_now)
+
+    messages = [_parse(m) for m in _messages(stream_run(str(log), str(progress), 0, 0, active, poll_seconds=0))]
+    assert [(event, data.get("text", data.get("event"))) for event, _, data in messages[:-1]] == [
+        ("log", "loading\n"), ("progress", "stage"), ("log", "done"), ("progress", "finished")]
+    assert messages[-1][0] == "end"
+
+    # Reconnecting after the first progress event sends only what followed it
+    resumed = [_parse(m) for m in _messages(
+        stream_run(str(log), str(progress), *parse_stream_id(messages[1][1]), lambda: False, poll_seconds=0))]
+    assert [data.get("text", data.get("event")) for _, _, data in resumed[:-1]] == ["done", "finished"]
+
+
+def test_tail_reads_backwards_across_blocks(tmp_path):
+    path = tmp_path / "train.log"
+    lines = [f"line {i}\n" for i in range(1000)]
+    path.write_text("".join(lines))
+    for n in (1, 3, 999):
+        offset = tail_offset(str(path), n, block_size=64)
+        assert path.read_text()[offset:] == "".join(lines[-n:])
+    assert tail_offset(str(path), 5000) == 0
+    path.write_text("a\nlast line without newline")
+    assert tail_offset(str(path), 1) == 2
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    first, last = parse_range("bytes=200-", 100)
+    assert first >= 100  # not satisfiable
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    assert parse_range("items=0-1", 100) is None
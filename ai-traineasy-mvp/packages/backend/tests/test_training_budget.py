@@ -0,0 +1,94 @@
+import json
+import os
+import time
+
+import pytest
+
+from utils.budget import TrainingBudget, BudgetExceeded
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_unlimited_budget_never_expires():
+    budget = TrainingBudget(None)
+    assert budget.remaining == float("inf")
+    assert budget.can_afford(10_000)
+
+
+def test_can_afford_tracks_remaining_time():
+    clock = FakeClock()
+    budget = TrainingBudget(100, clock=clock)
+    assert budget.can_afford(None)
+    assert budget.can_afford(100)
+    clock.now = 70
+    assert budget.remaining == 30
+    assert not budget.can_afford(31)
+    clock.now = 100
+    assert budget.expired
+    assert not budget.can_afford(None)
+
+
+
+def test_paused_time_does_not_count():
+    clock = FakeClock()
+    budget = TrainingBudget(100, clock=clock)
+    clock.now = 30
+    budget.pause()
+    clock.now = 500
+    assert budget.elapsed == 30
+    budget.resume()
+    clock.now = 510
+    assert budget.remaining == 60
+    assert not budget.expired
+
+def test_arm_raises_when_deadline_hits():
+    budget = TrainingBudget(0.05)
+    budget.arm()
+    try:
+        with pytest.raises(BudgetExceeded):
+            time.sleep(1)
+    finally:
+        budget.disarm()
+
+
+def test_train_keeps_best_model_when_budget_runs_out(training_project, monkeypatch):
+    import train_model
+
+    class OneCandidateBudget(TrainingBudget):
+        """Allows the first candidate only, as if it had used up the budget."""
+        calls = 0
+
+        def can_afford(self, estimate):
+            OneCandidateBudget.calls += 1
+            return OneCandidateBudget.calls == 1
+
+    monkeypatch.setattr(train_model, "TrainingBudget", OneCandidateBudget)
+    log = train_model.train(training_project, max_duration=60)
+
+    base_dir = os.path.join("projects", training_project)
+    assert log["status"] == "completed_budget"
+    assert list(log["scores"]) == ["Linear"]
+    assert os.path.exists(os.path.join(base_dir, "model.pkl"))
+    with open(os.path.join(base_dir, "training_log.json")) as f:
+        assert json.load(f)["status"] == "completed_budget"
+
+
+def test_deadline_while_preparing_data_records_failed_budget(training_project, monkeypatch):
+    import train_model
+
+    def out_of_time(*args, **kwargs):
+        raise BudgetExceeded("Training budget of 60s exhausted")
+
+    monkeypatch.setattr(train_model, "encoding_summary", out_of_time)
+    log = train_model.train(training_project, max_duration=60)
+
+    assert log["status"] == "failed_budget" and log["selected_model"] is None
+    assert "prepare" in log["stage_seconds"]
+    with open(os.path.join("projects", training_project, "training_log.json")) as f:
+        assert json.load(f)["status"] == "failed_budget"
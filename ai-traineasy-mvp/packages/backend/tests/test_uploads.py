@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import time
+
+import pytest
+
+from utils.uploads import (
+    StreamingUpload, InvalidUpload, JsonValidator, CsvValidator, UploadTooLarge, OffsetMismatch,
+    create_session, load_session, ChunkWriter, finalize_session, collect_abandoned_sessions,
+)
+
+
+def _feed_in_pieces(validator, text, size):
+    for i in range(0, len(text), size):
+        validator.feed(text[i:i + size])
+    validator.finish()
+
+
+@pytest.mark.parametrize("text", [
+    '[{"a": 1, "b": "x\\"y\\u00e9"}, {"a": -1.5e3, "b": null, "c": [true, NaN]}]',
+    '{"col": {"0": 1, "1": 2}}',
+    ' [ ] ',
+])
+@pytest.mark.parametrize("size", [1, 3, 1000])
+def test_json_accepts_valid_documents_however_they_are_split(text, size):
+    _feed_in_pieces(JsonValidator(), text, size)
+
+
+@pytest.mark.parametrize("text", ['[1,]', '{"a" 1}', '[1 2]', '[1.5x]', '["abc', '{"a": 1}}', '', '[01]'])
+@pytest.mark.parametrize("size", [1, 1000])
+def test_json_rejects_what_json_loads_rejects(text, size):
+    with pytest.raises(ValueError):
+        json.loads(text)
+    with pytest.raises(InvalidUpload):
+        _feed_in_pieces(JsonValidator(), text, size)
+
+
+def test_csv_quoted_newlines_and_ragged_records():
+    _feed_in_pieces(CsvValidator(), 'a,b\n1,"multi\nline, quoted"\n2,\n', 4)
+    with pytest.raises(InvalidUpload, match="record 3 has 3 fields"):
+        _feed_in_pieces(CsvValidator(), "a,b\n1,2\n3,4,5\n", 4)
+    with pytest.raises(InvalidUpload, match="unterminated"):
+        _feed_in_pieces(CsvValidator(), 'a,b\n1,"open\n', 4)
+
+
+def test_csv_buffers_are_capped(monkeypatch):
+    monkeypatch.setattr("utils.uploads.MAX_TOKEN_CHARS", 100)
+    with pytest.raises(InvalidUpload, match="line longer"):
+        _feed_in_pieces(CsvValidator(), "a," * 200, 10)
+    with pytest.raises(InvalidUpload, match="quoted CSV field longer"):
+        _feed_in_pieces(CsvValidator(), 'a,b\n1,"' + "x\n" * 200, 10)
+    _feed_in_pieces(CsvValidator(), "a,b\n" + "1,2\n" * 200, 10)
+
+
+def test_commit_moves_a_valid_file_into_place(tmp_path):
+    content = "a,b\n1,é\n".encode()
+    path = tmp_path / "data.csv"
+    with StreamingUpload(str(path), "csv") as upload:
+        # Split inside the two-byte "é"
+        upload.write(content[:7])
+        upload.write(content[7:])
+        assert upload.commit() == hashlib.sha256(content).hexdigest()
+    assert path.read_bytes() == content and os.listdir(tmp_path) == ["data.csv"]
+
+
+def test_invalid_upload_leaves_nothing_behind(tmp_path):
+    with pytest.raises(InvalidUpload, match="not UTF-8"):
+        with StreamingUpload(str(tmp_path / "data.csv"), "csv") as upload:
+            upload.write(b"a,b\n1,\xff\n")
+    assert os.listdir(tmp_path) == []
+
+
+def _put(project_dir, upload_id, offset, data, max_bytes=1 << 20):
+    with ChunkWriter(project_dir, upload_id, offset, max_bytes) as writer:
+        writer.write(data)
+    return writer.offset
+
+
+def test_resumable_upload_resumes_at_received_offset(tmp_path):
+    data = b"a,b\n" + b"1,2\n" * 100
+    session = create_session(str(tmp_path), "d.csv", "csv", size=len(data))
+    assert _put(str(tmp_path), session.id, 0, data[:150]) == 150
+    with pytest.raises(OffsetMismatch) as e:
+        _put(str(tmp_path), session.id, 100, data[100:])
+    assert e.value.offset == 150
+    assert load_session(str(tmp_path), session.id)[1] == 150
+    with pytest.raises(UploadTooLarge):
+        _put(str(tmp_path), session.id, 150, data[150:] + b"x")
+
+    _put(str(tmp_path), session.id, 150, data[150:])
+    target = tmp_path / "d.csv"
+    with pytest.raises(InvalidUpload, match="checksum mismatch"):
+        finalize_session(str(tmp_path), session.id, str(target), sha256="0" * 64)
+    sha256 = hashlib.sha256(data).hexdigest()
+    assert finalize_session(str(tmp_path), session.id, str(target), sha256=sha256) == (sha256, len(data))
+    assert target.read_bytes() == data
+    with pytest.raises(FileNotFoundError):
+        load_session(str(tmp_path), session.id)
+
+
+def test_abandoned_sessions_are_collected(tmp_path):
+    project_dir = tmp_path / "p1"
+    stale = create_session(str(project_dir), "old.csv", "csv")
+    fresh = create_session(str(project_dir), "new.csv", "csv")
+    old = time.time() - 3600
+    os.utime(project_dir / "uploads" / stale.id / "session.json", (old, old))
+    assert collect_abandoned_sessions(str(tmp_path), ttl_seconds=60) == 1
+    with pytest.raises(FileNotFoundError):
+        load_session(str(project_dir), stale.id)
+    load_session(str(project_dir), fresh.id)
+    with pytest.raises(FileNotFoundError):
+        load_session(str(project_dir), "../../etc")
@@ -0,0 +1,113 @@
+import os
+import json
+import shutil
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, TrainingRun, Model
+from scheduler import TrainingScheduler
+from worker import TrainingWorker
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'queue.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def make_worker(session_factory, worker_id, **kwargs):
+    scheduler = TrainingScheduler(launch=None, session_factory=session_factory, max_concurrent=4, max_per_user=4)
+    return TrainingWorker(worker_id, session_factory=session_factory, scheduler=scheduler, **kwargs)
+
+
+def enqueue(session_factory, project_id):
+    scheduler = TrainingScheduler(launch=None, session_factory=session_factory)
+    return scheduler.enqueue(project_id, "alice", cpu_percent=100, max_duration=300, options={"resume": False})
+
+
+def test_only_one_worker_claims_a_run(session_factory):
+    run_id = enqueue(session_factory, "p1")
+    first, second = make_worker(session_factory, "w1"), make_worker(session_factory, "w2")
+    claimed = first.claim()
+    assert claimed["id"] == run_id and claimed["options"]["max_duration"] == 300
+    assert second.claim() is None
+
+
+def test_claim_rechecks_the_cap_when_taking_the_run(session_factory, monkeypatch):
+    first_id, second_id = enqueue(session_factory, "p1"), enqueue(session_factory, "p2")
+    first, second = make_worker(session_factory, "w1"), make_worker(session_factory, "w2")
+    first.scheduler.max_concurrent = second.scheduler.max_concurrent = 1
+    db = session_factory()
+    # Both workers looked at the queue while the slot was still free
+    stale = [(db.get(TrainingRun, second_id), [])]
+    monkeypatch.setattr(second.scheduler, "runnable", lambda _db: iter(stale))
+    assert first.claim()["id"] == first_id
+    assert second.claim() is None
+    assert db.get(TrainingRun, second_id).status == "queued"
+    db.close()
+
+
+def test_expired_lease_moves_run_to_another_worker(session_factory):
+    run_id = enqueue(session_factory, "p1")
+    stalled, healthy = make_worker(session_factory, "w1"), make_worker(session_factory, "w2")
+    stalled.claim()
+    assert healthy.reclaim_expired() == 0
+
+    db = session_factory()
+    db.get(TrainingRun, run_id).lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    db.close()
+
+    assert healthy.reclaim_expired() == 1
+    claimed = healthy.claim()
+    assert claimed["id"] == run_id and claimed["options"]["resume"] is True
+    # The stalled worker finds out on its next heartbeat
+    assert not stalled.report(run_id, progress="still here")
+    assert healthy.report(run_id, progress="working")
+
+
+def test_workers_share_queue_and_report_results(training_project, session_factory):
+    second_project = "test-project-2"
+    shutil.copytree(os.path.join("projects", training_project), os.path.join("projects", second_project))
+    for project_id in (training_project, second_project):
+        with open(os.path.join("projects", f"{project_id}.json"), "w") as f:
+            json.dump({"owner": "alice"}, f)
+    run_ids = [enqueue(session_factory, p) for p in (training_project, second_project)]
+
+    stop = threading.Event()
+    workers = [make_worker(session_factory, f"w{i}", heartbeat_seconds=0.5, poll_seconds=0.2) for i in range(2)]
+    threads = [threading.Thread(target=w.run_forever, args=(stop,)) for w in workers]
+    for t in threads:
+        t.start()
+    try:
+        db = session_factory()
+        for _ in range(600):
+            runs = [db.get(TrainingRun, run_id) for run_id in run_ids]
+            # Usage is recorded just after the run is marked completed
+            if all(r.status == "completed" and r.wall_seconds is not None for r in runs):
+                break
+            stop.wait(0.5)
+            db.expire_all()
+        for run in runs:
+            assert run.status == "completed"
+            assert run.worker_id in ("w0", "w1") and run.end_time is not None
+            assert json.loads(run.result_json)["cv_score"] > 0.5
+            assert run.progress
+            # Resources used, sampled from the worker's process tree
+            assert run.wall_seconds > 0 and run.peak_rss_mb > 0
+            assert "full_cv" in json.loads(run.stage_seconds_json)
+        models = db.query(Model).all()
+        assert sorted(m.project_id for m in models) == sorted([training_project, second_project])
+        assert all(m.training_time > 0 for m in models)
+        db.close()
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+    with open(os.path.join("projects", f"{second_project}.json")) as f:
+        assert json.load(f)["status"] == "completed"
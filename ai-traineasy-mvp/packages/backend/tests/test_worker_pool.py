@@ -0,0 +1,42 @@
+import os
+import json
+
+from utils.worker_pool import TrainingWorkerPool
+
+
+def test_pool_runs_jobs_and_recycles_workers(training_project):
+    pool = TrainingWorkerPool(size=1, max_jobs=1)
+    pool.start()
+    try:
+        log_path = os.path.join("projects", training_project, "train.log")
+        first = pool.submit(training_project, log_path, max_duration=300)
+        assert first.wait(timeout=120) == 0
+        with open(log_path) as f:
+            assert "CV score" in f.read()
+        with open(os.path.join("projects", training_project, "training_log.json")) as f:
+            assert json.load(f)["status"] == "completed"
+
+        # max_jobs=1: the second job runs in a fresh worker
+        second = pool.submit("missing-project", log_path)
+        assert second.wait(timeout=120) == 1
+        assert second.pid != first.pid
+        with open(log_path) as f:
+            assert "Traceback" in f.read()
+    finally:
+        pool.shutdown()
+
+
+def test_killed_worker_fails_its_job_and_is_replaced(training_project):
+    pool = TrainingWorkerPool(size=1)
+    pool.start()
+    try:
+        log_path = os.path.join("projects", training_project, "train.log")
+        job = pool.submit(training_project, log_path, max_duration=300)
+        assert job.wait_started(timeout=120) is not None
+        pool.kill(job)
+        assert job.wait(timeout=30) not in (None, 0)
+
+        retry = pool.submit(training_project, log_path, max_duration=300)
+        assert retry.wait(timeout=120) == 0
+    finally:
+        pool.shutdown()
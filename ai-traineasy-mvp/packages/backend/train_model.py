@@ -1,6 +1,8 @@
-import sys, os, json
+import sys, os, json, time
+import argparse
 import importlib
 import subprocess
+from contextlib import nullcontext
 
 def ensure_packages(packages):
     """Check and install missing packages at runtime."""
@@ -16,108 +18,587 @@ ensure_packages([
     "pandas", "sklearn", "lightgbm", "joblib", "torch", "psutil", "GPUtil"
 ])
 
+import numpy as np
 import pandas as pd
-from joblib import dump
-from sklearn.model_selection import cross_val_score
+from joblib import Parallel, delayed, dump, load, parallel_config
+from threadpoolctl import threadpool_limits
+from sklearn.base import clone, is_classifier
+from sklearn.utils import get_tags, _safe_indexing
+from sklearn.model_selection import check_cv
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import SimpleImputer
-from sklearn.preprocessing import OneHotEncoder, StandardScaler, LabelEncoder
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
-from lightgbm import LGBMClassifier, LGBMRegressor
+from sklearn.preprocessing import StandardScaler, LabelEncoder
 import torch
 
-# 1) Setup paths
-project_id = sys.argv[1]
-base_dir = os.path.join("projects", project_id)
-data_dir = os.path.join(base_dir, "data")
-schema_path = os.path.join(base_dir, "schema.json")
-
-# 2) Load schema & data
-with open(schema_path) as f:
-    schema = json.load(f)
-features, target = schema["inputs"], schema["output"]
-
-# Assume first file in data_dir
-files = [f for f in os.listdir(data_dir) if f.endswith((".csv", ".json"))]
-file_path = os.path.join(data_dir, files[0])
-df = pd.read_csv(file_path) if file_path.endswith(".csv") else pd.read_json(file_path)
-
-# 3) Separate X/y and drop fully empty rows
-df = df.dropna(subset=features + [target], how="all")
-X, y = df[features], df[target].copy()
-
-# 4) Encode target if categorical
-if y.dtype == "object" or y.dtype.name == "category":
-    le = LabelEncoder()
-    y = le.fit_transform(y)
-    dump(le, os.path.join(base_dir, "label_encoder.pkl"))
-
-# 5) Identify numeric vs categorical features
-num_cols = X.select_dtypes(include=["number"]).columns.tolist()
-cat_cols = X.select_dtypes(include=["object", "category"]).columns.tolist()
-
-# 6) Build preprocessing pipeline
-numeric_transformer = Pipeline([
-    ("imputer", SimpleImputer(strategy="mean")),
-    ("scaler", StandardScaler())
-])
-categorical_transformer = Pipeline([
-    ("imputer", SimpleImputer(strategy="most_frequent")),
-    ("onehot", OneHotEncoder(handle_unknown="ignore"))
-])
+from utils.budget import TrainingBudget, BudgetExceeded
+from utils.early_stopping import select_n_estimators
+from utils.candidates import compute_meta_features, select_candidates
+from utils.resources import plan_resources, apply_thread_limit
+from utils.isolation import isolate, memory_share_mb
+from utils.sampling import selection_sample
+from utils.checkpoint import TrainingCheckpoint, data_fingerprint
+from utils.profiler import profile_dataframe, load_cached_profile, save_profile
+from utils.incremental import new_data_files, drift_reason, supports_continuation, continue_training
+from utils.process_manager import job_control
+from utils.accounting import StageTimer
+from utils.ensemble import out_of_fold, build_ensemble
+from utils.encoding import categorical_transformers, split_by_cardinality, encoding_summary
+from utils.screening import screen_features
+from utils.progress import ProgressReporter
 
-preprocessor = ColumnTransformer([
-    ("num", numeric_transformer, num_cols),
-    ("cat", categorical_transformer, cat_cols),
-])
 
-# 7) Choose model candidates based on problem type
-is_classification = len(set(y)) <= 20  # heuristic
-
-# Detect device: use GPU if available, else CPU
-if torch.cuda.is_available():
-    device = 'cuda'
-    print('GPU detected. Training will use CUDA.')
-else:
-    device = 'cpu'
-    print('No GPU detected. Training will use CPU.')
-
-candidates = {
-    "RandomForest": RandomForestClassifier(n_estimators=100) if is_classification else RandomForestRegressor(n_estimators=100),
-    "LightGBM": (LGBMClassifier(n_estimators=100, device=device) if is_classification else LGBMRegressor(n_estimators=100, device=device)),
-}
-
-# 8) Evaluate each in a pipeline
-best_name, best_score, best_pipeline = None, -float("inf"), None
-for name, model in candidates.items():
+# Share of missing values above which categoricals get a "missing" category
+MISSING_CATEGORY_SHARE = 0.2
+# Cross-validation folds per candidate
+N_FOLDS = 3
+
+
+def save_artifact(obj, path):
+    """Dump ``obj`` next to ``path`` and atomically move it into place."""
+    tmp_path = f"{path}.tmp"
+    dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_training_log(base_dir, log):
+    tmp_path = os.path.join(base_dir, "training_log.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(log, f, indent=2)
+    os.replace(tmp_path, os.path.join(base_dir, "training_log.json"))
+
+
+def load_data_files(data_dir, files):
+    """Read and stack the given data files; returns the frame and rows per file."""
+    frames = {}
+    for name in files:
+        path = os.path.join(data_dir, name)
+        frames[name] = pd.read_csv(path) if path.endswith(".csv") else pd.read_json(path)
+    df = pd.concat(frames.values(), ignore_index=True) if len(frames) > 1 else next(iter(frames.values()))
+    return df, {name: len(frame) for name, frame in frames.items()}
+
+
+def incremental_retrain(base_dir, data_dir, files, features, target):
+    """Grow the previous run's model on data files added since that run.
+
+    The fitted preprocessor is reused as-is, LightGBM continues boosting from
+    its booster and forests add trees. Returns ``(log, None)`` on success or
+    ``(None, reason)`` when a full retrain is needed instead.
+    """
+    log_path = os.path.join(base_dir, "training_log.json")
+    model_path = os.path.join(base_dir, "model.pkl")
+    if not (os.path.exists(log_path) and os.path.exists(model_path)):
+        return None, "no previous model"
+    with open(log_path) as f:
+        previous = json.load(f)
+    if previous.get("status") != "completed":
+        return None, f"previous run ended with status '{previous.get('status')}'"
+    if previous.get("features") != features or previous.get("target") != target:
+        return None, "schema changed"
+    added = new_data_files(list(previous.get("data_files", {})), files)
+    if added is None:
+        return None, "previously used data files changed"
+    if not added:
+        return None, "no new data files"
+
+    df_new, added_rows = load_data_files(data_dir, added)
+    df_new = df_new.dropna(subset=features + [target], how="all")
+    X_new, y_new = df_new[features], df_new[target].copy()
+
+    pipeline = load(model_path)
+    if not isinstance(pipeline, Pipeline):
+        return None, f"{previous.get('selected_model')} cannot be trained incrementally"
+    pre, model = pipeline.named_steps["pre"], pipeline.named_steps["model"]
+    if not supports_continuation(model):
+        return None, f"{previous.get('selected_model')} cannot be trained incrementally"
+    reason = drift_reason(pre, X_new)
+    if reason:
+        return None, reason
+
+    le_path = os.path.join(base_dir, "label_encoder.pkl")
+    if os.path.exists(le_path):
+        le = load(le_path)
+        unseen = set(y_new.dropna()) - set(le.classes_)
+        if unseen:
+            return None, f"new target labels {sorted(map(str, unseen))}"
+        y_new = le.transform(y_new)
+    if hasattr(model, "classes_") and set(pd.unique(y_new)) != set(model.classes_):
+        return None, "new data does not cover every class"
+
+    previous_rows = sum(previous["data_files"].values())
+    added_rounds = continue_training(model, pre.transform(X_new), y_new, len(X_new) / previous_rows)
+    save_artifact(pipeline, model_path)
+
+    log = {k: v for k, v in previous.items() if k != "fallback_reason"}
+    log.update(
+        training_path="incremental",
+        data_files={**previous["data_files"], **added_rows},
+        incremental={"added_files": added, "added_rows": len(X_new), "added_rounds": added_rounds},
+    )
+    print(f"Incremental retrain: {len(X_new)} new rows, {added_rounds} rounds/trees added "
+          f"to {previous.get('selected_model')}")
+    return log, None
+
+
+def build_pipeline(preprocessor, model, plan, iterations=None):
+    model = clone(model)
+    apply_thread_limit(model, plan.model_threads)
+    preprocessor = clone(preprocessor)
+    if not get_tags(model).input_tags.sparse:
+        # e.g. HistGradientBoosting: have the ColumnTransformer emit dense output
+        preprocessor.set_params(sparse_threshold=0)
     pipe = Pipeline([("pre", preprocessor), ("model", model)])
-    scores = cross_val_score(pipe, X, y, cv=3, n_jobs=-1)
-    avg = scores.mean()
-    print(f"{name}: CV score={avg:.4f}")
-    if avg > best_score:
-        best_score, best_name, best_pipeline = avg, name, pipe
-
-# 9) Train final pipeline on full data
-print(f"Training final {best_name} on full dataset…")
-best_pipeline.fit(X, y)
-
-# 10) Persist the pipeline and log metadata
-dump(best_pipeline, os.path.join(base_dir, "model.pkl"))
-log = {
-    "problem_type": "classification" if is_classification else "regression",
-    "scores": {name: float(f"{cross_val_score(Pipeline([('pre', preprocessor),('model', m)]), X, y, cv=3).mean():.4f}")
-               for name, m in candidates.items()},
-    "selected_model": best_name,
-    "cv_score": float(f"{best_score:.4f}"),
-    "features": features,
-    "num_features": len(num_cols),
-    "cat_features": len(cat_cols),
-}
-with open(os.path.join(base_dir, "training_log.json"), "w") as f:
-    json.dump(log, f, indent=2)
-
-print("✅ AutoML training complete. Log saved.")
+    if iterations:
+        pipe.set_params(model__n_estimators=iterations["selected"])
+    return pipe
+
+
+def _fit_fold(pipe, X, y, train_idx, test_idx, fold):
+    pipe.fit(_safe_indexing(X, train_idx), _safe_indexing(y, train_idx))
+    return fold, pipe, pipe.score(_safe_indexing(X, test_idx), _safe_indexing(y, test_idx))
+
+
+def cross_validate_folds(pipe, X, y, n_jobs, on_fold=None):
+    """Fit and score ``pipe`` on each fold, as ``cross_validate`` does.
+
+    Folds are reported to ``on_fold(fold, score)`` as they finish rather
+    than once all of them have. Returns the fold estimators, their scores
+    and test indices, in fold order.
+    """
+    splits = list(check_cv(N_FOLDS, y, classifier=is_classifier(pipe)).split(X, y))
+    fitted = {}
+    for fold, estimator, score in Parallel(n_jobs=n_jobs, return_as="generator_unordered")(
+            delayed(_fit_fold)(clone(pipe), X, y, train, test, fold) for fold, (train, test) in enumerate(splits)):
+        fitted[fold] = estimator, score
+        if on_fold is not None:
+            on_fold(fold, score)
+    estimators = [fitted[fold][0] for fold in range(len(splits))]
+    scores = np.array([fitted[fold][1] for fold in range(len(splits))])
+    return estimators, scores, [test for _, test in splits]
+
+
+def evaluate_candidates(candidates, preprocessor, X, y, plan, budget, results, model_path,
+                        checkpoint, stage, progress, keep_folds=False):
+    """Cross-validate each candidate, filling ``results`` as each one finishes.
+
+    Candidates are skipped once the slowest one so far no longer fits in the
+    remaining budget; returns False if any were skipped. Whenever a candidate
+    beats the ones before it, its best fold model is saved to ``model_path``.
+    Each result is recorded in ``checkpoint`` under ``stage``, and candidates
+    a previous attempt already evaluated are not run again. With
+    ``keep_folds`` each fresh result also keeps its fold models and their
+    out-of-fold predictions for the stacking stage, in the checkpoint too; a
+    checkpointed candidate without them is evaluated again. Each finished
+    fold and candidate is reported to ``progress``.
+    """
+    best_score, slowest = -float("inf"), None
+    complete = True
+    progress.expect(len(candidates) * N_FOLDS)
+    for name, model in candidates.items():
+        cached = checkpoint.candidate_result(stage, name)
+        folds = checkpoint.candidate_folds(stage, name) if cached is not None and keep_folds else None
+        if cached is not None and (folds is not None or not keep_folds):
+            print(f"{name}: CV score={cached['score']:.4f} (resumed from checkpoint)")
+            progress.skip(N_FOLDS)
+            results[name] = dict(cached, pipeline=build_pipeline(preprocessor, model, plan,
+                                                                 cached.get("iterations")), **(folds or {}))
+            best_score = max(best_score, cached["score"])
+            continue
+        if not budget.can_afford(slowest):
+            print(f"Skipping {name}: {budget.remaining:.0f}s left, "
+                  f"estimated {slowest:.0f}s needed")
+            progress.skip(N_FOLDS)
+            progress.emit("candidate_skipped", candidate=name)
+            complete = False
+            continue
+        started = time.monotonic()
+        pipe = build_pipeline(preprocessor, model, plan)
+        progress.emit("candidate_started", candidate=name)
+        fold_estimators, scores, test_indices = cross_validate_folds(
+            pipe, X, y, plan.cv_jobs,
+            on_fold=lambda fold, score: progress.unit_done(name, fold, score=round(float(score), 4)))
+        avg = scores.mean()
+        print(f"{name}: CV score={avg:.4f}")
+        took = time.monotonic() - started
+        slowest = max(slowest or 0.0, took)
+        result = {"score": float(avg), "fold_scores": scores.tolist(), "seconds": took}
+        progress.emit("candidate_finished", candidate=name, score=round(float(avg), 4))
+        fold_models = [e.named_steps["model"] for e in fold_estimators]
+        if hasattr(fold_models[0], "best_iteration_"):
+            # Reuse the early-stopping pick so the final fit does not search again
+            n_rounds = select_n_estimators(fold_models)
+            pipe.set_params(model__n_estimators=n_rounds)
+            result["iterations"] = {
+                "folds": [int(m.best_iteration_) for m in fold_models],
+                "selected": n_rounds,
+            }
+            print(f"{name}: early stopping picked {n_rounds} rounds")
+        folds = None
+        if keep_folds:
+            folds = {"fold_estimators": fold_estimators, "oof": out_of_fold(fold_estimators, test_indices, X)}
+        checkpoint.record_candidate(stage, name, result, folds)
+        results[name] = dict(result, pipeline=pipe, **(folds or {}))
+        if avg > best_score:
+            best_score = avg
+            save_artifact(fold_estimators[scores.argmax()], model_path)
+    return complete
+
+
+def pick_best(results):
+    if not results:
+        return None, None
+    name = max(results, key=lambda n: results[n]["score"])
+    return name, results[name]["pipeline"]
+
+
+def train(project_id, max_duration=None, cpu_percent=100, selection_rows=50_000, top_k=2,
+          incremental=False, resume=False, cores=None, memory_mb=None, ensemble=False,
+          screen=False):
+    """Train a project's model, confined to ``cores`` and ``memory_mb``.
+
+    Without ``cores`` the job is not pinned and only sizes its threads to
+    what ``cpu_percent`` allows: cores nobody allocated would be the same
+    for every concurrent job. With ``screen`` features that cannot help are
+    dropped before candidates are evaluated.
+    """
+    budget = TrainingBudget(max_duration)
+    base_dir = os.path.join("projects", project_id)
+    # Paused time is not charged to the interrupted stage. Each stage start
+    # is also a progress event for the UI.
+    progress = ProgressReporter(base_dir, clock=lambda: budget.elapsed, remaining=lambda: budget.remaining)
+    stages = StageTimer(clock=lambda: budget.elapsed, on_start=progress.start_stage)
+    if memory_mb is None and cores:
+        memory_mb = memory_share_mb(len(cores))
+    # Pause, resume and cancel arrive as signals to the process group
+    with job_control(budget), (isolate(cores, memory_mb) if cores else nullcontext()) as isolation:
+        try:
+            return _train(budget, isolation, progress, stages, project_id, cpu_percent, selection_rows,
+                          top_k, incremental, resume, ensemble, screen)
+        except BudgetExceeded as e:
+            # The deadline passed while loading or preparing the data; candidate
+            # evaluation handles its own, so there is no model at all
+            print(f"⏱️ {e}")
+            stages.stop()
+            return budget_exhausted(base_dir, progress, {
+                "scores": {}, "selected_model": None, "cv_score": None, "max_duration": budget.max_duration,
+                "stage_seconds": stages.seconds, "elapsed_seconds": round(budget.elapsed, 2),
+            })
+        finally:
+            budget.disarm()
+
+
+def budget_exhausted(base_dir, progress, log):
+    """Record a run whose budget ran out before any model finished."""
+    log["status"] = "failed_budget"
+    write_training_log(base_dir, log)
+    progress.emit("finished", status=log["status"], selected_model=None)
+    print("❌ Training budget exhausted before any model finished.")
+    return log
+
+
+def _train(budget, isolation, progress, stages, project_id, cpu_percent, selection_rows, top_k,
+           incremental, resume, ensemble, screen):
+    budget.arm()
+
+    # Split the CPU allowance between CV folds and model threads up front so
+    # nested parallelism never asks for more cores than the job was given.
+    # A pinned job already holds exactly its share.
+    if isolation is not None:
+        plan = plan_resources(100, n_folds=N_FOLDS, host_cores=len(isolation.cores))
+        print(f"Isolation: cores {isolation.cores}, memory {isolation.memory_mb} MB via "
+              f"{'cgroup ' + isolation.cgroup if isolation.cgroup else 'affinity and rlimits'}")
+    else:
+        plan = plan_resources(cpu_percent, n_folds=N_FOLDS)
+    print(f"Resource plan: {plan.cores} cores -> {plan.cv_jobs} CV jobs x "
+          f"{plan.model_threads} model threads")
+
+    # 1) Setup paths
+    base_dir = os.path.join("projects", project_id)
+    data_dir = os.path.join(base_dir, "data")
+    schema_path = os.path.join(base_dir, "schema.json")
+    model_path = os.path.join(base_dir, "model.pkl")
+    stages.start("load")
+
+    # 2) Load schema & data
+    with open(schema_path) as f:
+        schema = json.load(f)
+    features, target = schema["inputs"], schema["output"]
+
+    # Uploads are timestamp-prefixed, so sorted order is upload order
+    files = sorted(f for f in os.listdir(data_dir) if f.endswith((".csv", ".json")))
+
+    # Appended data can often just grow the previous model
+    fallback_reason = None
+    if incremental:
+        stages.start("incremental")
+        log, fallback_reason = incremental_retrain(base_dir, data_dir, files, features, target)
+        if log is not None:
+            budget.disarm()
+            stages.stop()
+            log["stage_seconds"] = stages.seconds
+            log["elapsed_seconds"] = round(budget.elapsed, 2)
+            write_training_log(base_dir, log)
+            progress.emit("finished", status=log["status"], selected_model=log.get("selected_model"))
+            print("✅ Incremental training complete. Log saved.")
+            return log
+        print(f"Incremental retrain not possible ({fallback_reason}); retraining from scratch")
+        stages.start("load")
+
+    # Stage state survives a crashed process; --resume skips finished stages
+    fingerprint = data_fingerprint(data_dir, files)
+    checkpoint = TrainingCheckpoint(base_dir, resume=resume, key={
+        "data": fingerprint, "schema": schema,
+        "selection_rows": selection_rows, "top_k": top_k, "screen": screen,
+        # Only runs with ensembling checkpoint the fold models stacking needs
+        "ensemble": ensemble,
+    })
+    # The dataset profile is cached next to the data and reused while the
+    # files are unchanged
+    profile = load_cached_profile(base_dir, fingerprint)
+    dataset = checkpoint.load_dataset()
+    if dataset is not None:
+        X, y, data_files = dataset
+        print(f"Resuming from checkpoint: dataset of {len(X)} rows already loaded")
+    else:
+        df, data_files = load_data_files(data_dir, files)
+        if profile is None:
+            profile = profile_dataframe(df)
+            save_profile(base_dir, fingerprint, profile)
+
+        # 3) Separate X/y and drop fully empty rows
+        df = df.dropna(subset=features + [target], how="all")
+        X, y = df[features], df[target].copy()
+
+        # 4) Encode target if categorical
+        if profile["columns"][target]["kind"] == "categorical":
+            le = LabelEncoder()
+            y = le.fit_transform(y)
+            save_artifact(le, os.path.join(base_dir, "label_encoder.pkl"))
+        checkpoint.save_dataset(X, y, data_files)
+
+    if profile is None:
+        # Resumed without a cached profile: rebuild it from the checkpointed frame
+        profile = profile_dataframe(X.assign(**{target: y}))
+        save_profile(base_dir, fingerprint, profile)
+
+    stages.start("prepare")
+
+    # 5) Identify numeric vs categorical features from the profile; columns
+    #    with no values at all carry nothing to learn from
+    columns = profile["columns"]
+    empty_cols = [c for c in features if columns[c]["nulls"] == profile["rows"]]
+    num_cols = [c for c in features if columns[c]["kind"] == "numeric" and c not in empty_cols]
+    cat_cols = [c for c in features if columns[c]["kind"] == "categorical" and c not in empty_cols]
+    if empty_cols:
+        print(f"Ignoring empty columns: {', '.join(empty_cols)}")
+
+    is_classification = columns[target]["cardinality"] <= 20  # heuristic
+
+    # Optionally screen out constant, duplicate and uninformative features so
+    # no candidate pays for them
+    screening = None
+    if screen:
+        stages.start("screening")
+        num_cols, cat_cols, screening = screen_features(X, y, num_cols, cat_cols, is_classification,
+                                                        n_jobs=plan.cores)
+        print(f"Feature screening kept {screening['retained']} of {screening['features']} features "
+              f"in {screening['seconds']}s"
+              + (f" (cheap model fits {screening['fit_speedup']}x faster)" if "fit_speedup" in screening else ""))
+        for col, reason in screening["dropped"].items():
+            print(f"  dropped {col}: {reason}")
+        stages.start("prepare")
+
+    # 6) Build preprocessing pipeline. When categoricals are mostly missing,
+    #    "missing" is its own category rather than the mode. Categoricals are
+    #    encoded by cardinality, so ID-like columns do not explode the width.
+    cat_null_share = max((columns[c]["nulls"] / profile["rows"] for c in cat_cols), default=0)
+    numeric_transformer = Pipeline([
+        ("imputer", SimpleImputer(strategy="mean")),
+        ("scaler", StandardScaler())
+    ])
+    cat_imputer = (SimpleImputer(strategy="constant", fill_value="missing") if cat_null_share > MISSING_CATEGORY_SHARE
+                   else SimpleImputer(strategy="most_frequent"))
+
+    preprocessor = ColumnTransformer([
+        ("num", numeric_transformer, num_cols),
+        *categorical_transformers(profile, cat_cols, cat_imputer, is_classification),
+    ])
+    one_hot_cols, high_card_cols = split_by_cardinality(profile, cat_cols)
+    encoding = dict(encoding_summary(preprocessor, X, y, is_classification),
+                    one_hot=one_hot_cols, target_frequency=high_card_cols)
+    print(f"Encoded width {encoding['width']} ({'sparse' if encoding['sparse'] else 'dense'}, "
+          f"{encoding['memory_mb']} MB)"
+          + (f"; target/frequency encoded: {', '.join(high_card_cols)}" if high_card_cols else ""))
+
+    # 7) Choose model candidates based on problem type
+
+    # Detect device: use GPU if available, else CPU
+    if torch.cuda.is_available():
+        device = 'cuda'
+        print('GPU detected. Training will use CUDA.')
+    else:
+        device = 'cpu'
+        print('No GPU detected. Training will use CPU.')
+
+    # A cheap meta-feature pass decides which candidates are worth it; they
+    # come back cheapest first, so a tight budget still yields a model early
+    meta_features = compute_meta_features(profile, num_cols, cat_cols, target, is_classification,
+                                          encoded_width=encoding["width"])
+    candidates, skipped_candidates = select_candidates(meta_features, is_classification, device)
+    print(f"Candidates: {', '.join(candidates)}"
+          + (f" (skipped: {', '.join(skipped_candidates)})" if skipped_candidates else ""))
+
+    log = {
+        "status": "completed",
+        "problem_type": "classification" if is_classification else "regression",
+        "scores": {},
+        "selected_model": None,
+        "cv_score": None,
+        "features": features,
+        "target": target,
+        "data_files": data_files,
+        "training_path": "full",
+        "empty_features": empty_cols,
+        "num_features": len(num_cols),
+        "cat_features": len(cat_cols),
+        "encoding": encoding,
+        "screening": screening,
+        "max_duration": budget.max_duration,
+        "resources": plan.model_dump(),
+        "isolation": isolation.model_dump() if isolation is not None else None,
+        "meta_features": meta_features,
+        "skipped_candidates": skipped_candidates,
+    }
+    if fallback_reason:
+        log["fallback_reason"] = fallback_reason
+
+    # 8) Evaluate each in a pipeline, scheduling candidates against the remaining
+    #    budget. The best fold model is checkpointed as soon as it exists so a
+    #    deadline never leaves the project without a model. On large datasets
+    #    candidates are ranked on a sample first and only the top ones get
+    #    full-data CV.
+    results, sample_results, sample_ranking = {}, {}, []
+    use_sample = selection_rows is not None and len(X) > selection_rows
+    try:
+        with threadpool_limits(limits=plan.blas_threads), \
+                parallel_config(backend="loky", inner_max_num_threads=plan.model_threads):
+            finalists = candidates
+            if use_sample:
+                stages.start("sample_cv")
+                X_s, y_s = selection_sample(X, y, selection_rows, stratify=is_classification)
+                print(f"Ranking candidates on a {len(X_s)}-row sample of {len(X)} rows")
+                log["selection"] = {"sample_rows": len(X_s), "total_rows": len(X), "top_k": top_k}
+                complete = evaluate_candidates(candidates, preprocessor, X_s, y_s, plan, budget,
+                                               sample_results, model_path, checkpoint, "sample", progress)
+                sample_ranking = sorted(sample_results, key=lambda n: sample_results[n]["score"], reverse=True)
+                log["selection"]["sample_scores"] = {n: round(sample_results[n]["score"], 4) for n in sample_ranking}
+                finalists = {n: candidates[n] for n in sample_ranking[:top_k]}
+                if not complete:
+                    log["status"] = "completed_budget"
+
+            stages.start("full_cv")
+            if not evaluate_candidates(finalists, preprocessor, X, y, plan, budget, results, model_path,
+                                       checkpoint, "full", progress, keep_folds=ensemble):
+                log["status"] = "completed_budget"
+            best_name, best_pipeline = pick_best(results)
+
+            # 9) Optionally stack the best candidates on their out-of-fold
+            #    predictions. The fold models are reused, nothing is refit.
+            stacked = None
+            if ensemble and best_pipeline is not None:
+                stages.start("ensemble")
+                stacked, log["ensemble"] = build_ensemble(results, X, y, is_classification, best_name)
+                if log["ensemble"] is None:
+                    print("Ensemble skipped: fewer than two candidates with out-of-fold predictions")
+                else:
+                    print(f"Ensemble of {', '.join(log['ensemble']['members'])}: CV score="
+                          f"{log['ensemble']['cv_score']:.4f}, {log['ensemble']['latency_ms']['ensemble']} ms "
+                          f"per prediction ({'selected' if stacked is not None else 'not better, discarded'})")
+
+            # 10) Train final pipeline on full data if the budget allows it. A full
+            #     fit costs about one fold fit scaled up to all rows.
+            if stacked is not None:
+                save_artifact(stacked, model_path)
+            elif best_pipeline is not None and checkpoint.final_done:
+                print(f"Final {best_name} already trained (resumed from checkpoint)")
+            elif best_pipeline is not None and budget.can_afford(results[best_name]["seconds"] / N_FOLDS * 1.5):
+                print(f"Training final {best_name} on full dataset…")
+                stages.start("final_fit")
+                progress.estimate(results[best_name]["seconds"] / N_FOLDS * 1.5)
+                # No fold-level parallelism left, so the model gets every core
+                apply_thread_limit(best_pipeline.named_steps["model"], plan.cores)
+                best_pipeline.fit(X, y)
+                save_artifact(best_pipeline, model_path)
+                checkpoint.mark_final()
+            elif best_pipeline is not None:
+                print(f"Not enough budget for a full refit; keeping best fold model of {best_name}")
+                log["status"] = "completed_budget"
+    except BudgetExceeded as e:
+        print(f"⏱️ {e}")
+        log["status"] = "completed_budget"
+    finally:
+        budget.disarm()
+        stages.stop()
+    log["stage_seconds"] = stages.seconds
+
+    best_name, best_pipeline = pick_best(results)
+    if best_pipeline is None and sample_results:
+        # Deadline hit before any full-data CV finished; the sample winner's
+        # fold model is what was checkpointed
+        best_name, _ = pick_best(sample_results)
+        results = sample_results
+    log["scores"] = {n: round(r["score"], 4) for n, r in results.items()}
+    for name, r in results.items():
+        if "iterations" in r:
+            log.setdefault("iterations", {})[name] = r["iterations"]
+    if use_sample and results and results is not sample_results:
+        full_ranking = sorted(results, key=lambda n: results[n]["score"], reverse=True)
+        log["selection"]["full_ranking"] = full_ranking
+        log["selection"]["ranking_agreed"] = full_ranking == sample_ranking[:len(full_ranking)]
+
+    if best_name is None:
+        return budget_exhausted(base_dir, progress, log)
+    log.update(selected_model=best_name, cv_score=round(results[best_name]["score"], 4))
+    if log.get("ensemble") and log["ensemble"]["selected"]:
+        log.update(selected_model="StackedEnsemble", cv_score=log["ensemble"]["cv_score"])
+
+    # 11) Log metadata (the pipeline is already persisted)
+    log["elapsed_seconds"] = round(budget.elapsed, 2)
+    log["resumed"] = checkpoint.resumed
+    write_training_log(base_dir, log)
+    checkpoint.clear()
+    progress.emit("finished", status=log["status"], selected_model=log["selected_model"])
+
+    print("✅ AutoML training complete. Log saved.")
+    return log
 
 if __name__ == "__main__":
-    train(sys.argv[1])
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run AutoML training for a project")
+    parser.add_argument("project_id")
+    parser.add_argument("--max-duration", type=int, default=None,
+                        help="Wall-clock budget in seconds")
+    parser.add_argument("--cpu-percent", type=float, default=100,
+                        help="Share of the host's cores this job may use")
+    parser.add_argument("--cores", default=None,
+                        help="Comma-separated cores to pin the job to (default: not pinned, threads sized by --cpu-percent)")
+    parser.add_argument("--memory-mb", type=int, default=None,
+                        help="Memory limit (default: the host share matching the cores)")
+    parser.add_argument("--selection-rows", type=int, default=50_000,
+                        help="Rank candidates on a sample of this many rows when the data is larger (0 disables)")
+    parser.add_argument("--top-k", type=int, default=2,
+                        help="Candidates from the sample ranking that get full-data CV")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Grow the previous model on newly added data files when possible")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip stages a previous, interrupted run already finished")
+    parser.add_argument("--ensemble", action="store_true",
+                        help="Stack the best candidates on their out-of-fold predictions when that scores higher")
+    parser.add_argument("--screen-features", action="store_true",
+                        help="Drop constant, duplicate and uninformative features before evaluating candidates")
+    args = parser.parse_args()
+    result = train(args.project_id, max_duration=args.max_duration, cpu_percent=args.cpu_percent,
+                   selection_rows=args.selection_rows or None, top_k=args.top_k,
+                   incremental=args.incremental, resume=args.resume,
+                   cores=[int(c) for c in args.cores.split(",")] if args.cores else None,
+                   memory_mb=args.memory_mb, ensemble=args.ensemble, screen=args.screen_features)
+    sys.exit(0 if result["status"] != "failed_budget" else 1)
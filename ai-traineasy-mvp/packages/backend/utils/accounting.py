@@ -0,0 +1,128 @@
+import time
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+import psutil
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# How often a running job's process tree is sampled
+SAMPLE_SECONDS = 1.0
+
+
+class ResourceUsage(BaseModel):
+    """What a training job consumed, as sampled from outside."""
+    wall_seconds: float
+    cpu_seconds: float
+    peak_rss_mb: float
+    samples: int
+
+
+class StageTimer:
+    """Seconds spent in each named stage of a run.
+
+    ``clock`` defaults to wall time; the trainer passes its budget clock so
+    paused time is not charged to whatever stage was interrupted.
+    ``on_start`` is called with each stage's name as it starts.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic,
+                 on_start: Optional[Callable[[str], None]] = None):
+        self._clock = clock
+        self._on_start = on_start
+        self.seconds: Dict[str, float] = {}
+        self._stage: Optional[str] = None
+        self._started = 0.0
+
+    def start(self, stage: str) -> None:
+        """End the current stage, if any, and start timing ``stage``."""
+        self.stop()
+        self._stage, self._started = stage, self._clock()
+        if self._on_start is not None:
+            self._on_start(stage)
+
+    def stop(self) -> None:
+        if self._stage is not None:
+            elapsed = self._clock() - self._started
+            self.seconds[self._stage] = round(self.seconds.get(self._stage, 0.0) + elapsed, 2)
+            self._stage = None
+
+
+class ResourceAccountant:
+    """Sample a job's process tree for CPU time and resident memory.
+
+    CPU seconds are summed over every process seen in the tree (the job and
+    the workers it starts), less what long-lived processes, such as a pool
+    worker, had already used before the job. Peak RSS is the largest total
+    across samples, so spikes shorter than ``interval`` can be missed.
+    """
+
+    def __init__(self, pid: int, interval: float = SAMPLE_SECONDS):
+        self.pid = pid
+        self.interval = interval
+        self._baseline: Dict[int, float] = {}
+        self._cpu: Dict[int, float] = {}
+        self._peak_rss = 0
+        self._samples = 0
+        self._started = 0.0
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _tree(self):
+        try:
+            root = psutil.Process(self.pid)
+            return [root] + root.children(recursive=True)
+        except psutil.Error:
+            return []
+
+    @staticmethod
+    def _cpu_seconds(proc: psutil.Process) -> float:
+        times = proc.cpu_times()
+        return times.user + times.system
+
+    def start(self) -> "ResourceAccountant":
+        self._started = time.monotonic()
+        for proc in self._tree():
+            try:
+                self._baseline[proc.pid] = self._cpu_seconds(proc)
+            except psutil.Error:
+                pass
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def sample(self) -> None:
+        rss = 0
+        for proc in self._tree():
+            try:
+                with proc.oneshot():
+                    cpu = self._cpu_seconds(proc) - self._baseline.get(proc.pid, 0.0)
+                    rss += proc.memory_info().rss
+            except psutil.Error:
+                continue  # exited between listing and reading
+            # Exited processes keep the last value seen for them
+            self._cpu[proc.pid] = max(cpu, self._cpu.get(proc.pid, 0.0))
+        self._peak_rss = max(self._peak_rss, rss)
+        self._samples += 1
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning("Resource sampling of process %d failed: %s", self.pid, e)
+
+    def stop(self) -> ResourceUsage:
+        """Stop sampling and return the totals."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.sample()
+        return ResourceUsage(
+            wall_seconds=round(time.monotonic() - self._started, 2),
+            cpu_seconds=round(sum(self._cpu.values()), 2),
+            peak_rss_mb=round(self._peak_rss / (1024 * 1024), 1),
+            samples=self._samples,
+        )
@@ -0,0 +1,129 @@
+import os
+import re
+import stat
+import uuid
+import logging
+from typing import Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Content-addressed store shared by all projects; must be on the same
+# filesystem as projects/ so data files can be hardlinks into it
+BLOBS_DIR = os.getenv("BLOB_STORE_DIR", "blobs")
+_SHA256 = re.compile(r"[0-9a-f]{64}")
+
+
+def blob_path(root: str, sha256: str) -> str:
+    """Where the blob with ``sha256`` lives; raises ``ValueError`` for anything but a hex SHA-256."""
+    sha256 = sha256.lower()
+    if not _SHA256.fullmatch(sha256):
+        raise ValueError(f"not a SHA-256 digest: {sha256!r}")
+    return os.path.join(root, sha256[:2], sha256)
+
+
+def refcount(root: str, sha256: str) -> int:
+    """How many project data files reference the blob; 0 if it is unknown or unreferenced.
+
+    Every reference is a hardlink, so the count is the inode's link count
+    less the store's own entry.
+    """
+    try:
+        return os.stat(blob_path(root, sha256)).st_nlink - 1
+    except FileNotFoundError:
+        return 0
+
+
+def _link(source: str, path: str) -> None:
+    # Link beside the target and rename over it, so ``path`` is never missing or partial
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    os.link(source, tmp_path)
+    try:
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def link_owned_blob(root: str, sha256: str, path: str, data_dirs: Iterable[str]) -> Optional[int]:
+    """Make ``path`` a reference to a stored blob the caller already holds; returns its size.
+
+    Knowing a digest is not proof of having the content, so the blob is
+    only linked when one of ``data_dirs`` (the caller's own data) already
+    references it. Returns ``None`` when the blob is unknown or held only
+    by others; the caller cannot tell which.
+    """
+    try:
+        blob = os.stat(blob_path(root, sha256))
+    except FileNotFoundError:
+        return None
+    for data_dir in data_dirs:
+        try:
+            names = os.listdir(data_dir)
+        except FileNotFoundError:
+            continue
+        for name in names:
+            source = os.path.join(data_dir, name)
+            try:
+                info = os.stat(source)
+                if (info.st_dev, info.st_ino) != (blob.st_dev, blob.st_ino):
+                    continue
+                _link(source, path)
+            except FileNotFoundError:
+                continue
+            return info.st_size
+    return None
+
+
+def store_blob(root: str, path: str, sha256: str) -> bool:
+    """Turn the finished data file at ``path`` into a reference to its blob.
+
+    If the content is already stored, ``path`` is replaced by a link to the
+    existing blob and its own copy freed; otherwise the file becomes the
+    blob. Blobs are made read-only, since every project referencing one
+    shares it. Returns whether an existing blob was reused. Where hardlinks
+    are not possible the file is left as a private copy.
+    """
+    source = blob_path(root, sha256)
+    os.makedirs(os.path.dirname(source), exist_ok=True)
+    # Retried only for races with a concurrent store or collection
+    for _ in range(3):
+        try:
+            if os.path.exists(source):
+                _link(source, path)
+                return True
+            os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            os.link(path, source)
+            return False
+        except FileNotFoundError:
+            continue  # collected while we linked to it; store this copy instead
+        except FileExistsError:
+            continue  # the same content was stored concurrently; link to that
+        except OSError as e:
+            logger.warning("Could not add %s to the blob store, keeping a private copy: %s", path, e)
+            return False
+    return False
+
+
+def collect_blobs(root: str) -> Tuple[int, int]:
+    """Delete blobs no project references any more; returns how many and the bytes freed."""
+    removed = freed = 0
+    if not os.path.isdir(root):
+        return 0, 0
+    for prefix in os.listdir(root):
+        prefix_dir = os.path.join(root, prefix)
+        if not os.path.isdir(prefix_dir):
+            continue
+        for name in os.listdir(prefix_dir):
+            path = os.path.join(prefix_dir, name)
+            try:
+                info = os.stat(path)
+                if info.st_nlink > 1:
+                    continue
+                os.unlink(path)
+            except FileNotFoundError:
+                continue
+            removed += 1
+            freed += info.st_size
+    if removed:
+        logger.info("Removed %d unreferenced blobs (%d bytes)", removed, freed)
+    return removed, freed
@@ -0,0 +1,88 @@
+import signal
+import time
+import logging
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BudgetExceeded(Exception):
+    """Raised inside the training process when the wall-clock budget runs out."""
+
+
+class TrainingBudget:
+    """Wall-clock budget for a single training run.
+
+    ``max_duration`` is in seconds; ``None`` means unlimited. The budget is
+    used both cooperatively (``can_afford`` before starting a step) and as a
+    hard stop (``arm`` installs a SIGALRM that raises ``BudgetExceeded``).
+    """
+
+    def __init__(self, max_duration: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_duration = max_duration
+        self._clock = clock
+        self._started = clock()
+        self._armed = False
+        self._paused_at = None
+        self._paused_total = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        now = self._paused_at if self._paused_at is not None else self._clock()
+        return now - self._started - self._paused_total
+
+    @property
+    def remaining(self) -> float:
+        if self.max_duration is None:
+            return float("inf")
+        return max(0.0, self.max_duration - self.elapsed)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining <= 0
+
+    def can_afford(self, estimate: Optional[float]) -> bool:
+        """Whether a step expected to take ``estimate`` seconds fits in what is left.
+
+        Steps without an estimate yet are always allowed while time remains.
+        """
+        if self.expired:
+            return False
+        if estimate is None:
+            return True
+        return estimate <= self.remaining
+
+    def arm(self) -> None:
+        """Raise ``BudgetExceeded`` in the main thread once the deadline passes."""
+        if self.max_duration is None or not hasattr(signal, "SIGALRM"):
+            return
+
+        def _on_deadline(signum, frame):
+            raise BudgetExceeded(f"Training budget of {self.max_duration}s exhausted")
+
+        signal.signal(signal.SIGALRM, _on_deadline)
+        signal.setitimer(signal.ITIMER_REAL, max(self.remaining, 0.001))
+        self._armed = True
+
+    def pause(self) -> None:
+        """Stop the clock (and the deadline alarm) while the job is suspended."""
+        if self._paused_at is not None:
+            return
+        self._paused_at = self._clock()
+        if self._armed:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+    def resume(self) -> None:
+        if self._paused_at is None:
+            return
+        self._paused_total += self._clock() - self._paused_at
+        self._paused_at = None
+        if self._armed:
+            signal.setitimer(signal.ITIMER_REAL, max(self.remaining, 0.001))
+
+    def disarm(self) -> None:
+        if self._armed:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, signal.SIG_DFL)
+            self._armed = False
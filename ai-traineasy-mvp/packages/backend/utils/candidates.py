@@ -0,0 +1,131 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from sklearn.linear_model import LogisticRegression, Ridge
+from sklearn.ensemble import (
+    RandomForestClassifier, RandomForestRegressor,
+    ExtraTreesClassifier, ExtraTreesRegressor,
+    HistGradientBoostingClassifier, HistGradientBoostingRegressor,
+)
+from lightgbm import LGBMClassifier, LGBMRegressor
+
+from .early_stopping import EarlyStoppingLGBMClassifier, EarlyStoppingLGBMRegressor
+
+logger = logging.getLogger(__name__)
+
+# Below this many rows, or with more encoded columns than rows, a linear
+# baseline is as good as it gets and forests/boosting are not worth the time.
+SMALL_ROWS = 500
+# Histogram boosting only pays off once there is enough data to bin.
+HIST_GB_MIN_ROWS = 10_000
+# Histogram boosting needs dense input; skip it when the encoded matrix is wide.
+HIST_GB_MAX_WIDTH = 1_000
+# Bagged forests get slow on big data, where the boosters cover the ground.
+FOREST_MAX_ROWS = 200_000
+# Minority/majority class ratio under which classifiers use balanced weights.
+IMBALANCE_RATIO = 0.1
+
+
+def compute_meta_features(profile: dict, num_cols: List[str], cat_cols: List[str],
+                          target: str, is_classification: bool,
+                          encoded_width: Optional[int] = None) -> dict:
+    """Cheap dataset shape statistics, read off the dataset profile, used to pick candidates.
+
+    ``encoded_width`` is the measured width of the preprocessed matrix; by
+    default it is estimated as if every categorical were one-hot encoded.
+    """
+    columns, rows = profile["columns"], profile["rows"]
+    cardinality = {c: columns[c]["cardinality"] for c in cat_cols}
+    empty = sum(columns[c]["nulls"] + columns[c]["zeros"] for c in num_cols)
+    meta = {
+        "rows": rows,
+        "columns": len(num_cols) + len(cat_cols),
+        "encoded_width": encoded_width if encoded_width is not None else len(num_cols) + sum(cardinality.values()),
+        "numeric_sparsity": round(empty / (rows * len(num_cols)), 4) if num_cols and rows else 0.0,
+        "max_cardinality": max(cardinality.values(), default=0),
+    }
+    if is_classification:
+        counts = list(columns[target]["value_counts"].values())
+        meta["n_classes"] = len(counts)
+        meta["class_balance"] = round(min(counts) / max(counts), 4)
+    return meta
+
+
+def _small_or_wide(meta: dict) -> Optional[str]:
+    if meta["rows"] < SMALL_ROWS:
+        return f"only {meta['rows']} rows"
+    if meta["encoded_width"] > meta["rows"]:
+        return f"{meta['encoded_width']} encoded columns for {meta['rows']} rows"
+    return None
+
+
+def _hist_gb_skip(meta: dict) -> Optional[str]:
+    reason = _small_or_wide(meta)
+    if reason:
+        return reason
+    if meta["rows"] < HIST_GB_MIN_ROWS:
+        return f"fewer than {HIST_GB_MIN_ROWS} rows"
+    if meta["encoded_width"] > HIST_GB_MAX_WIDTH:
+        return f"needs dense input and encoded width is {meta['encoded_width']}"
+    return None
+
+
+def _forest_skip(meta: dict) -> Optional[str]:
+    reason = _small_or_wide(meta)
+    if reason:
+        return reason
+    if meta["rows"] > FOREST_MAX_ROWS:
+        return f"more than {FOREST_MAX_ROWS} rows"
+    return None
+
+
+# Ordered cheapest first. "skip" returns why a candidate is not worth
+# evaluating for the given meta-features, or None to evaluate it.
+CANDIDATE_REGISTRY = [
+    {
+        "name": "Linear",
+        "build": lambda clf, device: LogisticRegression(max_iter=1000) if clf else Ridge(),
+        "skip": lambda meta: None,
+    },
+    {
+        "name": "HistGradientBoosting",
+        "build": lambda clf, device: HistGradientBoostingClassifier() if clf else HistGradientBoostingRegressor(),
+        "skip": _hist_gb_skip,
+    },
+    {
+        # LightGBM picks its own round count by early stopping inside each fold
+        "name": "LightGBM",
+        "build": lambda clf, device: (EarlyStoppingLGBMClassifier(LGBMClassifier(device=device, verbose=-1)) if clf
+                                      else EarlyStoppingLGBMRegressor(LGBMRegressor(device=device, verbose=-1))),
+        "skip": _small_or_wide,
+    },
+    {
+        "name": "ExtraTrees",
+        "build": lambda clf, device: ExtraTreesClassifier(n_estimators=100) if clf else ExtraTreesRegressor(n_estimators=100),
+        "skip": _forest_skip,
+    },
+    {
+        "name": "RandomForest",
+        "build": lambda clf, device: RandomForestClassifier(n_estimators=100) if clf else RandomForestRegressor(n_estimators=100),
+        "skip": _forest_skip,
+    },
+]
+
+
+def select_candidates(meta: dict, is_classification: bool,
+                      device: str = "cpu") -> Tuple[Dict[str, object], Dict[str, str]]:
+    """Candidates worth evaluating for this dataset, plus why the others were skipped."""
+    candidates, skipped = {}, {}
+    balanced = is_classification and meta.get("class_balance", 1.0) < IMBALANCE_RATIO
+    for spec in CANDIDATE_REGISTRY:
+        reason = spec["skip"](meta)
+        if reason:
+            skipped[spec["name"]] = reason
+            continue
+        model = spec["build"](is_classification, device)
+        if balanced:
+            params = {k: "balanced" for k in model.get_params()
+                      if k == "class_weight" or k.endswith("__class_weight")}
+            model.set_params(**params)
+        candidates[spec["name"]] = model
+    return candidates, skipped
@@ -0,0 +1,99 @@
+import os
+import json
+import shutil
+import logging
+from typing import Optional
+
+from joblib import dump, load
+
+logger = logging.getLogger(__name__)
+
+
+def data_fingerprint(data_dir: str, files) -> dict:
+    """Size and mtime of each data file; enough to notice a replaced upload."""
+    fingerprint = {}
+    for name in files:
+        stat = os.stat(os.path.join(data_dir, name))
+        fingerprint[name] = [stat.st_size, int(stat.st_mtime)]
+    return fingerprint
+
+
+class TrainingCheckpoint:
+    """Stage-by-stage training state under ``<base_dir>/checkpoint``.
+
+    Records the loaded dataset, each candidate's CV result per selection stage
+    (with its fold models when they are kept for stacking) and whether the
+    final fit finished, so a crashed run can resume where it stopped. State
+    is only reused when ``key`` (data files, schema, selection and ensemble
+    settings) matches the run that wrote it.
+    """
+
+    def __init__(self, base_dir: str, key: dict, resume: bool = False):
+        self.dir = os.path.join(base_dir, "checkpoint")
+        self.state_path = os.path.join(self.dir, "state.json")
+        self.dataset_path = os.path.join(self.dir, "dataset.pkl")
+        self.state = {"key": key, "dataset": False, "candidates": {}, "final": False}
+        self.resumed = False
+        if resume and os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                saved = json.load(f)
+            if saved.get("key") == key:
+                self.state = saved
+                self.resumed = True
+            else:
+                logger.info("Checkpoint does not match current inputs; starting over")
+        if not self.resumed:
+            self.clear()
+        os.makedirs(self.dir, exist_ok=True)
+
+    def _save(self) -> None:
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def save_dataset(self, X, y, data_files: dict) -> None:
+        tmp_path = f"{self.dataset_path}.tmp"
+        dump((X, y, data_files), tmp_path)
+        os.replace(tmp_path, self.dataset_path)
+        self.state["dataset"] = True
+        self._save()
+
+    def load_dataset(self):
+        """``(X, y, data_files)`` from a previous run, or ``None``."""
+        if not self.state["dataset"] or not os.path.exists(self.dataset_path):
+            return None
+        return load(self.dataset_path)
+
+    def candidate_result(self, stage: str, name: str) -> Optional[dict]:
+        return self.state["candidates"].get(stage, {}).get(name)
+
+    def _folds_path(self, stage: str, name: str) -> str:
+        return os.path.join(self.dir, f"{stage}-{name}.folds.pkl")
+
+    def record_candidate(self, stage: str, name: str, result: dict, folds: Optional[dict] = None) -> None:
+        """Record a candidate's CV result; ``folds`` (fold models, out-of-fold predictions) go beside it."""
+        if folds is not None:
+            # Written first, so a recorded candidate never lacks its folds
+            tmp_path = f"{self._folds_path(stage, name)}.tmp"
+            dump(folds, tmp_path)
+            os.replace(tmp_path, self._folds_path(stage, name))
+        self.state["candidates"].setdefault(stage, {})[name] = result
+        self._save()
+
+    def candidate_folds(self, stage: str, name: str) -> Optional[dict]:
+        """The ``folds`` recorded with a candidate, or ``None`` if it was recorded without."""
+        if self.candidate_result(stage, name) is None or not os.path.exists(self._folds_path(stage, name)):
+            return None
+        return load(self._folds_path(stage, name))
+
+    @property
+    def final_done(self) -> bool:
+        return self.state["final"]
+
+    def mark_final(self) -> None:
+        self.state["final"] = True
+        self._save()
+
+    def clear(self) -> None:
+        shutil.rmtree(self.dir, ignore_errors=True)
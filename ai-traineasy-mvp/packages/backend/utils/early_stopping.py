@@ -0,0 +1,90 @@
+import inspect
+import logging
+from statistics import median
+from typing import List
+
+from sklearn.base import BaseEstimator, ClassifierMixin, RegressorMixin, clone
+from sklearn.model_selection import train_test_split
+from lightgbm import LGBMModel, early_stopping
+
+logger = logging.getLogger(__name__)
+
+# Newer LightGBM takes validation data as eval_X/eval_y and warns on eval_set
+_HAS_EVAL_XY = "eval_X" in inspect.signature(LGBMModel.fit).parameters
+
+
+class _EarlyStoppingBooster(BaseEstimator):
+    """Fit a LightGBM estimator with early stopping on a held-out split.
+
+    A ``validation_fraction`` of the training rows is carved off, the booster is
+    allowed up to ``max_rounds`` rounds and stops once the validation metric
+    has not improved for ``patience`` rounds. The chosen round count is kept in
+    ``best_iteration_``. Setting ``n_estimators`` skips the search and fits
+    exactly that many rounds on all rows, which is how the final fit reuses
+    the count found during cross-validation.
+    """
+
+    def __init__(self, estimator=None, validation_fraction=0.1, patience=50,
+                 max_rounds=2000, n_estimators=None, random_state=0):
+        self.estimator = estimator
+        self.validation_fraction = validation_fraction
+        self.patience = patience
+        self.max_rounds = max_rounds
+        self.n_estimators = n_estimators
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        estimator = clone(self.estimator)
+        if self.n_estimators is not None:
+            estimator.set_params(n_estimators=self.n_estimators)
+            estimator.fit(X, y)
+            self.best_iteration_ = self.n_estimators
+        else:
+            X_train, X_val, y_train, y_val = self._split(X, y)
+            estimator.set_params(n_estimators=self.max_rounds)
+            validation = ({"eval_X": (X_val,), "eval_y": (y_val,)} if _HAS_EVAL_XY
+                          else {"eval_set": [(X_val, y_val)]})
+            estimator.fit(
+                X_train, y_train,
+                callbacks=[early_stopping(self.patience, verbose=False)],
+                **validation,
+            )
+            self.best_iteration_ = estimator.best_iteration_ or self.max_rounds
+        self.estimator_ = estimator
+        return self
+
+    def _split(self, X, y):
+        stratify = y if isinstance(self, ClassifierMixin) else None
+        try:
+            return train_test_split(X, y, test_size=self.validation_fraction,
+                                    random_state=self.random_state, stratify=stratify)
+        except ValueError:
+            # Classes too small to stratify; fall back to a plain random split
+            return train_test_split(X, y, test_size=self.validation_fraction,
+                                    random_state=self.random_state)
+
+    def predict(self, X):
+        return self.estimator_.predict(X)
+
+    def __sklearn_tags__(self):
+        tags = super().__sklearn_tags__()
+        tags.input_tags.sparse = True  # LightGBM trains on sparse matrices directly
+        return tags
+
+
+class EarlyStoppingLGBMClassifier(ClassifierMixin, _EarlyStoppingBooster):
+    @property
+    def classes_(self):
+        return self.estimator_.classes_
+
+    def predict_proba(self, X):
+        return self.estimator_.predict_proba(X)
+
+
+class EarlyStoppingLGBMRegressor(RegressorMixin, _EarlyStoppingBooster):
+    pass
+
+
+def select_n_estimators(fold_models: List[_EarlyStoppingBooster]) -> int:
+    """Round count for the final fit: the median of the per-fold early-stopping picks."""
+    return int(median(m.best_iteration_ for m in fold_models))
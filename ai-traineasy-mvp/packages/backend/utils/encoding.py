@@ -0,0 +1,104 @@
+import logging
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.base import BaseEstimator, TransformerMixin, clone
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, TargetEncoder
+
+from .sampling import selection_sample
+
+logger = logging.getLogger(__name__)
+
+# Categoricals with more distinct values than this are not one-hot encoded
+ONE_HOT_MAX_CARDINALITY = 30
+# Categories seen fewer times than this share one "infrequent" column
+MIN_CATEGORY_COUNT = 5
+# Rows the encoded width and memory are measured on
+SUMMARY_SAMPLE_ROWS = 10_000
+
+
+def split_by_cardinality(profile: dict, cat_cols: List[str]) -> Tuple[List[str], List[str]]:
+    """``(low, high)``: columns to one-hot encode and columns to target/frequency encode."""
+    columns = profile["columns"]
+    low = [c for c in cat_cols if columns[c]["cardinality"] <= ONE_HOT_MAX_CARDINALITY]
+    high = [c for c in cat_cols if c not in low]
+    return low, high
+
+
+class FrequencyEncoder(TransformerMixin, BaseEstimator):
+    """Replace each category by its share of the training rows; unseen ones get 0."""
+
+    def fit(self, X, y=None):
+        X = pd.DataFrame(X)
+        self.frequencies_ = [X[col].value_counts(normalize=True) for col in X.columns]
+        self.n_features_in_ = X.shape[1]
+        return self
+
+    def transform(self, X):
+        X = pd.DataFrame(X)
+        return np.column_stack([
+            X[col].map(freq).astype(float).fillna(0.0).to_numpy()
+            for col, freq in zip(X.columns, self.frequencies_)
+        ])
+
+    def get_feature_names_out(self, input_features=None):
+        names = input_features if input_features is not None else [f"x{i}" for i in range(self.n_features_in_)]
+        return np.asarray([f"{name}_frequency" for name in names], dtype=object)
+
+
+def categorical_transformers(profile: dict, cat_cols: List[str], imputer: SimpleImputer,
+                             is_classification: bool) -> list:
+    """``ColumnTransformer`` entries for the categorical columns.
+
+    Low-cardinality columns are one-hot encoded (sparse), with rare
+    categories grouped. High-cardinality ones, such as IDs or free-text
+    codes, become one target-encoded and one frequency column each instead
+    of thousands of indicator columns. Target encoding is cross-fitted on
+    the training rows, so a column cannot leak its own row's target.
+    """
+    low, high = split_by_cardinality(profile, cat_cols)
+    transformers = [("cat", Pipeline([
+        ("imputer", clone(imputer)),
+        ("onehot", OneHotEncoder(handle_unknown="infrequent_if_exist", min_frequency=MIN_CATEGORY_COUNT)),
+    ]), low)]
+    if high:
+        transformers += [
+            ("cat_target", Pipeline([
+                ("imputer", clone(imputer)),
+                ("target", TargetEncoder(target_type="auto" if is_classification else "continuous")),
+            ]), high),
+            ("cat_frequency", Pipeline([
+                ("imputer", clone(imputer)),
+                ("frequency", FrequencyEncoder()),
+            ]), high),
+        ]
+    return transformers
+
+
+def encoding_summary(preprocessor, X, y, is_classification: bool = False,
+                     sample_rows: int = SUMMARY_SAMPLE_ROWS) -> dict:
+    """Width and memory of the encoded training matrix, measured on a sample.
+
+    Fitting every row (including the cross-fitted target encoder) just to
+    count columns would cost a pass over the data; a sample gives the width
+    and the bytes per row, which are scaled up to all rows.
+    """
+    X_s, y_s = selection_sample(X, y, sample_rows, stratify=is_classification)
+    encoded = clone(preprocessor).fit_transform(X_s, y_s)
+    if sparse.issparse(encoded):
+        encoded = encoded.tocsr()
+        nbytes = encoded.data.nbytes + encoded.indices.nbytes + encoded.indptr.nbytes
+        density = encoded.nnz / max(1, encoded.shape[0] * encoded.shape[1])
+    else:
+        nbytes, density = encoded.nbytes, 1.0
+    nbytes *= len(X) / max(1, encoded.shape[0])
+    return {
+        "width": int(encoded.shape[1]),
+        "sparse": sparse.issparse(encoded),
+        "density": round(density, 4),
+        "memory_mb": round(nbytes / (1024 * 1024), 2),
+    }
@@ -0,0 +1,131 @@
+import time
+import logging
+import statistics
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from sklearn.base import BaseEstimator
+from sklearn.linear_model import LogisticRegression, LinearRegression
+from sklearn.model_selection import cross_val_score
+
+logger = logging.getLogger(__name__)
+
+# Best candidates combined by the stacking stage
+ENSEMBLE_MAX_MEMBERS = 3
+# Timed single-row predictions per latency measurement (median is kept)
+LATENCY_REPEATS = 7
+
+
+def prediction_method(estimator) -> str:
+    """What a member contributes to the meta-learner: class probabilities where available."""
+    return "predict_proba" if hasattr(estimator, "predict_proba") else "predict"
+
+
+def out_of_fold(fold_estimators, test_indices, X) -> np.ndarray:
+    """Each row predicted by the fold model that did not see it; no refitting."""
+    method = prediction_method(fold_estimators[0])
+    oof = None
+    for estimator, idx in zip(fold_estimators, test_indices):
+        pred = getattr(estimator, method)(X.iloc[idx])
+        if oof is None:
+            oof = np.zeros((len(X),) + pred.shape[1:])
+        oof[idx] = pred
+    return oof
+
+
+def _columns(pred: np.ndarray) -> np.ndarray:
+    return pred.reshape(len(pred), -1)
+
+
+class FoldAverage(BaseEstimator):
+    """A candidate served as the average of its cross-validation fold models."""
+
+    def __init__(self, fold_estimators):
+        self.fold_estimators = fold_estimators
+
+    @property
+    def classes_(self):
+        return self.fold_estimators[0].classes_
+
+    def predict_proba(self, X):
+        return np.mean([e.predict_proba(X) for e in self.fold_estimators], axis=0)
+
+    def predict(self, X):
+        if hasattr(self.fold_estimators[0], "predict_proba"):
+            return self.classes_[self.predict_proba(X).argmax(axis=1)]
+        return np.mean([e.predict(X) for e in self.fold_estimators], axis=0)
+
+
+class StackedEnsemble(BaseEstimator):
+    """Members' predictions combined by a meta-learner; serves like one pipeline."""
+
+    def __init__(self, members: Dict[str, FoldAverage], meta):
+        self.members = members
+        self.meta = meta
+
+    def _meta_features(self, X) -> np.ndarray:
+        return np.hstack([_columns(getattr(m, prediction_method(m.fold_estimators[0]))(X))
+                          for m in self.members.values()])
+
+    @property
+    def classes_(self):
+        return self.meta.classes_
+
+    def predict_proba(self, X):
+        return self.meta.predict_proba(self._meta_features(X))
+
+    def predict(self, X):
+        return self.meta.predict(self._meta_features(X))
+
+
+def single_row_latency_ms(model, X) -> float:
+    """Median time to predict one row, as the prediction endpoint does."""
+    row = X.iloc[:1]
+    model.predict(row)  # warm-up
+    timings = []
+    for _ in range(LATENCY_REPEATS):
+        started = time.perf_counter()
+        model.predict(row)
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1000, 3)
+
+
+def build_ensemble(results: dict, X, y, is_classification: bool,
+                   best_name: str) -> Tuple[Optional[StackedEnsemble], Optional[dict]]:
+    """Stack the best candidates on their out-of-fold predictions.
+
+    The meta-learner is cross-validated on the same folds the candidates
+    were, so its score is comparable to theirs. Returns the ensemble (or
+    ``None`` if it does not beat ``best_name``) and a summary for the
+    training log, which is ``None`` when fewer than two candidates kept
+    their fold models.
+    """
+    eligible = [n for n in sorted(results, key=lambda n: results[n]["score"], reverse=True)
+                if "oof" in results[n]][:ENSEMBLE_MAX_MEMBERS]
+    if len(eligible) < 2:
+        return None, None
+    features = np.hstack([_columns(results[n]["oof"]) for n in eligible])
+    if is_classification:
+        meta = LogisticRegression(max_iter=1000)
+    else:
+        # Non-negative blending weights keep the ensemble from betting against a member
+        meta = LinearRegression(positive=True)
+    score = float(cross_val_score(meta, features, y, cv=3).mean())
+    meta.fit(features, y)
+    ensemble = StackedEnsemble({n: FoldAverage(results[n]["fold_estimators"]) for n in eligible}, meta)
+
+    # The best candidate alone would be served as one pipeline, like one of its fold models
+    latency = {"ensemble": single_row_latency_ms(ensemble, X), "single": None, "extra": None}
+    if "fold_estimators" in results[best_name]:
+        latency["single"] = single_row_latency_ms(results[best_name]["fold_estimators"][0], X)
+        latency["extra"] = round(latency["ensemble"] - latency["single"], 3)
+    selected = score > results[best_name]["score"]
+    summary = {
+        "members": eligible,
+        "meta_learner": type(meta).__name__,
+        "cv_score": round(score, 4),
+        "best_single": {"model": best_name, "cv_score": round(results[best_name]["score"], 4)},
+        "latency_ms": latency,
+        "selected": selected,
+    }
+    return (ensemble if selected else None), summary
@@ -0,0 +1,82 @@
+import math
+import logging
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Largest shift of a numeric column's mean, in units of the training standard
+# deviation, before the fitted scaler is considered stale.
+MAX_MEAN_SHIFT = 0.5
+# Largest share of categorical values the fitted encoder has never seen.
+MAX_UNSEEN_CATEGORY_RATE = 0.2
+# Bounds on how much a model may grow per incremental retrain.
+MIN_EXTRA_ROUNDS = 10
+
+
+def new_data_files(previous_files: List[str], current_files: List[str]) -> Optional[List[str]]:
+    """Files added since the previous run, or ``None`` if any previous file changed or vanished."""
+    if not set(previous_files) <= set(current_files):
+        return None
+    return [f for f in current_files if f not in previous_files]
+
+
+def drift_reason(preprocessor, X_new) -> Optional[str]:
+    """Why the fitted preprocessor is no longer valid for ``X_new`` (``None`` if it still is)."""
+    transformers = dict((name, (pipe, cols)) for name, pipe, cols in preprocessor.transformers_)
+    if "num" in transformers:
+        pipe, cols = transformers["num"]
+        if len(cols):
+            non_numeric = [c for c in cols if not np.issubdtype(X_new[c].dtype, np.number)]
+            if non_numeric:
+                return f"column '{non_numeric[0]}' is no longer numeric"
+            scaler = pipe.named_steps["scaler"]
+            means = X_new[cols].astype(float).mean().to_numpy()
+            scale = np.where(scaler.scale_ > 0, scaler.scale_, 1.0)
+            shift = np.abs(np.nan_to_num(means, nan=0.0) - scaler.mean_) / scale
+            worst = int(np.argmax(shift))
+            if shift[worst] > MAX_MEAN_SHIFT:
+                return f"numeric drift in '{cols[worst]}' ({shift[worst]:.2f} std)"
+    if "cat" in transformers and len(transformers["cat"][1]):
+        # One-hot columns; target/frequency encoded ones map unseen values to the prior
+        pipe, cols = transformers["cat"]
+        encoder = pipe.named_steps["onehot"]
+        for col, known in zip(cols, encoder.categories_):
+            values = X_new[col].dropna()
+            if len(values) == 0:
+                continue
+            unseen = (~values.isin(known)).mean()
+            if unseen > MAX_UNSEEN_CATEGORY_RATE:
+                return f"unseen categories in '{col}' ({unseen:.0%} of new rows)"
+    return None
+
+
+def supports_continuation(model) -> bool:
+    """Early-stopped LightGBM wrappers and tree ensembles with ``warm_start``."""
+    if hasattr(model, "best_iteration_"):
+        return True
+    params = model.get_params()
+    return "warm_start" in params and "n_estimators" in params
+
+
+def continue_training(model, X_new, y_new, growth: float):
+    """Grow a fitted model on new rows instead of refitting from scratch.
+
+    LightGBM keeps boosting from its previous booster (``init_model``); forests
+    add trees with ``warm_start``. ``growth`` is new rows / previous rows and
+    sets how many rounds or trees are added. Returns the number added.
+    """
+    if hasattr(model, "best_iteration_"):
+        booster = model.estimator_
+        previous = booster.booster_.current_iteration()
+        extra = min(previous, max(MIN_EXTRA_ROUNDS, math.ceil(previous * growth)))
+        booster.set_params(n_estimators=extra)
+        booster.fit(X_new, y_new, init_model=booster.booster_)
+        model.n_estimators = model.best_iteration_ = previous + extra
+        return extra
+    previous = model.n_estimators
+    extra = min(previous, max(MIN_EXTRA_ROUNDS, math.ceil(previous * growth)))
+    model.set_params(warm_start=True, n_estimators=previous + extra)
+    model.fit(X_new, y_new)
+    return extra
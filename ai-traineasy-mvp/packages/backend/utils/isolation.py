@@ -0,0 +1,208 @@
+import os
+import logging
+import resource
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import psutil
+from pydantic import BaseModel
+
+from .resources import available_cores
+
+logger = logging.getLogger(__name__)
+
+# Parent cgroup for training jobs. It must be on a cgroup v2 hierarchy and
+# writable, e.g. delegated by systemd (Delegate=yes) or created by root.
+CGROUP_PARENT = os.getenv("TRAINING_CGROUP", "traineasy")
+CGROUP_CONTROLLERS = ("cpu", "memory", "cpuset")
+CPU_PERIOD_US = 100_000
+
+
+class Isolation(BaseModel):
+    """Limits a training job actually runs under."""
+    cores: List[int]
+    memory_mb: Optional[int]
+    cgroup: Optional[str] = None
+    rlimit: bool = False
+
+
+def host_memory_mb() -> int:
+    return int(psutil.virtual_memory().total / (1024 * 1024))
+
+
+def memory_share_mb(cores: int, host_cores: Optional[int] = None) -> int:
+    """Memory that goes with ``cores`` cores: the same share of the host."""
+    host_cores = host_cores or available_cores()
+    return max(1, host_memory_mb() * min(cores, host_cores) // host_cores)
+
+
+class CoreAllocator:
+    """Hand out disjoint core sets to the jobs started by this process.
+
+    Jobs get free cores first; only when the host is oversubscribed (a
+    single job is always admitted) do they share the least used ones.
+    """
+
+    def __init__(self, cores: Optional[List[int]] = None):
+        self.cores = sorted(cores if cores is not None else _allowed_cores())
+        self._held: Dict[object, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key, count: int) -> List[int]:
+        with self._lock:
+            load = {core: 0 for core in self.cores}
+            for held in self._held.values():
+                for core in held:
+                    load[core] += 1
+            ranked = sorted(self.cores, key=lambda core: (load[core], core))
+            cores = sorted(ranked[:max(1, min(count, len(self.cores)))])
+            self._held[key] = cores
+            return cores
+
+    def release(self, key) -> None:
+        with self._lock:
+            self._held.pop(key, None)
+
+
+def _allowed_cores() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _cgroup2_mount() -> Optional[str]:
+    try:
+        with open("/proc/mounts") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) > 2 and fields[2] == "cgroup2":
+                    return fields[1]
+    except OSError:
+        pass
+    return None
+
+
+def _own_cgroup(mount: str) -> str:
+    with open("/proc/self/cgroup") as f:
+        for line in f:
+            if line.startswith("0::"):
+                return os.path.join(mount, line[3:].strip().lstrip("/"))
+    return mount
+
+
+def _write(path: str, value: str) -> None:
+    with open(path, "w") as f:
+        f.write(value)
+
+
+def _enable_controllers(parent: str) -> List[str]:
+    """Make the controllers available to the parent's children; returns the enabled ones."""
+    with open(os.path.join(parent, "cgroup.controllers")) as f:
+        available = f.read().split()
+    wanted = [c for c in CGROUP_CONTROLLERS if c in available]
+    with open(os.path.join(parent, "cgroup.subtree_control")) as f:
+        enabled = f.read().split()
+    missing = [c for c in wanted if c not in enabled]
+    if missing:
+        _write(os.path.join(parent, "cgroup.subtree_control"), " ".join("+" + c for c in missing))
+    return wanted
+
+
+def _create_cgroup(cores: List[int], memory_mb: Optional[int]) -> Optional[str]:
+    """A cgroup v2 group limited to ``cores`` and ``memory_mb``, or ``None`` if not possible."""
+    mount = _cgroup2_mount()
+    if mount is None:
+        return None
+    parent = CGROUP_PARENT if os.path.isabs(CGROUP_PARENT) else os.path.join(mount, CGROUP_PARENT)
+    try:
+        # On hybrid hosts the v2 hierarchy exists but v1 holds the controllers
+        with open(os.path.join(mount, "cgroup.controllers")) as f:
+            if not set(f.read().split()) & {"cpu", "memory"}:
+                return None
+        os.makedirs(parent, exist_ok=True)
+        # A real cgroup directory is populated by the kernel
+        if not os.path.exists(os.path.join(parent, "cgroup.controllers")):
+            return None
+        controllers = _enable_controllers(parent)
+        if "cpu" not in controllers and "memory" not in controllers:
+            return None
+        group = os.path.join(parent, f"job-{os.getpid()}")
+        os.makedirs(group, exist_ok=True)
+        if "cpu" in controllers:
+            _write(os.path.join(group, "cpu.max"), f"{len(cores) * CPU_PERIOD_US} {CPU_PERIOD_US}")
+        if "cpuset" in controllers:
+            _write(os.path.join(group, "cpuset.cpus"), ",".join(map(str, cores)))
+        if "memory" in controllers and memory_mb:
+            _write(os.path.join(group, "memory.max"), str(memory_mb * 1024 * 1024))
+            _write(os.path.join(group, "memory.swap.max"), "0")
+        return group
+    except OSError as e:
+        logger.info("cgroup v2 not usable (%s); isolating with affinity and rlimits", e)
+        return None
+
+
+def _move_to_cgroup(group: str, pids: List[int]) -> None:
+    for pid in pids:
+        try:
+            _write(os.path.join(group, "cgroup.procs"), str(pid))
+        except OSError:
+            pass  # exited meanwhile
+
+
+def _process_tree() -> List[int]:
+    # Pool workers keep joblib's loky workers between jobs; they must
+    # follow the new limits too
+    me = psutil.Process()
+    return [me.pid] + [child.pid for child in me.children(recursive=True)]
+
+
+@contextmanager
+def isolate(cores: List[int], memory_mb: Optional[int] = None):
+    """Confine this process and its children to ``cores`` and ``memory_mb``.
+
+    Cores are pinned with ``sched_setaffinity``, so the job keeps its cache
+    and threads are never stopped mid-iteration the way ``cpulimit``'s
+    SIGSTOP/SIGCONT duty cycle does. Memory is capped by a cgroup v2 group
+    when one can be created (the limit then covers every process of the
+    job together), otherwise by ``RLIMIT_DATA`` on each process. Everything
+    is undone on exit, so a pool worker can take the next job.
+    """
+    pids = _process_tree()
+    saved_affinity = os.sched_getaffinity(0) if hasattr(os, "sched_setaffinity") else None
+    if saved_affinity is not None:
+        for pid in pids:
+            try:
+                os.sched_setaffinity(pid, cores)
+            except (ProcessLookupError, OSError) as e:
+                logger.warning("Could not pin process %d to cores %s: %s", pid, cores, e)
+
+    group = _create_cgroup(cores, memory_mb)
+    home = _own_cgroup(_cgroup2_mount()) if group else None
+    saved_rlimit = None
+    if group:
+        _move_to_cgroup(group, pids)
+    elif memory_mb:
+        saved_rlimit = resource.getrlimit(resource.RLIMIT_DATA)
+        limit = memory_mb * 1024 * 1024
+        if saved_rlimit[1] != resource.RLIM_INFINITY:
+            limit = min(limit, saved_rlimit[1])
+        for pid in pids:
+            try:
+                psutil.Process(pid).rlimit(psutil.RLIMIT_DATA, (limit, saved_rlimit[1]))
+            except (psutil.Error, OSError) as e:
+                logger.warning("Could not limit memory of process %d: %s", pid, e)
+
+    try:
+        yield Isolation(cores=cores, memory_mb=memory_mb, cgroup=group, rlimit=saved_rlimit is not None)
+    finally:
+        if saved_rlimit is not None:
+            resource.setrlimit(resource.RLIMIT_DATA, saved_rlimit)
+        if saved_affinity is not None:
+            os.sched_setaffinity(0, saved_affinity)
+        if group:
+            _move_to_cgroup(home, _process_tree())
+            try:
+                os.rmdir(group)
+            except OSError:
+                pass  # a straggler is still in it; reused by this worker's next job
@@ -1,12 +1,65 @@
+import os
+import time
+import signal
 import logging
+import threading
+from contextlib import contextmanager
 from threading import Lock
-from typing import Dict, Optional
-from .validation import TrainingConfig
-from train_model import run_training
+from typing import Dict
 
 logger = logging.getLogger(__name__)
 
+# A cancelled job gets this long to unwind after SIGTERM before SIGKILL
+CANCEL_GRACE_SECONDS = 10
+
+
+class TrainingCancelled(Exception):
+    """Raised inside the training process when it is asked to stop."""
+
+
+@contextmanager
+def job_control(budget):
+    """Let the training process be paused, resumed and cancelled by signals.
+
+    SIGTSTP stops the budget clock and then the process group, SIGCONT
+    starts the clock again, and SIGTERM raises ``TrainingCancelled`` so the
+    run unwinds normally (artifacts are written atomically and the stage
+    checkpoint is kept). Only possible from the main thread; elsewhere the
+    default signal behaviour stays.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def _on_pause(signum, frame):
+        budget.pause()
+        # The kernel drops SIGTSTP for the group's other processes (it is a
+        # session of its own, so an orphaned group); stop them here instead
+        os.killpg(os.getpgrp(), signal.SIGSTOP)
+
+    def _on_continue(signum, frame):
+        budget.resume()
+
+    def _on_terminate(signum, frame):
+        raise TrainingCancelled("Training cancelled")
+
+    handlers = {signal.SIGTSTP: _on_pause, signal.SIGCONT: _on_continue, signal.SIGTERM: _on_terminate}
+    previous = {sig: signal.signal(sig, handler) for sig, handler in handlers.items()}
+    try:
+        yield
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+
+
 class ProcessManager:
+    """Pause, resume and cancel running training jobs.
+
+    Training jobs run in their own session, so their pid is also the id of a
+    process group that holds every process they start (joblib/loky
+    workers). Signals go to the whole group: pausing stops every process,
+    releasing its CPU share until it is resumed.
+    """
     _instance = None
     _lock = Lock()
 
@@ -15,59 +68,80 @@ class ProcessManager:
             if cls._instance is None:
                 cls._instance = super().__new__(cls)
                 cls._instance.active_processes: Dict[str, dict] = {}
+                # Cancelled before their process was registered
+                cls._instance.pending_cancels = set()
                 cls._instance.process_lock = Lock()
             return cls._instance
 
-    def start_training(self, config: TrainingConfig) -> str:
+    def register(self, project_id: str, pid: int) -> None:
         with self.process_lock:
-            if config.project_id in self.active_processes:
-                raise ValueError('Training already running for project')
+            self.active_processes[project_id] = {'pid': pid, 'paused': False}
+            cancel = project_id in self.pending_cancels
+        if cancel:
+            self.cancel_training(project_id)
 
-            try:
-                process = run_training(
-                    project_id=config.project_id,
-                    cpu_percent=config.cpu_percent,
-                    use_gpu=config.use_gpu
-                )
-                self.active_processes[config.project_id] = {
-                    'process': process,
-                    'paused': False
-                }
-                return config.project_id
-            except Exception as e:
-                logger.error(f'Failed to start training: {str(e)}')
-                raise
+    def unregister(self, project_id: str) -> dict:
+        """Forget a finished job; returns its last state."""
+        with self.process_lock:
+            self.pending_cancels.discard(project_id)
+            return self.active_processes.pop(project_id, None) or {}
+
+    def is_paused(self, project_id: str) -> bool:
+        with self.process_lock:
+            return self.active_processes.get(project_id, {}).get('paused', False)
+
+    def _get(self, project_id: str) -> dict:
+        if project_id not in self.active_processes:
+            raise KeyError('No active training session')
+        return self.active_processes[project_id]
 
     def pause_training(self, project_id: str) -> None:
         with self.process_lock:
-            if process_info := self.active_processes.get(project_id):
-                process_info['process'].pause()
-                process_info['paused'] = True
+            process_info = self._get(project_id)
+            if process_info['paused']:
+                raise ValueError('Training session already paused')
+            # SIGTSTP rather than SIGSTOP so the trainer can stop its budget
+            # clock first; it then stops its whole group (see job_control)
+            os.killpg(process_info['pid'], signal.SIGTSTP)
+            process_info['paused'] = True
 
     def resume_training(self, project_id: str) -> None:
         with self.process_lock:
-            if project_id not in self.active_processes:
-                raise KeyError('No active training session')
-            
-            process_info = self.active_processes[project_id]
+            process_info = self._get(project_id)
             if not process_info['paused']:
                 raise ValueError('Training session not in paused state')
-            
-            process_info['process'].resume()
+            os.killpg(process_info['pid'], signal.SIGCONT)
             process_info['paused'] = False
 
-    def cleanup(self, project_id: str) -> None:
+    def cancel_training(self, project_id: str) -> None:
+        """Ask the job to stop gracefully.
+
+        Whoever waits on the job kills it if it is still running once
+        :meth:`cancel_overdue` says the grace period is over.
+        """
+        with self.process_lock:
+            if project_id not in self.active_processes:
+                # Still starting up; stopped as soon as it registers
+                self.pending_cancels.add(project_id)
+                return
+            process_info = self.active_processes[project_id]
+            self.pending_cancels.discard(project_id)
+            process_info['cancelled_at'] = time.monotonic()
+            process_info['paused'] = False
+            try:
+                os.killpg(process_info['pid'], signal.SIGTERM)
+                # A stopped process only handles SIGTERM once it runs again
+                os.killpg(process_info['pid'], signal.SIGCONT)
+            except ProcessLookupError:
+                pass
+
+    def was_cancelled(self, project_id: str) -> bool:
         with self.process_lock:
-            if process_info := self.active_processes.pop(project_id, None):
-                try:
-                    process_info['process'].terminate()
-                except Exception as e:
-                    logger.warning(f'Cleanup failed for {project_id}: {str(e)}')
+            return (project_id in self.pending_cancels
+                    or 'cancelled_at' in self.active_processes.get(project_id, {}))
 
-    def __del__(self):
+    def cancel_overdue(self, project_id: str, grace: float = CANCEL_GRACE_SECONDS) -> bool:
+        """Whether a cancelled job has had its grace period and must be killed."""
         with self.process_lock:
-            for pid, process_info in self.active_processes.items():
-                try:
-                    process_info['process'].terminate()
-                except Exception as e:
-                    logger.warning(f'Shutdown cleanup failed for {pid}: {str(e)}')
\ No newline at end of file
+            cancelled_at = self.active_processes.get(project_id, {}).get('cancelled_at')
+            return cancelled_at is not None and time.monotonic() - cancelled_at > grace
@@ -0,0 +1,152 @@
+import os
+import json
+import logging
+from collections import Counter
+from typing import Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Columns with at most this many distinct values keep full value counts
+# (used as the target distribution and for class balance).
+VALUE_COUNTS_MAX = 50
+# Distinct values tracked per column before cardinality is reported as capped.
+CARDINALITY_CAP = 100_000
+
+PROFILE_FILENAME = "profile.json"
+# Rows parsed at a time when a data file is profiled from disk
+PROFILE_CHUNK_ROWS = 50_000
+
+
+def _column_kind(series: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(series):
+        return "categorical"
+    if pd.api.types.is_numeric_dtype(series):
+        return "numeric"
+    if (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+            or isinstance(series.dtype, pd.CategoricalDtype)):
+        return "categorical"
+    return "other"
+
+
+class DatasetProfiler:
+    """Per-column statistics gathered in one pass, one chunk at a time.
+
+    Each ``update`` does vectorized aggregations over the chunk (null counts,
+    min/max/sum/zeros for numeric columns, distinct values), so a file can be
+    profiled with ``pd.read_csv(..., chunksize=...)`` in constant memory, or a
+    loaded frame in a single call.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self._columns = {}
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        self.rows += len(chunk)
+        nulls = chunk.isna().sum()
+        numeric = chunk.select_dtypes(include="number", exclude="bool")
+        if len(numeric.columns):
+            mins, maxs = numeric.min(), numeric.max()
+            sums, counts = numeric.sum(), numeric.count()
+            zeros = (numeric == 0).sum()
+
+        for col in chunk.columns:
+            state = self._columns.setdefault(col, {
+                "dtype": str(chunk[col].dtype), "kind": _column_kind(chunk[col]), "nulls": 0,
+                "min": None, "max": None, "sum": 0.0, "count": 0, "zeros": 0,
+                "value_counts": Counter(), "distinct": None, "capped": False,
+            })
+            state["nulls"] += int(nulls[col])
+            kind = _column_kind(chunk[col])
+            if kind != state["kind"]:
+                # e.g. a CSV chunk where a numeric column first shows text
+                state["kind"], state["dtype"] = "categorical", str(chunk[col].dtype)
+            if col in numeric.columns and state["kind"] == "numeric" and counts[col]:
+                state["min"] = float(mins[col]) if state["min"] is None else min(state["min"], float(mins[col]))
+                state["max"] = float(maxs[col]) if state["max"] is None else max(state["max"], float(maxs[col]))
+                state["sum"] += float(sums[col])
+                state["count"] += int(counts[col])
+                state["zeros"] += int(zeros[col])
+            self._track_distinct(state, chunk[col])
+
+    def _track_distinct(self, state: dict, series: pd.Series) -> None:
+        if state["capped"]:
+            return
+        if state["distinct"] is None:
+            state["value_counts"].update(series.dropna().value_counts().to_dict())
+            if len(state["value_counts"]) <= VALUE_COUNTS_MAX:
+                return
+            state["distinct"] = set(state["value_counts"])
+            state["value_counts"] = None
+            return
+        state["distinct"].update(series.dropna().unique().tolist())
+        if len(state["distinct"]) > CARDINALITY_CAP:
+            state["distinct"], state["capped"] = None, True
+
+    def result(self) -> dict:
+        columns = {}
+        for col, state in self._columns.items():
+            if state["capped"]:
+                cardinality = CARDINALITY_CAP
+            elif state["distinct"] is not None:
+                cardinality = len(state["distinct"])
+            else:
+                cardinality = len(state["value_counts"])
+            entry = {
+                "dtype": state["dtype"],
+                "kind": state["kind"],
+                "nulls": state["nulls"],
+                "cardinality": cardinality,
+            }
+            if state["capped"]:
+                entry["cardinality_capped"] = True
+            if state["kind"] == "numeric":
+                entry.update(
+                    min=state["min"], max=state["max"], zeros=state["zeros"],
+                    mean=state["sum"] / state["count"] if state["count"] else None,
+                )
+            if state["value_counts"] is not None:
+                entry["value_counts"] = {str(k): int(v) for k, v in state["value_counts"].most_common()}
+            columns[col] = entry
+        return {"rows": self.rows, "columns": columns}
+
+
+def profile_dataframe(df: pd.DataFrame) -> dict:
+    profiler = DatasetProfiler()
+    profiler.update(df)
+    return profiler.result()
+
+
+def profile_file(path: str, chunksize: int = PROFILE_CHUNK_ROWS) -> dict:
+    """Profile a CSV or JSON data file, reading CSV ``chunksize`` rows at a time."""
+    profiler = DatasetProfiler()
+    if path.endswith(".csv"):
+        with pd.read_csv(path, chunksize=chunksize) as reader:
+            for chunk in reader:
+                profiler.update(chunk)
+    else:
+        # pandas only reads JSON lines in chunks; a JSON document is parsed whole
+        profiler.update(pd.read_json(path))
+    return profiler.result()
+
+
+def load_cached_profile(base_dir: str, fingerprint: dict) -> Optional[dict]:
+    """The profile saved for exactly these data files, if there is one."""
+    path = os.path.join(base_dir, PROFILE_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        cached = json.load(f)
+    if cached.get("fingerprint") != fingerprint:
+        return None
+    return cached["profile"]
+
+
+def save_profile(base_dir: str, fingerprint: dict, profile: dict) -> None:
+    path = os.path.join(base_dir, PROFILE_FILENAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"fingerprint": fingerprint, "profile": profile}, f, indent=2)
+    os.replace(tmp_path, path)
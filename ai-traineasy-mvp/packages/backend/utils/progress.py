@@ -0,0 +1,103 @@
+import os
+import json
+import time
+import logging
+from typing import Callable, List, Optional, Tuple
+
+from .tail import READ_MAX_BYTES, read_lines, start_file
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_FILENAME = "progress.ndjson"
+
+
+class ProgressReporter:
+    """Machine-readable progress of a training run, one JSON object per line.
+
+    Every event carries the current ``stage``, ``candidate`` and ``fold``
+    (``None`` where they do not apply), ``elapsed`` seconds on the budget
+    clock and ``eta``, the estimated seconds left in the current stage. The
+    ETA comes from how fast the stage's planned units (candidate folds) are
+    finishing, or from an up-front ``estimate`` for a single step such as
+    the final fit, and is capped by what is left of the budget since the run
+    stops there anyway. Lines are appended and flushed one at a time, so a
+    reader never sees a partial event except at the very end of the file.
+    """
+
+    def __init__(self, base_dir: str, clock: Callable[[], float], remaining: Optional[Callable[[], float]] = None):
+        self.path = os.path.join(base_dir, PROGRESS_FILENAME)
+        self._clock = clock
+        self._remaining = remaining
+        self.stage: Optional[str] = None
+        self._stage_started = 0.0
+        self._units = 0
+        self._done = 0
+        self._estimate: Optional[float] = None
+        # Each run starts its own file, like train.log
+        start_file(self.path)
+
+    def start_stage(self, stage: str) -> None:
+        self.stage, self._stage_started = stage, self._clock()
+        self._units = self._done = 0
+        self._estimate = None
+        self.emit("stage")
+
+    def expect(self, units: int) -> None:
+        """Plan ``units`` more units of work (e.g. folds) in the current stage."""
+        self._units += units
+
+    def estimate(self, seconds: float) -> None:
+        """Expected duration of the current stage when it is one step; announced as an event."""
+        self._estimate = seconds
+        self.emit("estimate")
+
+    def skip(self, units: int) -> None:
+        """Drop planned units that will not run, or that were resumed instead of run."""
+        self._units = max(self._done, self._units - units)
+
+    def unit_done(self, candidate: Optional[str] = None, fold: Optional[int] = None, **fields) -> None:
+        self._done += 1
+        self.emit("fold", candidate=candidate, fold=fold, **fields)
+
+    @property
+    def eta(self) -> Optional[float]:
+        spent = self._clock() - self._stage_started
+        if self._done and self._units:
+            eta = spent / self._done * max(0, self._units - self._done)
+        elif self._estimate is not None:
+            eta = max(0.0, self._estimate - spent)
+        else:
+            return None
+        if self._remaining is not None:
+            eta = min(eta, self._remaining())
+        return round(eta, 1)
+
+    def emit(self, event: str, candidate: Optional[str] = None, fold: Optional[int] = None, **fields) -> None:
+        record = {
+            "time": round(time.time(), 3),
+            "event": event,
+            "stage": self.stage,
+            "candidate": candidate,
+            "fold": fold,
+            "elapsed": round(self._clock(), 2),
+            "eta": self.eta,
+            **fields,
+        }
+        try:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+        except OSError as e:
+            # Progress is advisory; it must never fail a training run
+            logger.warning("Could not write progress event: %s", e)
+
+
+def read_events(path: str, offset: int = 0, max_bytes: int = READ_MAX_BYTES) -> Tuple[List[dict], int]:
+    """Complete events written at or after byte ``offset``, and the offset to read from next."""
+    chunk, offset = read_lines(path, offset, max_bytes)
+    events = []
+    for line in chunk.splitlines():
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            pass  # blank, or torn by a writer that died mid-line
+    return events, offset
@@ -0,0 +1,68 @@
+import os
+import math
+import logging
+from typing import Optional
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+class ResourcePlan(BaseModel):
+    """How a training job's CPU allowance is split between parallelism levels.
+
+    ``cv_jobs * model_threads`` never exceeds ``cores``, so fold-level workers
+    running multithreaded models do not oversubscribe the host.
+    """
+    cpu_percent: float
+    host_cores: int
+    cores: int
+    cv_jobs: int
+    model_threads: int
+    blas_threads: int
+
+
+def available_cores() -> int:
+    """Cores this process may run on (respects affinity masks where supported)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def plan_resources(cpu_percent: float = 100, n_folds: int = 3,
+                   host_cores: Optional[int] = None) -> ResourcePlan:
+    """Turn a ``cpu_percent`` allowance into concrete core and thread counts.
+
+    Folds are parallelised first since they scale almost linearly; whatever
+    is left per fold goes to the model's own threads and BLAS.
+    """
+    host_cores = host_cores or available_cores()
+    cores = max(1, math.floor(host_cores * cpu_percent / 100))
+    cv_jobs = max(1, min(n_folds, cores))
+    model_threads = max(1, cores // cv_jobs)
+    return ResourcePlan(
+        cpu_percent=cpu_percent,
+        host_cores=host_cores,
+        cores=cores,
+        cv_jobs=cv_jobs,
+        model_threads=model_threads,
+        blas_threads=model_threads,
+    )
+
+
+def apply_thread_limit(estimator, n_threads: int) -> None:
+    """Set every ``n_jobs`` parameter of ``estimator`` (and nested estimators) to ``n_threads``.
+
+    Linear models are left alone: their solvers are single-threaded (BLAS
+    aside) and recent scikit-learn deprecates their ``n_jobs``.
+    """
+    all_params = estimator.get_params()
+    params = {}
+    for key in all_params:
+        if key != "n_jobs" and not key.endswith("__n_jobs"):
+            continue
+        owner = all_params[key[:-len("__n_jobs")]] if "__" in key else estimator
+        if type(owner).__module__.startswith("sklearn.linear_model"):
+            continue
+        params[key] = n_threads
+    if params:
+        estimator.set_params(**params)
@@ -0,0 +1,164 @@
+import os
+import ast
+import sys
+import json
+import shutil
+import hashlib
+import logging
+from importlib import metadata
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Libraries whose version changes what a training run produces
+FINGERPRINT_LIBRARIES = ["scikit-learn", "lightgbm", "pandas", "numpy", "joblib"]
+# Training entry point; it and every backend module it imports define the
+# candidates and the pipeline around them
+FINGERPRINT_ENTRY = "train_model.py"
+# Files a finished run leaves in the project directory
+CACHED_ARTIFACTS = ["model.pkl", "label_encoder.pkl", "training_log.json", "train.log"]
+# Cached runs kept per project, most recent first
+MAX_CACHED_RUNS = 5
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint_sources(entry: str = FINGERPRINT_ENTRY) -> list:
+    """``entry`` and the backend modules it imports, directly or through others, as relative paths.
+
+    Found from the import statements rather than listed by hand, so a
+    module newly used by training cannot be left out of the fingerprint.
+    """
+    sources, pending = set(), [entry]
+    while pending:
+        src = pending.pop()
+        if src in sources:
+            continue
+        sources.add(src)
+        with open(os.path.join(BACKEND_DIR, src)) as f:
+            tree = ast.parse(f.read(), filename=src)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                # ``from utils import x`` may name a module as well as an attribute
+                modules = [node.module] + [f"{node.module}.{alias.name}" for alias in node.names]
+            else:
+                continue
+            for module in modules:
+                path = os.path.join(*module.split(".")) + ".py"
+                if os.path.isfile(os.path.join(BACKEND_DIR, path)):
+                    pending.append(path)
+    return sorted(sources)
+
+
+def library_versions() -> dict:
+    versions = {"python": sys.version.split()[0]}
+    for name in FINGERPRINT_LIBRARIES:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def training_fingerprint(project_dir: str, options: Optional[dict] = None,
+                         digests: Optional[Dict[str, str]] = None) -> str:
+    """Hash of everything that determines a training result.
+
+    Covers the content of every data file, ``schema.json``, the code that
+    defines the candidates and pipeline, library versions and the training
+    ``options`` that change what is trained (e.g. ``ensemble``, the budget).
+    ``digests`` holds SHA-256s already known for data files, such as those
+    computed during upload; only the other files are read and hashed.
+    """
+    data_dir = os.path.join(project_dir, "data")
+    files = sorted(f for f in os.listdir(data_dir) if f.endswith((".csv", ".json")))
+    digests = digests or {}
+    inputs = {
+        "data": {name: digests.get(name) or file_sha256(os.path.join(data_dir, name)) for name in files},
+        "schema": file_sha256(os.path.join(project_dir, "schema.json")),
+        "code": {src: file_sha256(os.path.join(BACKEND_DIR, src)) for src in fingerprint_sources()},
+        "libraries": library_versions(),
+    }
+    if options:
+        inputs["options"] = options
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+def _cache_dir(project_dir: str, fingerprint: Optional[str] = None) -> str:
+    root = os.path.join(project_dir, "run_cache")
+    return os.path.join(root, fingerprint) if fingerprint else root
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    # Artifacts are replaced atomically on the next run, so a hardlink keeps
+    # pointing at this run's file; logs are rewritten in place and get copied
+    if src.endswith(".pkl"):
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+
+
+def store_run(project_dir: str, fingerprint: str) -> None:
+    """Keep the artifacts of a successful run under its fingerprint."""
+    log_path = os.path.join(project_dir, "training_log.json")
+    with open(log_path) as f:
+        log = json.load(f)
+    log["fingerprint"] = fingerprint
+    with open(f"{log_path}.tmp", "w") as f:
+        json.dump(log, f, indent=2)
+    os.replace(f"{log_path}.tmp", log_path)
+
+    target = _cache_dir(project_dir, fingerprint)
+    shutil.rmtree(target, ignore_errors=True)
+    os.makedirs(target)
+    for name in CACHED_ARTIFACTS:
+        src = os.path.join(project_dir, name)
+        if os.path.exists(src):
+            _link_or_copy(src, os.path.join(target, name))
+
+    entries = sorted(os.scandir(_cache_dir(project_dir)), key=lambda e: e.stat().st_mtime, reverse=True)
+    for stale in entries[MAX_CACHED_RUNS:]:
+        shutil.rmtree(stale.path, ignore_errors=True)
+
+
+def _current_fingerprint(project_dir: str) -> Optional[str]:
+    log_path = os.path.join(project_dir, "training_log.json")
+    if not os.path.exists(log_path):
+        return None
+    with open(log_path) as f:
+        return json.load(f).get("fingerprint")
+
+
+def restore_run(project_dir: str, fingerprint: str) -> Optional[dict]:
+    """Put a cached run's artifacts back in place and return its training log.
+
+    Returns ``None`` when no run with this fingerprint is cached.
+    """
+    source = _cache_dir(project_dir, fingerprint)
+    log_path = os.path.join(source, "training_log.json")
+    if not os.path.exists(log_path) or not os.path.exists(os.path.join(source, "model.pkl")):
+        return None
+    if _current_fingerprint(project_dir) != fingerprint:
+        for name in CACHED_ARTIFACTS:
+            src, dst = os.path.join(source, name), os.path.join(project_dir, name)
+            if os.path.exists(src):
+                shutil.copy2(src, f"{dst}.tmp")
+                os.replace(f"{dst}.tmp", dst)
+            elif os.path.exists(dst):
+                os.remove(dst)
+    os.utime(source)  # most recently used
+    with open(log_path) as f:
+        return json.load(f)
@@ -0,0 +1,22 @@
+import logging
+from sklearn.model_selection import train_test_split
+
+logger = logging.getLogger(__name__)
+
+
+def selection_sample(X, y, max_rows: int, stratify: bool, random_state: int = 0):
+    """Draw at most ``max_rows`` rows for cheap candidate ranking.
+
+    Classification targets are sampled stratified so rare classes keep their
+    share; regression targets (or classes too small to stratify) are sampled
+    uniformly.
+    """
+    if len(X) <= max_rows:
+        return X, y
+    try:
+        X_s, _, y_s, _ = train_test_split(X, y, train_size=max_rows, random_state=random_state,
+                                          stratify=y if stratify else None)
+    except ValueError:
+        logger.info("Falling back to uniform sampling; target cannot be stratified")
+        X_s, _, y_s, _ = train_test_split(X, y, train_size=max_rows, random_state=random_state)
+    return X_s, y_s
@@ -0,0 +1,145 @@
+import time
+import logging
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import ExtraTreesClassifier, ExtraTreesRegressor
+from sklearn.model_selection import train_test_split
+
+logger = logging.getLogger(__name__)
+
+# Rows the screening stage looks at; the filters only need a sample
+SCREEN_SAMPLE_ROWS = 20_000
+# A column whose most common value covers this share of rows is constant in practice
+QUASI_CONSTANT_SHARE = 0.999
+# Numeric columns correlated at least this strongly with a kept one are near-duplicates
+DUPLICATE_CORRELATION = 0.98
+# Trees in the importance model; kept small, it only has to rank features
+SCREEN_TREES = 50
+# Holdout score the retained features may lose against all features before
+# the importance filter is reverted
+SCORE_TOLERANCE = 0.01
+
+
+def _encode(X: pd.DataFrame, num_cols: List[str], cat_cols: List[str]) -> pd.DataFrame:
+    """Numeric matrix for the cheap model: medians for gaps, categories as codes."""
+    encoded = {c: X[c].astype(float).fillna(X[c].median()) for c in num_cols}
+    # factorize numbers categories by first appearance, so equal partitions get equal codes
+    encoded.update({c: pd.factorize(X[c])[0].astype(float) for c in cat_cols})
+    return pd.DataFrame(encoded, index=X.index)[num_cols + cat_cols].fillna(0.0)
+
+
+def _quasi_constant(X: pd.DataFrame, columns: List[str]) -> List[str]:
+    return [c for c in columns if X[c].value_counts(dropna=False, normalize=True).iloc[0] >= QUASI_CONSTANT_SHARE]
+
+
+def _duplicates(encoded: pd.DataFrame, num_cols: List[str], cat_cols: List[str]) -> Dict[str, str]:
+    """``{column: the earlier column it duplicates}``."""
+    duplicates = {}
+    if len(num_cols) > 1:
+        corr = np.abs(np.nan_to_num(np.corrcoef(encoded[num_cols].to_numpy(), rowvar=False)))
+        kept = []
+        for j, col in enumerate(num_cols):
+            match = next((i for i in kept if corr[i, j] >= DUPLICATE_CORRELATION), None)
+            if match is None:
+                kept.append(j)
+            else:
+                duplicates[col] = num_cols[match]
+    seen = {}
+    for col in cat_cols:
+        # Same codes means the same grouping of rows, whatever the labels
+        key = encoded[col].to_numpy().tobytes()
+        if key in seen:
+            duplicates[col] = seen[key]
+        else:
+            seen[key] = col
+    return duplicates
+
+
+def _importance_model(is_classification: bool, n_jobs: int):
+    cls = ExtraTreesClassifier if is_classification else ExtraTreesRegressor
+    return cls(n_estimators=SCREEN_TREES, min_samples_leaf=5, max_features="sqrt", n_jobs=n_jobs, random_state=0)
+
+
+def _uninformative(encoded: pd.DataFrame, y, is_classification: bool, n_jobs: int) -> List[str]:
+    """Columns no more important to the cheap model than a shuffled copy of some column.
+
+    Every column gets a shadow with its values permuted, which keeps its
+    distribution but breaks any link to the target; impurity importance
+    favours columns with many distinct values, and the shadows share that
+    bias.
+    """
+    rng = np.random.default_rng(0)
+    shadows = encoded.apply(lambda col: rng.permutation(col.to_numpy()))
+    shadows.columns = [f"shadow_{i}" for i in range(encoded.shape[1])]
+    model = _importance_model(is_classification, n_jobs).fit(pd.concat([encoded, shadows], axis=1), y)
+    importances = model.feature_importances_
+    threshold = importances[encoded.shape[1]:].max()
+    return [c for c, imp in zip(encoded.columns, importances[:encoded.shape[1]]) if imp <= threshold]
+
+
+def _timed_score(encoded: pd.DataFrame, y, columns: List[str], is_classification: bool,
+                 n_jobs: int) -> Tuple[float, float]:
+    """Holdout score of the cheap model on ``columns`` and the seconds its fit took."""
+    X_train, X_test, y_train, y_test = train_test_split(
+        encoded[columns], y, test_size=0.25, random_state=0,
+        stratify=y if is_classification and pd.Series(y).value_counts().min() > 1 else None)
+    model = _importance_model(is_classification, n_jobs)
+    started = time.perf_counter()
+    model.fit(X_train, y_train)
+    return float(model.score(X_test, y_test)), time.perf_counter() - started
+
+
+def screen_features(X: pd.DataFrame, y, num_cols: List[str], cat_cols: List[str], is_classification: bool,
+                    n_jobs: int = 1) -> Tuple[List[str], List[str], dict]:
+    """Drop features that cannot help before any candidate pays for them.
+
+    Quasi-constant columns and near-duplicates go first, then columns a
+    cheap tree ensemble finds no more useful than noise. The importance
+    filter is reverted if the cheap model scores noticeably worse without
+    those columns on a holdout. Returns the retained numeric and
+    categorical columns and a report with the reason each dropped column
+    was dropped and the fit speedup the cheap model saw.
+    """
+    started = time.perf_counter()
+    if len(X) > SCREEN_SAMPLE_ROWS:
+        idx = np.random.default_rng(0).choice(len(X), SCREEN_SAMPLE_ROWS, replace=False)
+        X, y = X.iloc[np.sort(idx)], np.asarray(y)[np.sort(idx)]
+    y = np.asarray(y)
+    features = num_cols + cat_cols
+    encoded = _encode(X, num_cols, cat_cols)
+
+    dropped = {c: "constant" for c in _quasi_constant(X, features)}
+    remaining_num = [c for c in num_cols if c not in dropped]
+    remaining_cat = [c for c in cat_cols if c not in dropped]
+    for col, original in _duplicates(encoded, remaining_num, remaining_cat).items():
+        dropped[col] = f"duplicate of {original}"
+    filtered = [c for c in features if c not in dropped]
+
+    report = {"sample_rows": len(X), "features": len(features)}
+    uninformative = _uninformative(encoded[filtered], y, is_classification, n_jobs) if filtered else []
+    retained = [c for c in filtered if c not in uninformative]
+    if not retained:
+        # Nothing would be left to train on; keep what the filters passed, or everything
+        uninformative, retained = [], filtered or features
+    if retained != features:
+        full_score, full_seconds = _timed_score(encoded, y, features, is_classification, n_jobs)
+        kept_score, kept_seconds = _timed_score(encoded, y, retained, is_classification, n_jobs)
+        if uninformative and kept_score < full_score - SCORE_TOLERANCE:
+            report["importance_filter_reverted"] = True
+            uninformative, retained = [], filtered or features
+            kept_score, kept_seconds = _timed_score(encoded, y, retained, is_classification, n_jobs)
+        report["holdout_score"] = {"all": round(full_score, 4), "retained": round(kept_score, 4)}
+        report["fit_speedup"] = round(full_seconds / max(kept_seconds, 1e-6), 2)
+    if retained is features:
+        dropped = {}
+    dropped.update({c: "uninformative" for c in uninformative})
+
+    report.update(
+        retained=len(retained),
+        dropped=dropped,
+        width_reduction=round(len(features) / max(len(retained), 1), 2),
+        seconds=round(time.perf_counter() - started, 2),
+    )
+    return [c for c in num_cols if c in retained], [c for c in cat_cols if c in retained], report
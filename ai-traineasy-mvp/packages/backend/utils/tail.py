@@ -0,0 +1,183 @@
+import os
+import json
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on what one read returns, so a long run's output comes in pages
+READ_MAX_BYTES = 1024 * 1024
+# Seconds between checks for new output while a run is active
+POLL_SECONDS = 0.5
+# Silence after which a comment is sent so proxies keep the stream open
+KEEPALIVE_SECONDS = 15
+
+
+def start_file(path: str) -> None:
+    """Give ``path`` a new, empty file for the next run.
+
+    Truncating in place would let a reader that followed the previous run
+    read on from its old offset into the middle of the new run's lines; a
+    new file (inode) tells it to start over.
+    """
+    tmp_path = f"{path}.tmp"
+    open(tmp_path, "w").close()
+    os.replace(tmp_path, path)
+
+
+def _inode(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_ino
+    except FileNotFoundError:
+        return None
+
+
+def read_lines(path: str, offset: int = 0, max_bytes: int = READ_MAX_BYTES,
+               partial: bool = False) -> Tuple[bytes, int]:
+    """Whole lines written at or after byte ``offset``, and the offset to read from next.
+
+    A trailing partial line is left for the next read unless ``partial``
+    (the writer has finished). An offset past the end of the file means a
+    new run replaced it, so reading starts over from the beginning.
+    """
+    if not os.path.exists(path):
+        return b"", 0
+    if offset > os.path.getsize(path):
+        offset = 0
+    with open(path, "rb") as f:
+        f.seek(offset)
+        chunk = f.read(max_bytes)
+    at_end = len(chunk) < max_bytes
+    if not (partial and at_end):
+        whole = chunk[:chunk.rfind(b"\n") + 1]
+        # A line longer than a whole page is handed out in pieces
+        chunk = whole if whole or at_end else chunk
+    return chunk, offset + len(chunk)
+
+
+def tail_offset(path: str, lines: int, block_size: int = 64 * 1024) -> int:
+    """Offset where the last ``lines`` lines of ``path`` start.
+
+    The file is read backwards from the end one block at a time, so the
+    cost depends on how much is asked for, not on the size of the log.
+    """
+    with open(path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        if end == 0:
+            return 0
+        f.seek(end - 1)
+        # A final newline ends the last line rather than starting another
+        pos = end - 1 if f.read(1) == b"\n" else end
+        found = 0
+        while pos > 0:
+            start = max(0, pos - block_size)
+            f.seek(start)
+            block = f.read(pos - start)
+            idx = len(block)
+            while True:
+                idx = block.rfind(b"\n", 0, idx)
+                if idx < 0:
+                    break
+                found += 1
+                if found == lines:
+                    return start + idx + 1
+            pos = start
+    return 0
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive ``(first, last)`` bytes of a single ``bytes=`` range over ``size`` bytes.
+
+    Returns ``None`` for anything else (several ranges, other units), which
+    callers ignore as HTTP allows. ``first > last`` or ``first >= size``
+    means the range cannot be satisfied.
+    """
+    unit, _, spec = header.strip().partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    try:
+        if not sep:
+            return None
+        if not first:
+            # Suffix range: the final N bytes
+            return max(0, size - int(last)), size - 1 if int(last) else -1
+        first = int(first)
+        return first, min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+
+
+def sse_event(event: str, data, event_id: Optional[str] = None) -> str:
+    """One Server-Sent Events message with ``data`` as JSON."""
+    message = f"event: {event}\n"
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    return message + f"data: {json.dumps(data, default=str)}\n\n"
+
+
+def stream_id(log_offset: int, progress_offset: int) -> str:
+    return f"{log_offset}:{progress_offset}"
+
+
+def parse_stream_id(value: str) -> Tuple[int, int]:
+    """``(log_offset, progress_offset)`` from an event id; raises ``ValueError`` if malformed."""
+    log_offset, progress_offset = (int(part) for part in value.split(":"))
+    if log_offset < 0 or progress_offset < 0:
+        raise ValueError(f"negative offset in {value!r}")
+    return log_offset, progress_offset
+
+
+async def stream_run(log_path: str, progress_path: str, log_offset: int, progress_offset: int,
+                     is_active: Callable[[], bool], poll_seconds: float = POLL_SECONDS) -> AsyncIterator[str]:
+    """Follow a run's log and progress events as Server-Sent Events until it ends.
+
+    ``log`` messages carry new log text, ``progress`` messages one progress
+    event each. Every message id holds both file offsets, so a client that
+    reconnects with ``Last-Event-ID`` continues exactly where it left off.
+    The stream sends whatever is left once ``is_active`` turns false and
+    closes with an ``end`` message.
+    """
+    idle = 0.0
+    inodes = {log_path: _inode(log_path), progress_path: _inode(progress_path)}
+    while True:
+        # Checked before reading, so output written just before the run
+        # ended is still sent
+        active = is_active()
+        sent = False
+        # A new run started its files afresh: follow it from the beginning
+        for path in inodes:
+            inode = _inode(path)
+            if inode != inodes[path]:
+                inodes[path] = inode
+                if path == log_path:
+                    log_offset = 0
+                else:
+                    progress_offset = 0
+        chunk, log_offset = read_lines(log_path, log_offset, partial=not active)
+        if chunk:
+            yield sse_event("log", {"text": chunk.decode("utf-8", errors="replace")},
+                            stream_id(log_offset, progress_offset))
+            sent = True
+        chunk, end = read_lines(progress_path, progress_offset)
+        progress_offset = end - len(chunk)
+        for line in chunk.splitlines(keepends=True):
+            progress_offset += len(line)
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue  # blank, or torn by a writer that died mid-line
+            yield sse_event("progress", event, stream_id(log_offset, progress_offset))
+            sent = True
+        if not active:
+            if sent:
+                continue  # drain what is left before closing
+            yield sse_event("end", {"log_offset": log_offset, "progress_offset": progress_offset},
+                            stream_id(log_offset, progress_offset))
+            return
+        idle = 0.0 if sent else idle + poll_seconds
+        if idle >= KEEPALIVE_SECONDS:
+            yield ": keep-alive\n\n"
+            idle = 0.0
+        await asyncio.sleep(poll_seconds)
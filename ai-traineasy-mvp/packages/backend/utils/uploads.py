@@ -0,0 +1,460 @@
+import os
+import re
+import csv
+import glob
+import time
+import uuid
+import fcntl
+import codecs
+import shutil
+import hashlib
+import logging
+from contextlib import ExitStack, contextmanager
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from an upload at a time; peak memory per upload stays near this
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+# Resumable upload sessions live in this directory of their project
+UPLOADS_DIRNAME = "uploads"
+# Sessions no chunk has reached for this long are deleted
+SESSION_TTL_SECONDS = int(os.getenv("UPLOAD_SESSION_TTL_SECONDS", str(24 * 3600)))
+_UPLOAD_ID = re.compile(r"[0-9a-f]{32}")
+# Longest piece held while waiting for its end: a JSON token (e.g. a string
+# value), a CSV line, or a CSV record spanning lines inside quotes
+MAX_TOKEN_CHARS = 8 * 1024 * 1024
+
+
+class InvalidUpload(ValueError):
+    """The uploaded bytes are not a well-formed dataset file."""
+
+
+class CsvValidator:
+    """Check CSV structure as text arrives, one complete record at a time.
+
+    A record ends at a newline outside quotes, which an odd number of
+    quotes on a line toggles. Every record may have at most as many fields
+    as the header, like ``pd.read_csv`` requires.
+    """
+
+    def __init__(self):
+        self._partial = ""
+        self._record: List[str] = []
+        self._record_chars = 0
+        self._quoted = False
+        self._columns: Optional[int] = None
+        self.records = 0
+
+    def feed(self, text: str) -> None:
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        if len(self._partial) > MAX_TOKEN_CHARS:
+            raise InvalidUpload(f"CSV line longer than {MAX_TOKEN_CHARS} characters")
+        self._check([line + "\n" for line in lines])
+
+    def _check(self, lines: List[str]) -> None:
+        records = []
+        for line in lines:
+            self._record.append(line)
+            self._record_chars += len(line)
+            if line.count('"') % 2:
+                self._quoted = not self._quoted
+            if not self._quoted:
+                records.append("".join(self._record))
+                self._record, self._record_chars = [], 0
+            elif self._record_chars > MAX_TOKEN_CHARS:
+                raise InvalidUpload(f"quoted CSV field longer than {MAX_TOKEN_CHARS} characters "
+                                    f"near record {self.records + 1}")
+        try:
+            for row in csv.reader(records):
+                if not row:
+                    continue  # blank line
+                self.records += 1
+                if self._columns is None:
+                    self._columns = len(row)
+                elif len(row) > self._columns:
+                    raise InvalidUpload(f"record {self.records} has {len(row)} fields, "
+                                        f"the header has {self._columns}")
+        except csv.Error as e:
+            raise InvalidUpload(f"malformed CSV near record {self.records + 1}: {e}")
+
+    def finish(self) -> None:
+        if self._partial:
+            self._check([self._partial])
+            self._partial = ""
+        if self._quoted:
+            raise InvalidUpload("unterminated quoted field at end of file")
+        if self._columns is None:
+            raise InvalidUpload("Empty file")
+
+
+_JSON_TOKEN = re.compile(r'''
+    \s*(?:
+        (?P<string>"(?:[^"\\\x00-\x1f]|\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4}))*")
+      | (?P<number>-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?)
+      | (?P<literal>true|false|null|NaN|-?Infinity)
+      | (?P<punct>[{}\[\]:,])
+    )''', re.VERBOSE)
+_JSON_SCALAR = r'''(?:"(?:[^"\\\x00-\x1f]|\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4}))*"
+    | -?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)? | true | false | null | NaN | -?Infinity)'''
+# An object or array of scalars, such as one record, checked in a single match
+_JSON_FLAT = re.compile(rf'''
+    \s*(?:
+        \{{\s*(?:"(?:[^"\\\x00-\x1f]|\\(?:["\\/bfnrt]|u[0-9a-fA-F]{{4}}))*"\s*:\s*{_JSON_SCALAR}\s*
+                (?:,\s*"(?:[^"\\\x00-\x1f]|\\(?:["\\/bfnrt]|u[0-9a-fA-F]{{4}}))*"\s*:\s*{_JSON_SCALAR}\s*)*)?\}}
+      | \[\s*(?:{_JSON_SCALAR}\s*(?:,\s*{_JSON_SCALAR}\s*)*)?\]
+    )''', re.VERBOSE)
+# What may follow a number or literal ("" is the end of the document)
+_JSON_DELIMITERS = ("", " ", "\t", "\r", "\n", ",", "]", "}", ":")
+# What a token cut off at the end of a chunk may look like so far
+_JSON_PARTIAL = re.compile(r'''
+    \s*(?:
+        "(?:[^"\\\x00-\x1f]|\\["\\/bfnrt]|\\u[0-9a-fA-F]{4})*(?:\\u?[0-9a-fA-F]{0,3})?
+      | -?\d*(?:\.\d*)?(?:[eE][+-]?\d*)?
+      | t(?:r(?:ue?)?)? | f(?:a(?:l(?:se?)?)?)? | n(?:u(?:ll?)?)? | N(?:aN?)?
+      | -?I(?:n(?:f(?:i(?:n(?:i(?:ty?)?)?)?)?)?)?
+    )''', re.VERBOSE)
+
+
+class JsonValidator:
+    """Check JSON syntax as text arrives, without building the document.
+
+    Tokens are matched with a regular expression and checked against a
+    small grammar state machine, so memory does not grow with the
+    document. Like ``json.loads``, ``NaN`` and ``Infinity`` are accepted.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._stack: List[str] = []  # "[" or "{" per open container
+        self._expect = "value"  # value | value_or_close | key | key_or_close | colon | comma_or_close | end
+        self.tokens = 0
+
+    def feed(self, text: str, final: bool = False) -> None:
+        buffer = self._buffer + text
+        pos = 0
+        while True:
+            if self._expect in ("value", "value_or_close"):
+                match = _JSON_FLAT.match(buffer, pos)
+                if match is not None:
+                    self.tokens += 1
+                    self._value_done()
+                    pos = match.end()
+                    continue
+            match = _JSON_TOKEN.match(buffer, pos)
+            if match is None:
+                break
+            kind, end = match.lastgroup, match.end()
+            if kind in ("number", "literal") and (
+                    buffer[end:end + 1] not in _JSON_DELIMITERS or (end == len(buffer) and not final)):
+                # "1.5e" may become "1.5e3" with the next chunk; "1.5x" is
+                # rejected below
+                break
+            self._token(kind, match.group(kind))
+            pos = end
+        rest = buffer[pos:]
+        if final:
+            if rest.strip():
+                raise InvalidUpload(f"invalid JSON near {rest.strip()[:20]!r}")
+            return
+        if not _JSON_PARTIAL.fullmatch(rest):
+            raise InvalidUpload(f"invalid JSON near {rest.strip()[:20]!r}")
+        if len(rest) > MAX_TOKEN_CHARS:
+            raise InvalidUpload(f"JSON value longer than {MAX_TOKEN_CHARS} characters")
+        self._buffer = rest
+
+    def _value_done(self) -> None:
+        self._expect = "comma_or_close" if self._stack else "end"
+
+    def _token(self, kind: str, token: str) -> None:
+        self.tokens += 1
+        expect = self._expect
+        if kind != "punct":
+            if expect in ("key", "key_or_close"):
+                if kind != "string":
+                    raise InvalidUpload(f"object key must be a string, got {token[:20]!r}")
+                self._expect = "colon"
+            elif expect in ("value", "value_or_close"):
+                self._value_done()
+            else:
+                raise InvalidUpload(f"unexpected {token[:20]!r}")
+        elif token in "[{":
+            if expect not in ("value", "value_or_close"):
+                raise InvalidUpload(f"unexpected {token!r}")
+            self._stack.append(token)
+            self._expect = "value_or_close" if token == "[" else "key_or_close"
+        elif token in "]}":
+            opener = "[" if token == "]" else "{"
+            if (not self._stack or self._stack[-1] != opener
+                    or expect not in ("comma_or_close", "value_or_close" if token == "]" else "key_or_close")):
+                raise InvalidUpload(f"unexpected {token!r}")
+            self._stack.pop()
+            self._value_done()
+        elif token == ":":
+            if expect != "colon":
+                raise InvalidUpload("unexpected ':'")
+            self._expect = "value"
+        else:  # ","
+            if expect != "comma_or_close":
+                raise InvalidUpload("unexpected ','")
+            self._expect = "value" if self._stack[-1] == "[" else "key"
+
+    def finish(self) -> None:
+        self.feed("", final=True)
+        if self._expect != "end":
+            raise InvalidUpload("Empty file" if not self.tokens else "truncated JSON document")
+
+
+class UploadChecker:
+    """SHA-256, UTF-8 decoding and CSV/JSON validation over an upload's chunks, in order."""
+
+    def __init__(self, kind: str):
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._validator = JsonValidator() if kind == "json" else CsvValidator()
+
+    def update(self, chunk: bytes) -> None:
+        self._sha256.update(chunk)
+        start, self.size = self.size, self.size + len(chunk)
+        try:
+            text = self._decoder.decode(chunk)
+        except UnicodeDecodeError as e:
+            raise InvalidUpload(f"not UTF-8 text (byte {start + e.start})")
+        self._validator.feed(text)
+
+    def finish(self) -> str:
+        """Finish validation and return the SHA-256 of everything seen."""
+        try:
+            self._validator.feed(self._decoder.decode(b"", final=True))
+        except UnicodeDecodeError:
+            raise InvalidUpload("not UTF-8 text (truncated character at end of file)")
+        self._validator.finish()
+        return self._sha256.hexdigest()
+
+
+class StreamingUpload:
+    """Write an upload to disk chunk by chunk while hashing and validating it.
+
+    Chunks go to a temporary file next to ``path`` and are decoded as UTF-8
+    and checked as CSV or JSON on the way, so nothing but the current chunk
+    is held in memory. ``commit`` moves the file into place atomically;
+    leaving the ``with`` block without committing removes it.
+    """
+
+    def __init__(self, path: str, kind: str):
+        self.path = path
+        self.tmp_path = os.path.join(os.path.dirname(path), f".upload-{uuid.uuid4().hex}.part")
+        self._checker = UploadChecker(kind)
+        self._file = open(self.tmp_path, "wb")
+        self._committed = False
+
+    @property
+    def size(self) -> int:
+        return self._checker.size
+
+    def write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+        self._checker.update(chunk)
+
+    def commit(self) -> str:
+        """Finish validation, move the file into place and return its SHA-256."""
+        sha256 = self._checker.finish()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+        self._committed = True
+        return sha256
+
+    def abort(self) -> None:
+        self._file.close()
+        if not self._committed and os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self) -> "StreamingUpload":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.abort()
+
+
+class UploadTooLarge(InvalidUpload):
+    """More bytes than the session announced or the server accepts."""
+
+
+class OffsetMismatch(Exception):
+    """A chunk was sent for an offset other than where the upload stands."""
+
+    def __init__(self, offset: int):
+        super().__init__(f"upload is at offset {offset}")
+        self.offset = offset
+
+
+class UploadSession(BaseModel):
+    """A resumable upload in progress; its bytes so far are in ``data.part``."""
+    id: str
+    filename: str
+    kind: str
+    size: Optional[int] = None  # total announced by the client, if known
+    sha256: Optional[str] = None
+    created_at: float
+    updated_at: float
+
+
+def _session_dir(project_dir: str, upload_id: str) -> str:
+    if not _UPLOAD_ID.fullmatch(upload_id):
+        raise FileNotFoundError(upload_id)
+    return os.path.join(project_dir, UPLOADS_DIRNAME, upload_id)
+
+
+def _save_session(session_dir: str, session: UploadSession) -> None:
+    tmp_path = os.path.join(session_dir, "session.json.tmp")
+    with open(tmp_path, "w") as f:
+        f.write(session.model_dump_json())
+    os.replace(tmp_path, os.path.join(session_dir, "session.json"))
+
+
+def create_session(project_dir: str, filename: str, kind: str, size: Optional[int] = None,
+                   sha256: Optional[str] = None) -> UploadSession:
+    now = time.time()
+    session = UploadSession(id=uuid.uuid4().hex, filename=filename, kind=kind, size=size,
+                            sha256=sha256.lower() if sha256 else None, created_at=now, updated_at=now)
+    session_dir = _session_dir(project_dir, session.id)
+    os.makedirs(session_dir)
+    open(os.path.join(session_dir, "data.part"), "wb").close()
+    _save_session(session_dir, session)
+    return session
+
+
+def load_session(project_dir: str, upload_id: str) -> Tuple[UploadSession, int]:
+    """The session and how many bytes it has received; ``FileNotFoundError`` if unknown."""
+    session_dir = _session_dir(project_dir, upload_id)
+    with open(os.path.join(session_dir, "session.json")) as f:
+        session = UploadSession.model_validate_json(f.read())
+    return session, os.path.getsize(os.path.join(session_dir, "data.part"))
+
+
+@contextmanager
+def _locked(session_dir: str):
+    # One writer per session, across API workers; a second one is told to
+    # retry. The directory is locked since session.json is replaced on save.
+    fd = os.open(session_dir, os.O_RDONLY)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise OffsetMismatch(os.path.getsize(os.path.join(session_dir, "data.part")))
+        yield
+    finally:
+        os.close(fd)
+
+
+class ChunkWriter:
+    """Append one chunk to a session, straight to disk.
+
+    The chunk must start where the upload stands (``OffsetMismatch``
+    otherwise, carrying the current offset) and may not grow it past the
+    announced size or ``max_bytes``. The session stays locked until
+    ``close``, which keeps what arrived even if the transfer broke off, so
+    the client can resume from there. Every step does blocking file I/O;
+    async callers run them in a thread pool, like ``StreamingUpload``.
+    """
+
+    def __init__(self, project_dir: str, upload_id: str, offset: int, max_bytes: int):
+        session, _ = load_session(project_dir, upload_id)
+        self._session = session
+        self._session_dir = _session_dir(project_dir, upload_id)
+        data_path = os.path.join(self._session_dir, "data.part")
+        self._lock = ExitStack()
+        self._lock.enter_context(_locked(self._session_dir))
+        try:
+            # Read under the lock: a concurrent writer may have just finished
+            received = os.path.getsize(data_path)
+            if offset != received:
+                raise OffsetMismatch(received)
+            self._file = open(data_path, "ab")
+        except BaseException:
+            self._lock.close()
+            raise
+        self.offset = received
+        self._limit = min(max_bytes, session.size if session.size is not None else max_bytes)
+
+    def write(self, chunk: bytes) -> None:
+        if self.offset + len(chunk) > self._limit:
+            raise UploadTooLarge(f"upload exceeds {self._limit} bytes")
+        self._file.write(chunk)
+        self.offset += len(chunk)
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        try:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            _save_session(self._session_dir, self._session.model_copy(update={"updated_at": time.time()}))
+        finally:
+            self._lock.close()
+
+    def __enter__(self) -> "ChunkWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def finalize_session(project_dir: str, upload_id: str, path: str, sha256: Optional[str] = None) -> Tuple[str, int]:
+    """Verify a complete upload and move it to ``path``; returns its SHA-256 and size.
+
+    The checksum given here or when the session was created must match;
+    the file is also validated as CSV or JSON on the way, reading it in
+    chunks. A failed check leaves the session in place for inspection or
+    another attempt.
+    """
+    session, received = load_session(project_dir, upload_id)
+    expected = (sha256 or session.sha256 or "").lower()
+    if not expected:
+        raise InvalidUpload("a sha256 checksum is required to finalize")
+    if session.size is not None and received != session.size:
+        raise OffsetMismatch(received)
+    session_dir = _session_dir(project_dir, upload_id)
+    data_path = os.path.join(session_dir, "data.part")
+    with _locked(session_dir):
+        checker = UploadChecker(session.kind)
+        with open(data_path, "rb") as f:
+            while chunk := f.read(UPLOAD_CHUNK_BYTES):
+                checker.update(chunk)
+        actual = checker.finish()
+        if actual != expected:
+            raise InvalidUpload(f"checksum mismatch: received data has sha256 {actual}")
+        os.replace(data_path, path)
+    shutil.rmtree(session_dir, ignore_errors=True)
+    return actual, checker.size
+
+
+def delete_session(project_dir: str, upload_id: str) -> None:
+    shutil.rmtree(_session_dir(project_dir, upload_id))
+
+
+def collect_abandoned_sessions(projects_root: str, ttl_seconds: float = SESSION_TTL_SECONDS) -> int:
+    """Delete upload sessions no chunk has reached for ``ttl_seconds``; returns how many."""
+    removed = 0
+    cutoff = time.time() - ttl_seconds
+    for session_dir in glob.glob(os.path.join(projects_root, "*", UPLOADS_DIRNAME, "*")):
+        try:
+            # Chunks touch session.json; fall back to the directory for a
+            # session that died while being created
+            marker = os.path.join(session_dir, "session.json")
+            touched = os.path.getmtime(marker if os.path.exists(marker) else session_dir)
+            if touched < cutoff:
+                shutil.rmtree(session_dir)
+                removed += 1
+        except OSError as e:
+            logger.warning("Could not collect upload session %s: %s", session_dir, e)
+    if removed:
+        logger.info("Removed %d abandoned upload sessions", removed)
+    return removed
@@ -0,0 +1,246 @@
+import os
+import sys
+import signal
+import logging
+import threading
+import traceback
+import multiprocessing
+from collections import deque
+from multiprocessing import connection
+from typing import Optional
+
+import psutil
+
+from .tail import start_file
+
+logger = logging.getLogger(__name__)
+
+# Jobs a worker runs before it is replaced, so leaks in native libraries
+# cannot accumulate forever.
+MAX_JOBS_PER_WORKER = 20
+# Resident memory after a job above which the worker is replaced.
+MAX_WORKER_RSS_MB = 2048
+
+
+def _rss_mb() -> float:
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def _run_job(train_model, job: dict) -> int:
+    """Run one training job with stdout/stderr sent to its log file.
+
+    The file descriptors themselves are redirected, so output from native
+    code (LightGBM, BLAS) lands in the log just like it does for a training
+    subprocess. Returns the exit code the training CLI would have used.
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = os.dup(1), os.dup(2)
+    start_file(job["log_path"])
+    with open(job["log_path"], "a") as log_file:
+        os.dup2(log_file.fileno(), 1)
+        os.dup2(log_file.fileno(), 2)
+        try:
+            result = train_model.train(job["project_id"], **job["options"])
+            return 0 if result["status"] != "failed_budget" else 1
+        except BaseException:
+            traceback.print_exc()
+            return 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved[0], 1)
+            os.dup2(saved[1], 2)
+            os.close(saved[0])
+            os.close(saved[1])
+
+
+def _worker_main(conn, max_jobs: int, max_rss_mb: float) -> None:
+    # Ignore Ctrl+C meant for the API; the pool shuts workers down itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Own process group, so pause/cancel signals reach this worker and the
+    # processes its jobs start, and nothing else
+    os.setsid()
+    import train_model  # the expensive part: sklearn, lightgbm, torch
+
+    parent = os.getppid()
+    for _ in range(max_jobs):
+        conn.send(("ready", None, None))
+        while not conn.poll(5):
+            if os.getppid() != parent:
+                return  # the API died without shutting the pool down
+        job = conn.recv()
+        if job is None:
+            return
+        conn.send(("started", job["id"], os.getpid()))
+        returncode = _run_job(train_model, job)
+        conn.send(("finished", job["id"], returncode))
+        if _rss_mb() > max_rss_mb:
+            return
+
+
+class TrainingJob:
+    """Handle for a job submitted to a :class:`TrainingWorkerPool`."""
+
+    def __init__(self, job_id: int):
+        self.id = job_id
+        self.pid: Optional[int] = None
+        self.returncode: Optional[int] = None
+        self._started = threading.Event()
+        self._done = threading.Event()
+
+    def wait_started(self, timeout: Optional[float] = None) -> Optional[int]:
+        """Pid of the worker running the job once it has been picked up."""
+        self._started.wait(timeout)
+        return self.pid
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[int]:
+        """Exit code of the job, or ``None`` if it is still running after ``timeout``."""
+        self._done.wait(timeout)
+        return self.returncode
+
+
+class TrainingWorkerPool:
+    """Long-lived worker processes with the ML stack already imported.
+
+    Training in a fresh subprocess pays for importing pandas, scikit-learn,
+    LightGBM and torch on every run; workers here pay it once and then take
+    jobs from a queue. A worker is replaced after ``max_jobs`` jobs, when
+    its memory exceeds ``max_rss_mb`` after a job, or when it dies. A job
+    whose worker dies (or is killed) finishes with that worker's exit code.
+
+    Each worker talks to the pool over its own pipe, and the pool hands jobs
+    to idle workers itself. A shared ``multiprocessing.Queue`` would not
+    survive this: a worker killed while holding the queue's lock (paused,
+    cancelled or OOM-killed mid-job) blocks every other worker on it.
+    """
+
+    def __init__(self, size: int = 1, max_jobs: int = MAX_JOBS_PER_WORKER,
+                 max_rss_mb: float = MAX_WORKER_RSS_MB):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        # Forking a process that already runs threads (the API) is unsafe
+        self._ctx = multiprocessing.get_context("spawn")
+        self._workers = {}  # pipe -> worker process
+        self._idle = []
+        self._queue = deque()
+        self._pending = {}
+        self._running = {}  # worker pid -> job
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+    def start(self) -> None:
+        for _ in range(self.size):
+            self._spawn()
+        threading.Thread(target=self._collect_events, daemon=True).start()
+        logger.info("Started %d training workers", self.size)
+
+    def _spawn(self) -> None:
+        conn, child_conn = self._ctx.Pipe()
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.max_jobs, self.max_rss_mb),
+            daemon=True,
+        )
+        proc.start()
+        child_conn.close()
+        self._workers[conn] = proc
+
+    def _dispatch(self) -> None:
+        # Caller holds self._lock
+        while self._queue and self._idle:
+            conn = self._idle.pop()
+            try:
+                conn.send(self._queue[0])
+            except OSError:
+                continue  # died meanwhile; its EOF is handled by the collector
+            self._queue.popleft()
+
+    def submit(self, project_id: str, log_path: str, **options) -> TrainingJob:
+        """Queue a training run; ``options`` are keyword arguments of ``train_model.train``."""
+        with self._lock:
+            self._next_id += 1
+            job = TrainingJob(self._next_id)
+            self._pending[job.id] = job
+            self._queue.append({"id": job.id, "project_id": project_id,
+                                "log_path": os.path.abspath(log_path), "options": options})
+            self._dispatch()
+        return job
+
+    def kill(self, job: TrainingJob) -> None:
+        """Kill the worker running ``job`` and anything it started; the pool replaces it."""
+        if job.pid is not None and job.returncode is None:
+            try:
+                os.killpg(job.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    def _finish(self, job: TrainingJob, returncode: int) -> None:
+        job.returncode = returncode
+        job._started.set()
+        job._done.set()
+
+    def _handle(self, conn, kind: str, job_id, value) -> None:
+        # Caller holds self._lock
+        if kind == "ready":
+            self._idle.append(conn)
+            self._dispatch()
+            return
+        job = self._pending.get(job_id)
+        if job is None:
+            return
+        if kind == "started":
+            job.pid = value
+            self._running[value] = job
+            job._started.set()
+        else:
+            self._running.pop(job.pid, None)
+            del self._pending[job_id]
+            self._finish(job, value)
+
+    def _worker_exited(self, conn) -> None:
+        # Caller holds self._lock
+        proc = self._workers.pop(conn, None)
+        if proc is None:
+            return  # shut down meanwhile
+        proc.join()
+        conn.close()
+        if conn in self._idle:
+            self._idle.remove(conn)
+        job = self._running.pop(proc.pid, None)
+        if job is not None and job.returncode is None:
+            # Died mid-job (crash, OOM kill, timeout kill); a recycled
+            # worker has already reported its last job
+            logger.warning("Training worker %d exited with %s", proc.pid, proc.exitcode)
+            del self._pending[job.id]
+            self._finish(job, proc.exitcode or 1)
+        if not self._closed.is_set():
+            self._spawn()
+
+    def _collect_events(self) -> None:
+        while not self._closed.is_set():
+            with self._lock:
+                conns = list(self._workers)
+            for conn in connection.wait(conns, timeout=1):
+                with self._lock:
+                    try:
+                        self._handle(conn, *conn.recv())
+                    except (EOFError, OSError):
+                        self._worker_exited(conn)
+
+    def shutdown(self, timeout: float = 10) -> None:
+        self._closed.set()
+        with self._lock:
+            workers = dict(self._workers)
+            self._workers = {}
+        for conn, proc in workers.items():
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+        for proc in workers.values():
+            proc.join(timeout)
+            if proc.is_alive():
+                proc.kill()
@@ -0,0 +1,332 @@
+"""
+Standalone training worker for AI TrainEasy MVP
+
+Claims queued runs from the ``training_runs`` table, trains them from the
+shared projects directory and reports heartbeats, progress and results back
+to the database. Any number of workers, on one machine or many, can share a
+database and a storage mount:
+
+    DATABASE_URL=postgresql://... python worker.py --storage-dir /mnt/traineasy
+
+Start the API with ``TRAINING_EXECUTOR=workers`` so it only queues runs.
+"""
+import os
+import json
+import time
+import signal
+import socket
+import logging
+import argparse
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+from database import SessionLocal, TrainingRun, Model, init_db
+from scheduler import TrainingScheduler, QUEUED, RUNNING, PAUSED, CANCELLED
+from utils.run_cache import store_run
+from utils.worker_pool import TrainingWorkerPool
+from utils.process_manager import ProcessManager
+from utils.resources import plan_resources
+from utils.isolation import CoreAllocator, memory_share_mb
+from utils.accounting import ResourceAccountant, ResourceUsage
+
+logger = logging.getLogger(__name__)
+
+# A run whose lease is not renewed for this long is handed to another worker
+LEASE_SECONDS = 60
+HEARTBEAT_SECONDS = 10
+POLL_SECONDS = 5
+# Extra time a training job gets to write its budget-limited result
+# before it is killed outright.
+TRAINING_BUDGET_GRACE_SECONDS = 60
+# train_model.train keyword arguments among a run's stored options
+TRAIN_OPTIONS = ("cpu_percent", "max_duration", "incremental", "resume", "ensemble", "screen", "cores", "memory_mb")
+# Training log fields copied into the run's result
+RESULT_FIELDS = ("status", "problem_type", "selected_model", "cv_score", "elapsed_seconds")
+
+
+def update_project_status(project_id: str, **fields):
+    project_file = os.path.join('projects', f"{project_id}.json")
+    with open(project_file) as f:
+        project_data = json.load(f)
+    project_data.update(fields)
+    with open(project_file, 'w') as f:
+        json.dump(project_data, f, indent=2)
+
+
+def record_outcome(project_id: str, returncode: int, fingerprint: Optional[str] = None,
+                   cancelled: bool = False):
+    """Turn a finished training job into a status, update the project and cache the run.
+
+    Returns ``(status, training_log)``; the log is ``None`` if the job wrote none.
+    """
+    project_dir = os.path.join("projects", project_id)
+    status, log = ('completed' if returncode == 0 else 'failed'), None
+    training_log_path = os.path.join(project_dir, "training_log.json")
+    if cancelled:
+        status = CANCELLED
+    elif returncode == 0 and os.path.exists(training_log_path):
+        with open(training_log_path) as f:
+            log = json.load(f)
+        status = log.get("status", status)
+    if status == 'completed' and fingerprint:
+        # Budget-limited results are not cached; a longer run may do better
+        store_run(project_dir, fingerprint)
+    update_project_status(
+        project_id,
+        status=status,
+        # A crashed run leaves its stage checkpoint behind for resume
+        resumable=os.path.isdir(os.path.join(project_dir, "checkpoint")),
+        training_completed_at=datetime.utcnow().isoformat(),
+    )
+    return status, log
+
+
+def record_usage(session_factory, run_id: int, project_id: str, usage: Optional[ResourceUsage],
+                 log: Optional[dict]) -> None:
+    """Store what a finished run consumed on its row and add the model it produced to ``models``."""
+    db = session_factory()
+    try:
+        run = db.get(TrainingRun, run_id)
+        if run is None:
+            return
+        if usage is not None:
+            run.wall_seconds, run.cpu_seconds, run.peak_rss_mb = usage.wall_seconds, usage.cpu_seconds, usage.peak_rss_mb
+        if log and log.get("stage_seconds"):
+            run.stage_seconds_json = json.dumps(log["stage_seconds"])
+        if log and log.get("selected_model") and log.get("status", "").startswith("completed"):
+            db.add(Model(
+                name=log["selected_model"], model_type=log["selected_model"],
+                file_path=os.path.join("projects", project_id, "model.pkl"),
+                cv_score=log.get("cv_score"),
+                # Time spent training, paused time excluded
+                training_time=log.get("elapsed_seconds", usage.wall_seconds if usage else None),
+                project_id=project_id,
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def last_log_line(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            f.seek(max(0, os.path.getsize(path) - 4096))
+            lines = [l for l in f.read().decode("utf-8", "replace").splitlines() if l.strip()]
+    except OSError:
+        return None
+    return lines[-1] if lines else None
+
+
+class TrainingWorker:
+    """Claim queued runs from the database and train them one at a time.
+
+    A run is claimed with a conditional ``UPDATE ... WHERE status = 'queued'``,
+    so exactly one worker wins it on any database. The claim is a lease the
+    worker renews on every heartbeat; a worker that stops renewing (crash,
+    network partition) loses the run to whichever worker next finds the
+    lease expired, and the run resumes from its stage checkpoint. A worker
+    that finds its lease gone stops its job, since the run now belongs to
+    someone else. Jobs run in a warm :class:`TrainingWorkerPool` process,
+    pinned to cores this worker may use; give workers sharing a host
+    disjoint affinity (``taskset -c 0-3 python worker.py``).
+    """
+
+    def __init__(self, worker_id: Optional[str] = None, session_factory=SessionLocal,
+                 scheduler: Optional[TrainingScheduler] = None, pool: Optional[TrainingWorkerPool] = None,
+                 lease_seconds: float = LEASE_SECONDS, heartbeat_seconds: float = HEARTBEAT_SECONDS,
+                 poll_seconds: float = POLL_SECONDS):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.session_factory = session_factory
+        # Only used for queue order and concurrency caps
+        self.scheduler = scheduler or TrainingScheduler(
+            launch=None, session_factory=session_factory,
+            max_concurrent=int(os.getenv("TRAINING_MAX_CONCURRENT", "2")),
+            max_per_user=int(os.getenv("TRAINING_MAX_PER_USER", "1")),
+            policy=os.getenv("TRAINING_QUEUE_POLICY", "fifo"),
+        )
+        self.pool = pool or TrainingWorkerPool(size=1)
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.poll_seconds = poll_seconds
+        self.cores = CoreAllocator()
+        self.memory_mb = int(os.getenv("TRAINING_MEMORY_MB", "0"))
+
+    def _lease(self) -> dict:
+        now = datetime.utcnow()
+        return {"heartbeat_at": now, "lease_expires_at": now + timedelta(seconds=self.lease_seconds)}
+
+    def reclaim_expired(self) -> int:
+        """Requeue runs whose worker stopped renewing its lease."""
+        db = self.session_factory()
+        try:
+            expired = (db.query(TrainingRun)
+                       .filter(TrainingRun.status.in_([RUNNING, PAUSED]),
+                               TrainingRun.lease_expires_at.isnot(None),
+                               TrainingRun.lease_expires_at < datetime.utcnow())
+                       .all())
+            reclaimed = 0
+            for run in expired:
+                options = json.loads(run.options_json or "{}")
+                options["resume"] = True
+                reclaimed += (db.query(TrainingRun)
+                              .filter(TrainingRun.id == run.id, TrainingRun.status.in_([RUNNING, PAUSED]),
+                                      TrainingRun.lease_expires_at == run.lease_expires_at)
+                              .update({"status": QUEUED, "worker_id": None, "lease_expires_at": None,
+                                       "start_time": None, "options_json": json.dumps(options)},
+                                      synchronize_session=False))
+                logger.warning("Lease on training run %d held by %s expired; requeued", run.id, run.worker_id)
+            db.commit()
+            return reclaimed
+        finally:
+            db.close()
+
+    def claim(self) -> Optional[dict]:
+        """Take the next runnable queued run, or return ``None`` if there is none."""
+        db = self.session_factory()
+        try:
+            for run, _ in self.scheduler.runnable(db):
+                if self.scheduler.claim(db, run, worker_id=self.worker_id, **self._lease()):
+                    return {"id": run.id, "project_id": run.project_id, "options": self.scheduler.options(run)}
+            return None
+        finally:
+            db.close()
+
+    def report(self, run_id: int, **values) -> bool:
+        """Write ``values`` to a run this worker still holds; ``False`` once the lease is lost."""
+        db = self.session_factory()
+        try:
+            updated = (db.query(TrainingRun)
+                       .filter(TrainingRun.id == run_id, TrainingRun.status.in_([RUNNING, PAUSED]),
+                               TrainingRun.worker_id == self.worker_id)
+                       .update(values, synchronize_session=False))
+            db.commit()
+            return bool(updated)
+        finally:
+            db.close()
+
+    def requested_status(self, run_id: int) -> Optional[str]:
+        """Status the API last set on a run this worker holds; ``None`` once the lease is lost.
+
+        Pause, resume and cancel requests reach standalone workers this way.
+        """
+        db = self.session_factory()
+        try:
+            run = db.get(TrainingRun, run_id)
+            return run.status if run is not None and run.worker_id == self.worker_id else None
+        finally:
+            db.close()
+
+    def _follow_request(self, run_id: int, project_id: str, job, controllable: bool = True) -> bool:
+        """Apply a pause/resume/cancel request to the job; ``False`` if the run is no longer ours.
+
+        A job without a known pid cannot be signalled: it can only be
+        cancelled, by killing it, and pause requests are ignored.
+        """
+        requested = self.requested_status(run_id)
+        if requested is None:
+            logger.warning("Worker %s lost its lease on run %d; stopping it", self.worker_id, run_id)
+            self.pool.kill(job)
+            return False
+        manager = ProcessManager()
+        if not controllable:
+            if requested == CANCELLED and not manager.was_cancelled(project_id):
+                manager.cancel_training(project_id)  # recorded, so the outcome reads cancelled
+                self.pool.kill(job)
+            return True
+        if requested == CANCELLED:
+            if not manager.was_cancelled(project_id):
+                manager.cancel_training(project_id)
+            elif manager.cancel_overdue(project_id):
+                self.pool.kill(job)
+        elif requested == PAUSED and not manager.is_paused(project_id):
+            manager.pause_training(project_id)
+        elif requested == RUNNING and manager.is_paused(project_id):
+            manager.resume_training(project_id)
+        return True
+
+    def execute(self, claimed: dict) -> Optional[str]:
+        """Train a claimed run, heartbeating until it finishes. Returns its final status."""
+        run_id, project_id, options = claimed["id"], claimed["project_id"], claimed["options"]
+        log_path = os.path.join("projects", project_id, "train.log")
+        cores = self.cores.acquire(run_id, plan_resources(options["cpu_percent"]).cores)
+        options = dict(options, cores=cores, memory_mb=self.memory_mb or memory_share_mb(len(cores)))
+        manager = ProcessManager()
+        logger.info("Worker %s training run %d for project %s", self.worker_id, run_id, project_id)
+        try:
+            update_project_status(project_id, status='training', training_started_at=datetime.utcnow().isoformat())
+            job = self.pool.submit(project_id, log_path, **{k: options[k] for k in TRAIN_OPTIONS if k in options})
+            pid = job.wait_started()
+            if pid is not None:
+                manager.register(project_id, pid)
+            accountant = ResourceAccountant(pid).start() if pid is not None else None
+            deadline = time.monotonic() + (options.get("max_duration") or 0) + TRAINING_BUDGET_GRACE_SECONDS
+            while job.wait(self.heartbeat_seconds) is None:
+                if not self._follow_request(run_id, project_id, job, controllable=pid is not None):
+                    job.wait()
+                    if accountant is not None:
+                        accountant.stop()
+                    return None
+                self.report(run_id, progress=last_log_line(log_path), **self._lease())
+                if manager.is_paused(project_id):
+                    deadline += self.heartbeat_seconds  # paused time does not count against the budget
+                elif options.get("max_duration") and time.monotonic() > deadline:
+                    logger.warning("Training run %d exceeded its budget, killing", run_id)
+                    self.pool.kill(job)
+                    job.wait()
+            usage = accountant.stop() if accountant is not None else None
+            status, log = record_outcome(project_id, job.returncode, options.get("fingerprint"),
+                                         manager.was_cancelled(project_id))
+            result = {k: log.get(k) for k in RESULT_FIELDS} if log else None
+            self.report(run_id, status=status, end_time=datetime.utcnow(), lease_expires_at=None,
+                        progress=last_log_line(log_path), result_json=json.dumps(result) if result else None)
+            record_usage(self.session_factory, run_id, project_id, usage, log)
+            return status
+        except Exception as e:
+            logger.error("Training run %d failed: %s", run_id, e)
+            self.report(run_id, status="failed", end_time=datetime.utcnow(), lease_expires_at=None,
+                        error_message=str(e))
+            return "failed"
+        finally:
+            manager.unregister(project_id)
+            self.cores.release(run_id)
+
+    def run_forever(self, stop: threading.Event) -> None:
+        """Claim and train runs until ``stop`` is set; the current run is finished first."""
+        self.pool.start()
+        try:
+            while not stop.is_set():
+                self.reclaim_expired()
+                claimed = self.claim()
+                if claimed is None:
+                    stop.wait(self.poll_seconds)
+                    continue
+                self.execute(claimed)
+        finally:
+            self.pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Claim and run queued training jobs")
+    parser.add_argument("--storage-dir", default=".",
+                        help="Shared directory that holds projects/ (same mount as the API)")
+    parser.add_argument("--worker-id", default=None,
+                        help="Name reported in training_runs.worker_id (default: host:pid)")
+    parser.add_argument("--lease-seconds", type=float, default=LEASE_SECONDS)
+    parser.add_argument("--heartbeat-seconds", type=float, default=HEARTBEAT_SECONDS)
+    parser.add_argument("--poll-seconds", type=float, default=POLL_SECONDS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    os.chdir(args.storage_dir)
+    init_db()
+
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+    TrainingWorker(
+        worker_id=args.worker_id,
+        lease_seconds=args.lease_seconds,
+        heartbeat_seconds=args.heartbeat_seconds,
+        poll_seconds=args.poll_seconds,
+    ).run_forever(stop)